@@ -44,11 +44,85 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'finance.authentication.StatelessJWTAuthentication',
     ),
 }
 
+# How long (seconds) and for how many users get_full_user() keeps complete User rows
+# for the few code paths that need more than the token's user id.
+FINANCE_FULL_USER_CACHE_SECONDS = 30
+FINANCE_FULL_USER_CACHE_SIZE = 10000
+
+# Read report totals from the TransactionRollup table instead of re-summing transactions.
+FINANCE_REPORTS_USE_ROLLUPS = True
+
+# Upper bound on the periods one trends response may contain (e.g. ~2.7 years of days).
+FINANCE_TRENDS_MAX_PERIODS = 1000
+
+# Delta sync: tokens are moved back by the overlap to cover transactions still committing,
+# and tombstones older than the retention window are pruned (older tokens get a full sync).
+FINANCE_SYNC_OVERLAP_SECONDS = 5
+FINANCE_SYNC_TOMBSTONE_DAYS = 90
+
+# Words of a ?q= transaction search beyond this are ignored.
+FINANCE_SEARCH_MAX_TERMS = 8
+
+# Background jobs (manage.py run_workers): worker processes, idle poll interval, attempts
+# per job, first retry delay (doubling per attempt) and when a running job counts as lost.
+FINANCE_JOB_CONCURRENCY = 2
+FINANCE_JOB_POLL_SECONDS = 1.0
+FINANCE_JOB_MAX_ATTEMPTS = 3
+FINANCE_JOB_RETRY_BACKOFF_SECONDS = 30
+FINANCE_JOB_TIMEOUT_SECONDS = 600
+
+# How long (seconds) and for how many (date, currency pair) keys exchange rates read in
+# Python stay memoized in process; entries are keyed by the rates version that
+# load_exchange_rates moves, so new rates are picked up by every process.
+FINANCE_RATE_CACHE_SECONDS = 3600
+FINANCE_RATE_CACHE_SIZE = 10000
+
+# Days past today that ?projected=true trends show recurring occurrences for when no
+# end_date is given.
+FINANCE_RECURRING_PROJECTION_DAYS = 90
+
+# Forecasts read at most this many days of history, project the recent daily rate over the
+# trailing window, and look at most this many months ahead.
+FINANCE_FORECAST_HISTORY_DAYS = 730
+FINANCE_FORECAST_WINDOW_DAYS = 90
+FINANCE_FORECAST_MAX_MONTHS = 24
+
+# Savings goal completion dates are projected at the daily rate saved over this many days.
+FINANCE_SAVINGS_RATE_DAYS = 90
+
+# Database aliases that serve the report and list/retrieve reads (see finance.replicas), and
+# how long a user's reads stay on the primary after they write. Replicas also need
+# DATABASE_ROUTERS = ['finance.replicas.ReadReplicaRouter'].
+FINANCE_READ_REPLICAS = []
+FINANCE_READ_REPLICA_STICKY_SECONDS = 10
+# Replicas may lag beyond the sticky window; until this long after a user's write, reports
+# and lists read from a replica are not cached and carry no ETag, so a stale read is not
+# kept. Set it to the worst replication lag you expect.
+FINANCE_READ_REPLICA_MAX_LAG_SECONDS = 60
+
+# Rows fetched per database round-trip by the streaming transaction export.
+FINANCE_EXPORT_CHUNK_SIZE = 2000
+
+# Bulk transaction import: rows per INSERT and the largest accepted upload.
+FINANCE_IMPORT_BATCH_SIZE = 500
+FINANCE_IMPORT_MAX_ROWS = 50000
+
+# Requests slower than this (milliseconds) are logged to 'finance.metrics' with their slowest statements.
+FINANCE_SLOW_REQUEST_MS = 500
+FINANCE_SLOW_REQUEST_TOP_QUERIES = 3
+
+# Serve the report endpoints with the ASGI-native views in finance/async_views.py
+# (only useful under core/asgi.py). With concurrent queries enabled, independent
+# aggregates run on separate connections at the same time, except on SQLite.
+FINANCE_ASYNC_REPORTS = False
+FINANCE_ASYNC_CONCURRENT_QUERIES = True
+
 MIDDLEWARE = [
+    'finance.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -90,6 +164,24 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Local memory is per process; point this at a file or Redis cache in production
+# so every worker shares the report cache and its invalidation counters.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Report cache: which CACHES alias to use and how long a report stays valid (seconds).
+FINANCE_REPORT_CACHE_ALIAS = 'default'
+FINANCE_REPORT_CACHE_TIMEOUT = 300
+# Owned-category maps used by the validators; dropped on every category write.
+FINANCE_CATEGORY_CACHE_TIMEOUT = 3600
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
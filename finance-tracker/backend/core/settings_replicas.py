@@ -0,0 +1,27 @@
+"""Settings with a read replica in a second local SQLite file, for trying out finance.replicas.
+
+SQLite does not replicate, so the replica is whatever copy of the primary it was last
+given; that makes replica lag, and the read-your-writes window, easy to see:
+
+    python manage.py migrate --settings=core.settings_replicas
+    cp db.sqlite3 db.replica.sqlite3
+    python manage.py runserver --settings=core.settings_replicas
+
+The replica routing tests need it:
+
+    python manage.py test finance.tests.ReadReplicaTestCase --settings=core.settings_replicas
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES
+
+DATABASES = {
+    **DATABASES,
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+    },
+}
+
+DATABASE_ROUTERS = ['finance.replicas.ReadReplicaRouter']
+
+FINANCE_READ_REPLICAS = ['replica']
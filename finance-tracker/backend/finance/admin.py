@@ -6,4 +6,5 @@ from .models import *
 admin.site.register(Category)
 admin.site.register(Transaction)
 admin.site.register(Budget)
-admin.site.register(SavingsGoal)
\ No newline at end of file
+admin.site.register(SavingsGoal)
+admin.site.register(SavingsContribution)
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""ASGI-native versions of the report endpoints.
+
+Enabled with FINANCE_ASYNC_REPORTS; they serve the same URLs, parameters and payloads
+as the DRF report views. Authentication runs the configured JWT classes outside the
+event loop; report queries use the async ORM, and independent aggregates run
+concurrently on separate connections when the database supports it (not SQLite).
+"""
+import asyncio
+from functools import partial
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, connection
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+from . import caching, recurring, replicas, reports
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+def _authenticate(request):
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = authentication_class().authenticate(request)
+        if result is not None:
+            return result[0]
+    return None
+
+
+async def authenticate(request):
+    """Return (user, None) or (None, 401 response), like DRF's IsAuthenticated."""
+    try:
+        user = await sync_to_async(_authenticate)(request)
+    except exceptions.AuthenticationFailed as exc:
+        return None, json_response({'detail': exc.detail}, status=401)
+
+    if user is None or not user.is_authenticated:
+        return None, json_response({'detail': "Authentication credentials were not provided."}, status=401)
+    return user, None
+
+
+def concurrent_queries_allowed():
+    """SQLite serializes connections (and test databases live in one connection), so only fan out elsewhere."""
+    return settings.FINANCE_ASYNC_CONCURRENT_QUERIES and connection.vendor != 'sqlite'
+
+
+def _on_own_connection(function):
+    def run():
+        try:
+            return function()
+        finally:
+            close_old_connections()
+    return run
+
+
+async def in_parallel(*functions):
+    """Run ORM calls at the same time, each in its own thread and therefore its own connection."""
+    return await asyncio.gather(*(
+        sync_to_async(_on_own_connection(function), thread_sensitive=False)() for function in functions
+    ))
+
+
+class AsyncReportView(View):
+    """Async counterpart of CachedReportMixin: authenticate, revalidate, then serve from the report cache.
+
+    Subclasses set report_name and define `async build_report(user, params)`.
+    """
+    report_name = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        if cls.report_name is None or not hasattr(cls, 'build_report'):
+            raise ImproperlyConfigured(f"{cls.__name__} needs a report_name and an async build_report(user, params).")
+        return super().as_view(**initkwargs)
+
+    async def report_version(self, user, params):
+        return await caching.areport_version(user.id, params)
+
+    async def get(self, request):
+        user, error = await authenticate(request)
+        if error:
+            return error
+
+        version = await self.report_version(user, request.GET)
+        etag = caching.report_etag(user.id, self.report_name, request.GET, version)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            alias, settled = await replicas.aread_route(user.id)
+            try:
+                with replicas.reading_from(alias):
+                    data, hit = await caching.acached_report(
+                        user.id, self.report_name, request.GET, lambda: self.build_report(user, request.GET),
+                        version, store=settled
+                    )
+            except exceptions.ValidationError as exc:
+                return json_response(exc.detail, status=400)
+
+            response = json_response(data)
+            response['X-Report-Cache'] = 'hit' if hit else 'miss'
+            if not (hit or settled):
+                etag = None
+        if etag:
+            response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class TotalIncomeExpenseAsyncReport(AsyncReportView):
+    report_name = 'income-expenses'
+
+    async def build_report(self, user, params):
+        source = await sync_to_async(reports.report_source)(user, params)
+        return await source.queryset.aaggregate(**reports.income_expense_sums(source.amount_field))
+
+
+class IncomeExpenseTrendsAsyncReport(AsyncReportView):
+    report_name = 'income-expense-trends'
+
+    async def report_version(self, user, params):
+        version = await super().report_version(user, params)
+        if params.get('projected') == 'true':
+            version = f'{version}.{timezone.localdate()}'
+        return version
+
+    async def build_report(self, user, params):
+        timeframe, breakdown, start_date, end_date = reports.trends_options(params)
+        source = await sync_to_async(reports.report_source)(user, params, timeframe)
+        rows = [row async for row in reports.trend_rows(source, timeframe, breakdown)]
+        if params.get('projected') == 'true':
+            projected = await sync_to_async(recurring.projected_rows)(
+                user, params, timeframe, breakdown, start_date, end_date, source.currency,
+                settings.FINANCE_RECURRING_PROJECTION_DAYS
+            )
+            rows = reports.merge_trend_rows(rows, projected, breakdown)
+        return {'trends': reports.build_trends(rows, timeframe, breakdown, start_date, end_date)}
+
+
+class NetWorthAsyncReport(AsyncReportView):
+    report_name = 'net-worth'
+
+    async def build_report(self, user, params):
+        source = await sync_to_async(reports.report_source)(user, params)
+        if concurrent_queries_allowed():
+            totals, savings = await in_parallel(
+                partial(reports.income_expense_totals, source),
+                partial(list, reports.savings_rows(user)),
+            )
+        else:
+            totals = await source.queryset.aaggregate(**reports.income_expense_sums(source.amount_field))
+            savings = [row async for row in reports.savings_rows(user)]
+        # Converting savings may read a rate that is not memoized yet.
+        savings = await sync_to_async(reports.savings_total)(savings, source.currency)
+        return reports.combine_net_worth(totals, savings)
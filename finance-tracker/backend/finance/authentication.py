@@ -0,0 +1,55 @@
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .models import TokenBackedUser
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """JWT authentication that trusts the token's user id instead of loading the User row.
+
+    The finance views only need request.user.id, so this saves a query per request.
+    Because the row is not read, a deactivated user stays authenticated until their
+    access token expires, and password-change revocation is not checked.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_FIELD != 'id':
+            return super().get_user(validated_token)
+
+        try:
+            return TokenBackedUser.from_claims(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, ValidationError):
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+
+_full_users = {}
+_full_users_lock = threading.Lock()
+
+
+def get_full_user(user):
+    """The complete User behind a token-backed user, cached in process for a few seconds."""
+    if not isinstance(user, TokenBackedUser):
+        return user
+
+    now = time.monotonic()
+    with _full_users_lock:
+        cached = _full_users.get(user.pk)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    full_user = User.objects.get(pk=user.pk)
+    with _full_users_lock:
+        if len(_full_users) >= settings.FINANCE_FULL_USER_CACHE_SIZE:
+            # Drop expired entries first, then everything if still full.
+            for user_id in [key for key, (expires, _user) in _full_users.items() if expires <= now]:
+                del _full_users[user_id]
+            if len(_full_users) >= settings.FINANCE_FULL_USER_CACHE_SIZE:
+                _full_users.clear()
+        _full_users[user.pk] = (now + settings.FINANCE_FULL_USER_CACHE_SECONDS, full_user)
+    return full_user
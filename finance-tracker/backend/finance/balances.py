@@ -0,0 +1,54 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce, Now
+from .models import Budget, Transaction
+
+
+def collect(deltas, values, sign):
+    """Add one transaction's `values` (see Transaction.tracked_values) to its budget's delta."""
+    if values['budget_id']:
+        deltas[values['budget_id']][0] += Decimal(str(values['amount'])) * sign
+        deltas[values['budget_id']][1] += sign
+
+
+def record(added=(), removed=()):
+    """Move the running totals of the budgets referenced by added and removed transaction values."""
+    deltas = defaultdict(lambda: [Decimal('0'), 0])
+    for values in added:
+        collect(deltas, values, 1)
+    for values in removed:
+        collect(deltas, values, -1)
+
+    for budget_id, (amount, count) in deltas.items():
+        if amount or count:
+            Budget.objects.filter(pk=budget_id).update(
+                spent_amount=F('spent_amount') + amount, transaction_count=F('transaction_count') + count,
+                updated_at=Now()
+            )
+
+
+def actual_totals():
+    """Expressions recomputing a budget's running totals from its transactions."""
+    linked = Transaction.objects.filter(budget=OuterRef('pk')).values('budget')
+    return {
+        'amount': Coalesce(
+            Subquery(linked.annotate(total=Sum('amount')).values('total')),
+            Value(0, output_field=DecimalField(max_digits=14, decimal_places=2))
+        ),
+        'count': Coalesce(Subquery(linked.annotate(total=Count('id')).values('total')), 0),
+    }
+
+
+def recompute(budgets):
+    """Overwrite the running totals of `budgets` from their transactions in one UPDATE."""
+    totals = actual_totals()
+    return budgets.update(spent_amount=totals['amount'], transaction_count=totals['count'], updated_at=Now())
+
+
+def drifted(budgets):
+    """Budgets whose stored running totals disagree with their transactions, annotated with the actual ones."""
+    totals = actual_totals()
+    return budgets.annotate(actual_amount=totals['amount'], actual_count=totals['count']).filter(
+        ~Q(spent_amount=F('actual_amount')) | ~Q(transaction_count=F('actual_count'))
+    )
@@ -0,0 +1,239 @@
+"""Query-count and latency benchmarks for every API endpoint.
+
+Run them with ``python manage.py benchmark`` (see the command for options); the test
+suite runs them at small sizes to check that query counts do not grow with the data.
+"""
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .models import Budget, Category, Job, RecurringTransaction, SavingsContribution, SavingsGoal, Transaction
+from . import balances, caching, rollups, sync
+
+
+HISTORY_DAYS = 3 * 365
+
+# Merchant words in the synthetic descriptions, so searches match a realistic fraction of rows.
+MERCHANTS = ('grocery', 'coffee', 'rent', 'fuel', 'pharmacy', 'restaurant', 'cinema', 'electric', 'internet', 'gym')
+
+# (label, url name, url kwargs built from the seeded fixture, query parameters)
+ENDPOINTS = [
+    ('transaction-list', 'transaction-list', None, {}),
+    ('transaction-list-filtered', 'transaction-list', None, {'category_type': 'expense', 'start_date': '__start__'}),
+    ('transaction-list-cursor', 'transaction-list', None, {'paginate': 'cursor'}),
+    ('transaction-search', 'transaction-list', None, {'q': 'coff'}),
+    ('transaction-search-two-terms', 'transaction-list', None, {'q': 'coffee purch'}),
+    ('transaction-detail', 'transaction-detail', 'transaction', {}),
+    ('transaction-export', 'transaction-export', None, {}),
+    ('category-list', 'category-list', None, {}),
+    ('budget-list', 'budget-list', None, {}),
+    ('budget-detail', 'budget-detail', 'budget', {}),
+    ('savingsgoal-list', 'savingsgoal-list', None, {}),
+    ('savingsgoal-detail', 'savingsgoal-detail', 'savingsgoal', {}),
+    ('savingscontribution-list', 'savingscontribution-list', None, {}),
+    ('savingscontribution-list-goal', 'savingscontribution-list', None, {'goal': '__goal__'}),
+    ('savingscontribution-detail', 'savingscontribution-detail', 'savingscontribution', {}),
+    ('recurringtransaction-list', 'recurringtransaction-list', None, {}),
+    ('recurringtransaction-detail', 'recurringtransaction-detail', 'recurringtransaction', {}),
+    ('job-list', 'job-list', None, {}),
+    ('job-detail', 'job-detail', 'job', {}),
+    ('job-download', 'job-download', 'job', {}),
+    ('sync', 'sync', None, {'since': '__since__'}),
+    ('sync-full', 'sync', None, {}),
+    ('total-income-expenses-report', 'total-income-expenses-report', None, {}),
+    ('total-income-expenses-report-range', 'total-income-expenses-report', None, {'start_date': '__start__', 'end_date': '__end__'}),
+    ('income-expense-trends-report', 'income-expense-trends-report', None, {'timeframe': 'month'}),
+    ('income-expense-trends-report-weekly', 'income-expense-trends-report', None, {'timeframe': 'week'}),
+    ('net-worth-report', 'net-worth-report', None, {}),
+    ('budget-notifications', 'budget-notifications', None, {}),
+    ('dashboard', 'dashboard', None, {}),
+    ('forecast-report', 'forecast-report', None, {'months': '12'}),
+    ('savings-progress-report', 'savings-progress-report', None, {}),
+]
+
+# Models the detail routes of ENDPOINTS take the first of the user's rows from.
+MODELS = {
+    'transaction': Transaction,
+    'budget': Budget,
+    'savingsgoal': SavingsGoal,
+    'savingscontribution': SavingsContribution,
+    'recurringtransaction': RecurringTransaction,
+    'job': Job,
+}
+
+
+def seed(size, categories=10, budgets=5, goals=3, schedules=5, jobs=3, seed_value=0):
+    """Create a synthetic user with `size` transactions spread over three years.
+
+    One in ten transactions also has a savings contribution, so the contribution ledger
+    grows with the data as well.
+    """
+    rng = random.Random(seed_value)
+    today = date.today()
+    user = User.objects.create_user(username=f'bench{size}_{rng.randrange(10 ** 9)}', password='benchmark1234')
+
+    category_objs = Category.objects.bulk_create([
+        Category(user=user, name=f'Category {index}', category_type='income' if index % 4 == 0 else 'expense')
+        for index in range(categories)
+    ])
+    expense_categories = [category for category in category_objs if category.category_type == 'expense']
+    budget_objs = Budget.objects.bulk_create([
+        Budget(
+            user=user, category=expense_categories[index % len(expense_categories)], allocated_amount=Decimal('1000.00'),
+            start_date=today - timedelta(days=30), end_date=today + timedelta(days=30)
+        ) for index in range(budgets)
+    ])
+    goal_objs = SavingsGoal.objects.bulk_create([
+        SavingsGoal(
+            user=user, goal_name=f'Goal {index}', target_amount=Decimal('5000.00'), current_amount=Decimal('100.00'),
+            deadline=today + timedelta(days=365)
+        ) for index in range(goals)
+    ])
+    # Schedules start next month, so nothing materializes while the benchmark runs.
+    RecurringTransaction.objects.bulk_create([
+        RecurringTransaction(
+            user=user, category=expense_categories[index % len(expense_categories)], amount=Decimal('50.00'),
+            description=f'Subscription {index}', frequency='monthly', start_date=today + timedelta(days=30),
+            next_date=today + timedelta(days=30)
+        ) for index in range(schedules)
+    ])
+    Job.objects.bulk_create([
+        Job(
+            user=user, kind='export', status=Job.SUCCEEDED, attempts=1, result=b'id,date,amount\n',
+            content_type='text/csv', filename='transactions.csv'
+        ) for _index in range(jobs)
+    ])
+
+    batch = []
+    for index in range(size):
+        category = rng.choice(category_objs)
+        batch.append(Transaction(
+            user=user, category=category, amount=Decimal(rng.randrange(100, 100000)) / 100,
+            date=today - timedelta(days=rng.randrange(HISTORY_DAYS)), description=f'{rng.choice(MERCHANTS)} purchase {index}',
+            budget=rng.choice(budget_objs) if category.category_type == 'expense' and index % 3 == 0 else None
+        ))
+        if len(batch) == 5000:
+            Transaction.objects.bulk_create(batch)
+            batch = []
+    Transaction.objects.bulk_create(batch)
+
+    SavingsContribution.objects.bulk_create([
+        SavingsContribution(
+            user=user, goal=rng.choice(goal_objs), amount=Decimal(rng.randrange(100, 10000)) / 100,
+            date=today - timedelta(days=rng.randrange(HISTORY_DAYS)), note=f'Contribution {index}'
+        ) for index in range(size // 10)
+    ], batch_size=5000)
+
+    rollups.rebuild([user.id])
+    balances.recompute(Budget.objects.filter(user=user))
+    return user
+
+
+def _request_args(user, kwargs_from, params):
+    today = date.today()
+    replacements = {
+        '__start__': (today - timedelta(days=90)).isoformat(),
+        '__end__': today.isoformat(),
+        '__goal__': str(SavingsGoal.objects.filter(user=user).values_list('pk', flat=True).first()),
+        '__since__': sync.encode_token(datetime.now().astimezone() - timedelta(days=1)),
+    }
+    params = {key: replacements.get(value, value) for key, value in params.items()}
+
+    kwargs = None
+    if kwargs_from:
+        kwargs = {'pk': MODELS[kwargs_from].objects.filter(user=user).values_list('pk', flat=True).first()}
+    return kwargs, params
+
+
+class QueryCounter:
+    """Database execute wrapper counting the queries run inside connection.execute_wrapper()."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(client, user, url, params, repeat):
+    """Median and worst wall time (ms) and the query count of an uncached GET."""
+    timings, query_count = [], None
+    for _ in range(repeat):
+        # Measure the compute path, not the report cache.
+        caching.bump_version(user.id)
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            started = time.perf_counter()
+            response = client.get(url, params)
+            if response.streaming:
+                for _chunk in response.streaming_content:
+                    pass
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise AssertionError(f"GET {url} returned {response.status_code}")
+        query_count = queries.count
+
+    return {
+        'queries': query_count,
+        'median_ms': round(statistics.median(timings), 3),
+        'max_ms': round(max(timings), 3),
+    }
+
+
+def run(sizes, repeat=5, endpoints=ENDPOINTS, log=None):
+    """Seed one user per size and benchmark every endpoint against it."""
+    results = {}
+    client = APIClient()
+    for size in sizes:
+        started = time.perf_counter()
+        user = seed(size)
+        if log:
+            log(f"Seeded {size} transactions in {time.perf_counter() - started:.1f}s")
+
+        client.force_authenticate(user=user)
+        results[str(size)] = {}
+        for label, url_name, kwargs_from, params in endpoints:
+            kwargs, params = _request_args(user, kwargs_from, params)
+            results[str(size)][label] = measure(client, user, reverse(url_name, kwargs=kwargs), params, repeat)
+            if log:
+                log(f"  {size:>7} {label:<40} {results[str(size)][label]}")
+    return results
+
+
+def growing_query_counts(results):
+    """Endpoints whose query count differs between the smallest and the largest dataset."""
+    sizes = sorted(results, key=int)
+    if len(sizes) < 2:
+        return []
+    smallest, largest = results[sizes[0]], results[sizes[-1]]
+    return [
+        f"{label}: {smallest[label]['queries']} queries at {sizes[0]} rows, {largest[label]['queries']} at {sizes[-1]}"
+        for label in smallest
+        if label in largest and largest[label]['queries'] > smallest[label]['queries']
+    ]
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of `results` against a stored `baseline` run.
+
+    Any increase in query count is a regression; latency may grow by `tolerance`
+    (0.25 = 25%) before it counts as one.
+    """
+    regressions = []
+    for size, endpoints in results.items():
+        for label, current in endpoints.items():
+            previous = baseline.get(size, {}).get(label)
+            if previous is None:
+                continue
+            if current['queries'] > previous['queries']:
+                regressions.append(f"{label} @ {size}: queries {previous['queries']} -> {current['queries']}")
+            if current['median_ms'] > previous['median_ms'] * (1 + tolerance):
+                regressions.append(f"{label} @ {size}: median {previous['median_ms']}ms -> {current['median_ms']}ms")
+    return regressions
+
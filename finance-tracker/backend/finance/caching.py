@@ -0,0 +1,177 @@
+import hashlib
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import urlencode
+
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def get_cache():
+    return caches[settings.FINANCE_REPORT_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f'finance:version:{user_id}'
+
+
+def get_version(user_id):
+    """Current data version of `user_id`; every cached report embeds it in its key."""
+    cache = get_cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # An evicted counter must never come back as an old value, so restart from the clock.
+        cache.add(_version_key(user_id), time.time_ns(), None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+async def aget_version(user_id):
+    cache = get_cache()
+    version = await cache.aget(_version_key(user_id))
+    if version is None:
+        await cache.aadd(_version_key(user_id), time.time_ns(), None)
+        version = await cache.aget(_version_key(user_id))
+    return version
+
+
+def bump_version(user_id):
+    """Invalidate everything cached for `user_id` by moving to a new version."""
+    cache = get_cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), time.time_ns(), None)
+
+
+def reset_version(user_id):
+    """Start a new user's version from the clock, so a reused id never sees stale entries."""
+    get_cache().set(_version_key(user_id), time.time_ns(), None)
+
+
+_RATES_VERSION_KEY = 'finance:version:exchange-rates'
+
+
+def rates_version():
+    """Version of the exchange rate table, moved by load_exchange_rates."""
+    cache = get_cache()
+    version = cache.get(_RATES_VERSION_KEY)
+    if version is None:
+        cache.add(_RATES_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(_RATES_VERSION_KEY)
+    return version
+
+
+async def arates_version():
+    cache = get_cache()
+    version = await cache.aget(_RATES_VERSION_KEY)
+    if version is None:
+        await cache.aadd(_RATES_VERSION_KEY, time.time_ns(), None)
+        version = await cache.aget(_RATES_VERSION_KEY)
+    return version
+
+
+def bump_rates_version():
+    get_cache().set(_RATES_VERSION_KEY, time.time_ns(), None)
+
+
+def report_version(user_id, params):
+    """Version a cached report of `user_id` depends on: the user's data, plus the rates when converting."""
+    version = get_version(user_id)
+    if params.get('currency'):
+        version = f'{version}.{rates_version()}'
+    return version
+
+
+async def areport_version(user_id, params):
+    version = await aget_version(user_id)
+    if params.get('currency'):
+        version = f'{version}.{await arates_version()}'
+    return version
+
+
+def _collection_key(user_id, collection):
+    return f'finance:collection:{user_id}:{collection}'
+
+
+def collection_version(user_id, collection):
+    """When `user_id`'s rows of `collection` (a model name) last changed, in nanoseconds since the epoch.
+
+    Serves as both the ETag version and the Last-Modified time of the collection's API
+    routes. An evicted entry restarts from the clock, which only makes clients refetch.
+    """
+    cache = get_cache()
+    version = cache.get(_collection_key(user_id, collection))
+    if version is None:
+        cache.add(_collection_key(user_id, collection), time.time_ns(), None)
+        version = cache.get(_collection_key(user_id, collection))
+    return version
+
+
+def touch_collection(user_id, *collections):
+    get_cache().set_many({_collection_key(user_id, collection): time.time_ns() for collection in collections}, None)
+
+
+def normalize_params(params):
+    """Query parameters as a stable, order-independent string."""
+    return urlencode(sorted((key, sorted(params.getlist(key))) for key in params), doseq=True)
+
+
+def report_key(user_id, endpoint, params, version=None):
+    digest = hashlib.md5(normalize_params(params).encode()).hexdigest()
+    if version is None:
+        version = report_version(user_id, params)
+    return f'finance:report:{user_id}:{version}:{endpoint}:{digest}'
+
+
+def report_etag(user_id, endpoint, params, version):
+    """Strong ETag of a report: it changes whenever the user's data version or the parameters do."""
+    return '"%s"' % hashlib.md5(report_key(user_id, endpoint, params, version).encode()).hexdigest()
+
+
+def _count(hit):
+    with _stats_lock:
+        _stats['hits' if hit else 'misses'] += 1
+
+
+def cached_report(user_id, endpoint, params, compute, version=None, store=True):
+    """Return (data, hit) for a report, computing it on a miss and storing it unless `store` is False."""
+    cache = get_cache()
+    key = report_key(user_id, endpoint, params, version)
+
+    data = cache.get(key)
+    hit = data is not None
+    _count(hit)
+
+    if not hit:
+        data = compute()
+        if store:
+            cache.set(key, data, settings.FINANCE_REPORT_CACHE_TIMEOUT)
+    return data, hit
+
+
+async def acached_report(user_id, endpoint, params, compute, version=None, store=True):
+    """cached_report() for async views; `compute` is a coroutine function."""
+    cache = get_cache()
+    if version is None:
+        version = await areport_version(user_id, params)
+    key = report_key(user_id, endpoint, params, version)
+
+    data = await cache.aget(key)
+    hit = data is not None
+    _count(hit)
+
+    if not hit:
+        data = await compute()
+        if store:
+            await cache.aset(key, data, settings.FINANCE_REPORT_CACHE_TIMEOUT)
+    return data, hit
+
+
+def stats():
+    """Hit and miss counters of the report cache in this process."""
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,53 @@
+"""Per-user cache of owned categories, so validating a write needs no category query.
+
+The cache maps category id -> (category_type, name) and is dropped whenever one of the
+user's categories is saved or deleted (see signals.py).
+"""
+from django.conf import settings
+from .caching import get_cache
+from .models import Category
+
+
+def _key(user_id):
+    return f'finance:categories:{user_id}'
+
+
+def owned_categories(user_id):
+    """{id: (category_type, name)} of every category of `user_id`, loaded with one query on a miss."""
+    cache = get_cache()
+    categories = cache.get(_key(user_id))
+    if categories is None:
+        categories = {
+            pk: (category_type, name)
+            for pk, category_type, name in Category.objects.filter(user_id=user_id).values_list('id', 'category_type', 'name')
+        }
+        cache.set(_key(user_id), categories, settings.FINANCE_CATEGORY_CACHE_TIMEOUT)
+    return categories
+
+
+def as_instance(user_id, pk, category_type, name):
+    """A Category usable as a foreign key value and for its type and name, built without a query."""
+    category = Category(pk=pk, user_id=user_id, category_type=category_type, name=name)
+    category._state.adding = False
+    category._state.db = 'default'
+    return category
+
+
+def owned_category(user_id, pk):
+    """The category `pk` if `user_id` owns it, else None."""
+    entry = owned_categories(user_id).get(pk)
+    if entry is None:
+        # Covers a category created since the map was cached by another process.
+        category = Category.objects.filter(pk=pk, user_id=user_id).first()
+        if category is not None:
+            forget(user_id)
+        return category
+    return as_instance(user_id, pk, *entry)
+
+
+def owned_instances(user_id):
+    return {pk: as_instance(user_id, pk, *entry) for pk, entry in owned_categories(user_id).items()}
+
+
+def forget(user_id):
+    get_cache().delete(_key(user_id))
@@ -0,0 +1,52 @@
+import hashlib
+import time
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from . import caching, replicas
+
+
+class ConditionalGetMixin:
+    """ETag and Last-Modified validation for the list and detail routes of a per-user viewset.
+
+    Validators come from the user's collection version in the cache (see
+    caching.collection_version), so a 304 is answered without touching the database.
+    Any change to one of the user's rows invalidates every page and detail of the collection.
+    Last-Modified has one-second resolution, so clients should prefer If-None-Match: while
+    the version's second is still running, a later write in it would keep the same
+    Last-Modified, so If-Modified-Since is not answered with a 304 and the second before
+    is advertised instead.
+    Both routes read from a replica when one is configured (see finance.replicas); a
+    response from one that may miss the user's last write carries no validators.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_get(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_get(request, super().retrieve, *args, **kwargs)
+
+    def conditional_get(self, request, view, *args, **kwargs):
+        collection = self.get_serializer_class().Meta.model._meta.model_name
+        version = caching.collection_version(request.user.id, collection)
+        etag = '"%s"' % hashlib.md5(
+            f'{request.user.id}:{collection}:{version}:{kwargs.get(self.lookup_field, "")}:'
+            f'{caching.normalize_params(request.query_params)}'.encode()
+        ).hexdigest()
+        last_modified = version // 10 ** 9
+        second_over = last_modified < int(time.time())
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified if second_over else None)
+        if response is None:
+            alias, settled = replicas.read_route(request.user.id)
+            with replicas.reading_from(alias):
+                response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            if not settled:
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified if second_over else last_modified - 1)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
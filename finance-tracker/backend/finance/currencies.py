@@ -0,0 +1,94 @@
+"""Currency codes, exchange rates and amounts converted into a report currency.
+
+Reports convert inside the grouped SQL: every row's amount is multiplied by the latest
+rate of its currency on or before the row's date, read by a correlated subquery that
+seeks on the exchange_rate_unique_day index. rate() is the in-process counterpart for the
+few amounts converted in Python, memoized per (date, pair) and rates version, so rates
+loaded by any process replace the memoized ones everywhere.
+"""
+import re
+import threading
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, When
+from .models import ExchangeRate
+from . import caching
+
+
+CURRENCY_CODE = re.compile(r'^[A-Z]{3}$')
+
+CONVERTED_AMOUNT = DecimalField(max_digits=20, decimal_places=2)
+
+CENT = Decimal('0.01')
+
+
+def is_code(value):
+    return isinstance(value, str) and bool(CURRENCY_CODE.match(value))
+
+
+def rate_lookup(currency_field, date_field, target):
+    """Subquery for the latest `currency_field` -> `target` rate on or before `date_field` of the outer row."""
+    return Subquery(
+        ExchangeRate.objects
+        .filter(base=OuterRef(currency_field), quote=target, date__lte=OuterRef(date_field))
+        .order_by('-date')
+        .values('rate')[:1]
+    )
+
+
+def converted(amount_field, currency_field, date_field, target):
+    """`amount_field` in `target`; NULL (and so left out of sums) when no rate is loaded for the row."""
+    return Case(
+        When(**{currency_field: target}, then=F(amount_field)),
+        default=F(amount_field) * rate_lookup(currency_field, date_field, target),
+        output_field=CONVERTED_AMOUNT,
+    )
+
+
+_rates = {}
+_rates_lock = threading.Lock()
+
+
+def rate(base, quote, on):
+    """Units of `quote` per unit of `base` on date `on`, or None without a rate on or before it."""
+    if base == quote:
+        return Decimal('1')
+
+    key = (caching.rates_version(), on, base, quote)
+    now = time.monotonic()
+    with _rates_lock:
+        cached = _rates.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    value = (
+        ExchangeRate.objects
+        .filter(base=base, quote=quote, date__lte=on)
+        .order_by('-date')
+        .values_list('rate', flat=True)
+        .first()
+    )
+    with _rates_lock:
+        if len(_rates) >= settings.FINANCE_RATE_CACHE_SIZE:
+            # Drop expired entries first, then everything if still full.
+            for expired in [key for key, (expires, _rate) in _rates.items() if expires <= now]:
+                del _rates[expired]
+            if len(_rates) >= settings.FINANCE_RATE_CACHE_SIZE:
+                _rates.clear()
+        _rates[key] = (now + settings.FINANCE_RATE_CACHE_SECONDS, value)
+    return value
+
+
+def convert(amount, base, quote, on):
+    """`amount` of `base` in `quote`, rounded to cents, or None without a rate."""
+    factor = rate(base, quote, on)
+    if factor is None:
+        return None
+    return (amount * factor).quantize(CENT)
+
+
+def forget_rates():
+    """Drop the memoized rates, e.g. after loading new ones."""
+    with _rates_lock:
+        _rates.clear()
@@ -0,0 +1,55 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+EXPORT_FIELDS = ['id', 'date', 'category', 'category__name', 'category__category_type', 'amount', 'description', 'budget', 'currency']
+EXPORT_HEADER = ['id', 'date', 'category', 'category_name', 'category_type', 'amount', 'description', 'budget', 'currency']
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class PassthroughRenderer(BaseRenderer):
+    """Lets streaming endpoints accept any Accept header; the view builds the body itself.
+
+    Only error responses reach render(), and those are written out as JSON.
+    """
+    media_type = '*/*'
+    format = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder)
+
+
+class Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=2000):
+    """Stream `queryset` as plain tuples, holding at most one chunk in memory."""
+    return queryset.order_by('date', 'id').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_HEADER)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_HEADER, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+FORMATS = {
+    'csv': csv_lines,
+    'ndjson': ndjson_lines,
+}
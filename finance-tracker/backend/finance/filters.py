@@ -0,0 +1,32 @@
+from django.utils.dateparse import parse_date
+from .search import search_transactions
+
+
+def filter_transactions(queryset, params):
+    """Apply the TransactionViewSet query parameters to a Transaction queryset."""
+    # Filtering by category (optional)
+    category = params.get('category', None)
+    if category:
+        queryset = queryset.filter(category_id=category)
+
+    # Filtering by transaction type (optional)
+    category_type = params.get('category_type', None)
+    if category_type:
+        queryset = queryset.filter(category__category_type=category_type)
+
+    # Filtering by date range (optional)
+    start_date = params.get('start_date', None)
+    end_date = params.get('end_date', None)
+    if start_date:
+        start_date = parse_date(start_date)
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date:
+        end_date = parse_date(end_date)
+        queryset = queryset.filter(date__lte=end_date)
+
+    # Full-text search on the description, ordered by relevance (optional)
+    search = params.get('q', None)
+    if search:
+        queryset = search_transactions(queryset, search)
+
+    return queryset
@@ -0,0 +1,203 @@
+"""Cash-flow forecast: daily per-category totals projected forward with NumPy.
+
+Every category is projected at once from a (categories x days) matrix of its recent
+history: a deseasonalized moving average of the last FINANCE_FORECAST_WINDOW_DAYS,
+scaled by a month-of-year factor once there is a year of history. The history read is
+one grouped query capped at FINANCE_FORECAST_HISTORY_DAYS, so the cost of a forecast is
+bounded no matter how many years of data a user has.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from .models import Budget, SavingsGoal
+from . import reports
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+CENT = Decimal('0.01')
+
+
+def as_money(value):
+    return Decimal(str(round(float(value), 2))).quantize(CENT)
+
+
+def validate_months(months):
+    try:
+        months = int(months)
+    except (TypeError, ValueError):
+        months = 0
+    if not 1 <= months <= settings.FINANCE_FORECAST_MAX_MONTHS:
+        raise ValidationError({'months': f"Months must be between 1 and {settings.FINANCE_FORECAST_MAX_MONTHS}."})
+    return months
+
+
+def days_between(first, last):
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+
+def end_of_month_ahead(day, months):
+    """Last day of the month `months` months after the month of `day`."""
+    month = day.month + months
+    return date(day.year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+
+
+def history(user, currency, today):
+    """(categories, matrix, days): daily totals of each category over the history window.
+
+    `categories` lists (id, category_type) in matrix row order.
+    """
+    first = today - timedelta(days=settings.FINANCE_FORECAST_HISTORY_DAYS - 1)
+    params = {'start_date': str(first), 'end_date': str(today), 'currency': currency}
+    source = reports.report_source(user, params, 'day')
+    rows = list(
+        source.queryset
+        .values(source.date_field, 'category', 'category__category_type')
+        .annotate(total=Sum(source.amount_field))
+        .order_by()
+    )
+
+    categories = sorted({(row['category'], row['category__category_type']) for row in rows})
+    # History starts at the user's first day with data; earlier zeros would read as seasonality.
+    if rows:
+        first = min(row[source.date_field] for row in rows)
+    days = days_between(first, today)
+
+    position = {category_id: row for row, (category_id, _category_type) in enumerate(categories)}
+    matrix = np.zeros((len(categories), len(days)))
+    for row in rows:
+        if row['total'] is not None:
+            matrix[position[row['category']], (row[source.date_field] - first).days] += float(row['total'])
+    return categories, matrix, days
+
+
+def month_indexes(days):
+    return np.array([day.month - 1 for day in days])
+
+
+def seasonal_factors(matrix, days):
+    """(categories x 12) ratio of each month-of-year's daily mean to the overall daily mean.
+
+    1 everywhere with less than a year of history, and for months without history.
+    """
+    factors = np.ones((matrix.shape[0], 12))
+    if len(days) < 365:
+        return factors
+
+    one_hot = month_indexes(days)[:, None] == np.arange(12)
+    day_counts = one_hot.sum(axis=0)
+    month_means = np.divide(matrix @ one_hot, day_counts, out=np.zeros_like(factors), where=day_counts > 0)
+    overall = matrix.mean(axis=1, keepdims=True)
+    covered = (day_counts > 0) & (overall > 0)
+    return np.divide(month_means, overall, out=factors, where=covered)
+
+
+def project(matrix, days, future_days):
+    """(categories x future days) forecast of daily totals."""
+    factors = seasonal_factors(matrix, days)
+    window = min(settings.FINANCE_FORECAST_WINDOW_DAYS, len(days))
+    recent = matrix[:, -window:]
+    recent_factors = factors[:, month_indexes(days[-window:])]
+    deseasonalized = np.divide(recent, recent_factors, out=np.zeros_like(recent), where=recent_factors > 0)
+    rate = deseasonalized.mean(axis=1, keepdims=True)
+    return rate * factors[:, month_indexes(future_days)]
+
+
+def forecast(user, params):
+    """Projected income, expense and balance per month, and the budgets and goals likely to be missed.
+
+    Budgets add the forecast of their category to what they have spent. Goals are assumed
+    to be funded from the projected surplus, earliest deadline first. With ?currency,
+    budgets and goals kept in other currencies are left out.
+    """
+    if np is None:
+        raise ValidationError({'detail': "Forecasting needs NumPy installed on the server."})
+
+    months = validate_months(params.get('months', 3))
+    currency = params.get('currency', None)
+    currency = reports.validate_currency(currency) if currency else None
+    today = timezone.localdate()
+    tomorrow = today + timedelta(days=1)
+    horizon = end_of_month_ahead(today, months)
+
+    categories, matrix, days = history(user, currency, today)
+    totals = reports.income_expense_totals(reports.report_source(user, {'currency': currency}))
+    starting_balance = totals['total_income'] - totals['total_expense']
+
+    budgets = Budget.objects.filter(user=user, end_date__gte=tomorrow).select_related('category').order_by('end_date', 'id')
+    goals = SavingsGoal.objects.filter(user=user, deadline__gte=tomorrow).order_by('deadline', 'id')
+    if currency:
+        budgets, goals = budgets.filter(currency=currency), goals.filter(currency=currency)
+    # Budgets and goals ending after the reported months are still judged, up to the longest forecast.
+    last_day = end_of_month_ahead(today, settings.FINANCE_FORECAST_MAX_MONTHS)
+    budgets = [budget for budget in budgets if budget.end_date <= last_day]
+    goals = [goal for goal in goals if goal.deadline <= last_day]
+    future_days = days_between(tomorrow, max([horizon] + [b.end_date for b in budgets] + [g.deadline for g in goals]))
+
+    daily = project(matrix, days, future_days)
+    income = np.array([category_type == 'income' for _category_id, category_type in categories], dtype=bool)
+    income_daily, expense_daily = daily[income].sum(axis=0), daily[~income].sum(axis=0)
+    net_cumulative = (income_daily - expense_daily).cumsum()
+    # A leading zero column makes the total of days [a, b] cumulative[b + 1] - cumulative[a].
+    cumulative = np.concatenate([np.zeros((len(categories), 1)), daily.cumsum(axis=1)], axis=1)
+    position = {category_id: row for row, (category_id, _category_type) in enumerate(categories)}
+
+    periods = []
+    balance = starting_balance
+    reported = np.array([day.year * 12 + day.month - 1 for day in days_between(tomorrow, horizon)])
+    for key in np.unique(reported):
+        in_month = np.flatnonzero(reported == key)
+        month_income, month_expense = as_money(income_daily[in_month].sum()), as_money(expense_daily[in_month].sum())
+        balance += month_income - month_expense
+        periods.append({
+            'period': str(date(int(key) // 12, int(key) % 12 + 1, 1)),
+            'total_income': month_income,
+            'total_expenses': month_expense,
+            'balance': balance,
+        })
+
+    budget_forecasts = []
+    for budget in budgets:
+        projected = budget.spent_amount
+        row = position.get(budget.category_id)
+        if row is not None:
+            first, last = (max(budget.start_date, tomorrow) - tomorrow).days, (budget.end_date - tomorrow).days
+            projected += as_money(cumulative[row, last + 1] - cumulative[row, first])
+        budget_forecasts.append({
+            'budget': budget.id,
+            'category': budget.category.name,
+            'end_date': budget.end_date,
+            'allocated_amount': budget.allocated_amount,
+            'spent_amount': budget.spent_amount,
+            'projected_spent_amount': projected,
+            'on_track': projected <= budget.allocated_amount,
+        })
+
+    goal_forecasts = []
+    committed = Decimal('0.00')
+    for goal in goals:
+        surplus = as_money(net_cumulative[(goal.deadline - tomorrow).days]) - committed
+        funded = min(max(surplus, Decimal('0.00')), max(goal.target_amount - goal.current_amount, Decimal('0.00')))
+        committed += funded
+        goal_forecasts.append({
+            'goal': goal.id,
+            'goal_name': goal.goal_name,
+            'deadline': goal.deadline,
+            'target_amount': goal.target_amount,
+            'current_amount': goal.current_amount,
+            'projected_amount': goal.current_amount + funded,
+            'on_track': goal.current_amount + funded >= goal.target_amount,
+        })
+
+    return {
+        'starting_balance': starting_balance,
+        'periods': periods,
+        'budgets': budget_forecasts,
+        'savings_goals': goal_forecasts,
+    }
@@ -0,0 +1,59 @@
+import csv
+import io
+from itertools import islice
+from django.db import transaction
+from .models import Budget, Transaction
+from . import categories
+from .serializers import TransactionImportSerializer
+from .signals import transactions_bulk_created
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_csv(upload, max_rows):
+    """Rows of an uploaded CSV file with a header line, with empty cells dropped.
+
+    Stops after max_rows + 1 rows, enough to tell that the file is over the limit.
+    Raises ValueError when the file is not UTF-8 text or not valid CSV.
+    """
+    text = io.TextIOWrapper(upload.file, encoding='utf-8-sig')
+    try:
+        return [
+            {key: value for key, value in row.items() if value not in ('', None)}
+            for row in islice(csv.DictReader(text), max_rows + 1)
+        ]
+    except UnicodeDecodeError:
+        raise ValueError("The file must be UTF-8 encoded text.")
+    except csv.Error as exc:
+        raise ValueError(f"The file is not valid CSV: {exc}.")
+
+
+def import_transactions(user, rows, batch_size):
+    """Validate `rows` in one pass and insert the valid ones with bulk_create.
+
+    Returns the number of created transactions and the errors of the rejected rows.
+    """
+    budget_ids = {_as_int(row.get('budget')) for row in rows if isinstance(row, dict)}
+    context = {
+        'categories': categories.owned_instances(user.id),
+        'budgets': Budget.objects.filter(user=user).in_bulk(budget_ids - {None}),
+    }
+
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        serializer = TransactionImportSerializer(data=row, context=context)
+        if serializer.is_valid():
+            valid.append(Transaction(user=user, **serializer.validated_data))
+        else:
+            errors.append({'row': index, 'errors': serializer.errors})
+
+    with transaction.atomic():
+        created = Transaction.objects.bulk_create(valid, batch_size=batch_size)
+        transactions_bulk_created(created)
+
+    return len(created), errors
@@ -0,0 +1,148 @@
+"""Database-backed job queue for reports and exports too slow to compute in a request.
+
+Jobs are claimed with a conditional UPDATE, so several run_workers processes can share
+the queue without row locks. A failed attempt is retried after an exponentially growing
+delay; a job whose worker died is requeued once FINANCE_JOB_TIMEOUT_SECONDS pass, until
+it has used up its attempts.
+"""
+import json
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+from .filters import filter_transactions
+from .models import Job, Transaction
+from . import exports, forecast, recurring, reports, savings
+
+
+logger = logging.getLogger('finance.jobs')
+
+INTERNAL_ERROR = "The job failed with an internal error."
+
+
+def run_export(user, params):
+    export_format = params.get('export_format', 'csv')
+    if export_format not in exports.FORMATS:
+        raise ValidationError({'export_format': f"Export format must be one of: {', '.join(exports.FORMATS)}."})
+
+    queryset = filter_transactions(Transaction.objects.filter(user=user), params)
+    rows = exports.export_rows(queryset, chunk_size=settings.FINANCE_EXPORT_CHUNK_SIZE)
+    content = ''.join(exports.FORMATS[export_format](rows)).encode()
+    return content, exports.CONTENT_TYPES[export_format], f'transactions.{export_format}'
+
+
+def trends_report(user, params):
+    timeframe, breakdown, start_date, end_date = reports.trends_options(params)
+    source = reports.report_source(user, params, timeframe)
+    rows = recurring.trend_rows_with_projection(user, params, source, timeframe, breakdown, start_date, end_date)
+    return {'trends': reports.build_trends(rows, timeframe, breakdown, start_date, end_date)}
+
+
+REPORTS = {
+    'income-expenses': lambda user, params: reports.income_expense_totals(reports.report_source(user, params)),
+    'income-expense-trends': trends_report,
+    'net-worth': lambda user, params: reports.net_worth(user, reports.report_source(user, params)),
+    'dashboard': reports.dashboard,
+    'forecast': forecast.forecast,
+    'savings-progress': savings.progress,
+}
+
+
+def run_report(user, params):
+    name = params.get('report')
+    if name not in REPORTS:
+        raise ValidationError({'report': f"Report must be one of: {', '.join(REPORTS)}."})
+    content = json.dumps(REPORTS[name](user, params), cls=JSONEncoder).encode()
+    return content, 'application/json', f'{name}.json'
+
+
+# Job kind -> function(user, params) returning (content, content_type, filename).
+KINDS = {
+    'export': run_export,
+    'report': run_report,
+}
+
+
+def submit(user, kind, params):
+    return Job.objects.create(user=user, kind=kind, params=params)
+
+
+def requeue_stale():
+    """Put back jobs whose worker stopped without finishing them; returns how many were requeued.
+
+    A job that has used all its attempts fails instead, so one that kills its worker is
+    not retried forever.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=settings.FINANCE_JOB_TIMEOUT_SECONDS))
+    stale.filter(attempts__gte=settings.FINANCE_JOB_MAX_ATTEMPTS).update(
+        status=Job.FAILED, error="The worker stopped while running the job.", locked_at=None, finished_at=now
+    )
+    return stale.update(status=Job.QUEUED, locked_at=None)
+
+
+def claim(limit):
+    """Ids of up to `limit` due jobs, each marked running by exactly one caller."""
+    now = timezone.now()
+    candidates = (
+        Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+        .order_by('run_after', 'id').values_list('id', flat=True)[:limit]
+    )
+    claimed = []
+    for job_id in candidates:
+        # Only one worker's UPDATE can still see the job as queued.
+        if Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_at=now, attempts=F('attempts') + 1
+        ):
+            claimed.append(job_id)
+            if len(claimed) == limit:
+                break
+    return claimed
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=settings.FINANCE_JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1))
+
+
+def run(job_id):
+    """Run one claimed job and store its result or the outcome of the failed attempt."""
+    job = Job.objects.select_related('user').get(pk=job_id)
+    try:
+        content, content_type, filename = KINDS[job.kind](job.user, job.params)
+    except ValidationError as exc:
+        # Bad parameters fail the same way every time; do not retry.
+        Job.objects.filter(pk=job_id).update(
+            status=Job.FAILED, error=json.dumps(exc.detail), locked_at=None, finished_at=timezone.now()
+        )
+        return Job.FAILED
+    except Exception:
+        # The traceback goes to the log only; the error field is shown to the job's owner.
+        logger.exception("Job %s (%s) failed on attempt %s", job.pk, job.kind, job.attempts)
+        if job.attempts < settings.FINANCE_JOB_MAX_ATTEMPTS:
+            Job.objects.filter(pk=job_id).update(
+                status=Job.QUEUED, error=INTERNAL_ERROR, locked_at=None,
+                run_after=timezone.now() + retry_delay(job.attempts)
+            )
+            return Job.QUEUED
+        Job.objects.filter(pk=job_id).update(
+            status=Job.FAILED, error=INTERNAL_ERROR, locked_at=None, finished_at=timezone.now()
+        )
+        return Job.FAILED
+
+    Job.objects.filter(pk=job_id).update(
+        status=Job.SUCCEEDED, result=content, content_type=content_type, filename=filename,
+        error='', locked_at=None, finished_at=timezone.now()
+    )
+    return Job.SUCCEEDED
+
+
+def run_in_worker(job_id):
+    """Entry point in a pool process: run the job, then release the process's connections."""
+    try:
+        return run(job_id)
+    finally:
+        connections.close_all()
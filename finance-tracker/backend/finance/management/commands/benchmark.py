@@ -0,0 +1,43 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from finance import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic users into a throwaway test database, time every API endpoint and "
+        "record its query count. Optionally compare against a stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help="Transactions per synthetic user.")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed requests per endpoint.")
+        parser.add_argument('--output', help="Write the results as JSON to this file.")
+        parser.add_argument('--baseline', help="JSON results of an earlier run to compare against.")
+        parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative latency growth over the baseline.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            results = benchmarks.run(options['sizes'], repeat=options['repeat'], log=self.stdout.write)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        failures = benchmarks.growing_query_counts(results)
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                failures += benchmarks.compare(results, json.load(baseline), options['tolerance'])
+
+        if failures:
+            raise CommandError("Benchmark regressions:\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("No benchmark regressions."))
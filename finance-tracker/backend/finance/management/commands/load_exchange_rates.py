@@ -0,0 +1,46 @@
+import csv
+from decimal import Decimal, InvalidOperation
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from finance import caching, currencies
+from finance.models import ExchangeRate
+
+
+class Command(BaseCommand):
+    help = (
+        "Load exchange rates from a CSV file with a date,base,quote,rate header, where rate is "
+        "the units of quote one unit of base buys. Rates already loaded for a day are replaced."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file to read.")
+        parser.add_argument('--inverse', action='store_true', help="Also store quote -> base as 1 / rate.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rates written per round-trip.")
+
+    def read(self, path, inverse):
+        with open(path, newline='', encoding='utf-8-sig') as handle:
+            for line, row in enumerate(csv.DictReader(handle), start=2):
+                try:
+                    day = parse_date(row['date'])
+                    base, quote = row['base'].strip().upper(), row['quote'].strip().upper()
+                    rate = Decimal(row['rate'])
+                except (KeyError, AttributeError, ValueError, InvalidOperation):
+                    raise CommandError(f"Line {line}: expected date,base,quote,rate values.")
+                if day is None or not (currencies.is_code(base) and currencies.is_code(quote)) or rate <= 0:
+                    raise CommandError(f"Line {line}: invalid date, currency code or rate.")
+
+                yield ExchangeRate(date=day, base=base, quote=quote, rate=rate)
+                if inverse:
+                    yield ExchangeRate(date=day, base=quote, quote=base, rate=(1 / rate).quantize(Decimal('1e-8')))
+
+    def handle(self, *args, **options):
+        rates = list(self.read(options['path'], options['inverse']))
+        with transaction.atomic():
+            ExchangeRate.objects.bulk_create(
+                rates, batch_size=options['batch_size'], update_conflicts=True,
+                unique_fields=['base', 'quote', 'date'], update_fields=['rate'],
+            )
+        caching.bump_rates_version()
+        currencies.forget_rates()
+        self.stdout.write(self.style.SUCCESS(f"Loaded {len(rates)} exchange rate(s)."))
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from types import ModuleType
+from urllib.parse import urlencode
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import include, path
+from rest_framework_simplejwt.tokens import RefreshToken
+from finance import benchmarks
+from finance.urls import api_urlpatterns
+
+
+REPORT_PATHS = [
+    ('/api/reports/income-expenses/', {}),
+    ('/api/reports/income-expense-trends/', {'timeframe': 'month'}),
+    ('/api/reports/net-worth/', {}),
+]
+
+
+async def asgi_get(application, url, params, token):
+    """Send one GET straight through the ASGI application and return (status, seconds)."""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': url, 'raw_path': url.encode(), 'query_string': urlencode(params).encode(), 'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'authorization', f'Bearer {token}'.encode())],
+        'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    finished = asyncio.Event()
+    status = {}
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # Like a real client, only disconnect once the whole response has arrived.
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status['code'] = message['status']
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            finished.set()
+
+    started = time.perf_counter()
+    await application(scope, receive, send)
+    return status.get('code'), time.perf_counter() - started
+
+
+async def drive(application, token, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index):
+        url, params = REPORT_PATHS[index % len(REPORT_PATHS)]
+        async with semaphore:
+            return await asgi_get(application, url, params, token)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(index) for index in range(total)))
+    return results, time.perf_counter() - started
+
+
+def run_with_timeout(coroutine, seconds):
+    """Run `coroutine` on a new event loop, giving up after `seconds`.
+
+    The loop's executors are not joined on the way out, so worker threads stuck in the
+    database cannot keep the command waiting after a timeout.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(asyncio.wait_for(coroutine, seconds))
+    except asyncio.TimeoutError:
+        raise CommandError(f"The load test did not finish within {seconds} seconds.")
+    finally:
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.wait(pending, timeout=5))
+        loop.close()
+
+
+def use_file_databases(directory):
+    """Point every test database at a file in `directory`.
+
+    SQLite test databases are shared-cache in-memory ones by default. Their table locks
+    are not covered by the busy timeout, so the per-request connections of the ASGI
+    handler could block each other for good.
+    """
+    for connection in connections.all():
+        if connection.vendor == 'sqlite':
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(directory, f'{connection.alias}.sqlite3')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare report throughput of the sync DRF views and the async views under core/asgi.py, "
+        "using a throwaway test database seeded with synthetic transactions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=10000, help="Transactions of the synthetic user.")
+        parser.add_argument('--requests', type=int, default=300, help="Requests per mode.")
+        parser.add_argument('--concurrency', type=int, default=20, help="Requests in flight at once.")
+        parser.add_argument('--cached', action='store_true', help="Let the report cache answer repeated requests.")
+        parser.add_argument('--timeout', type=float, default=300, help="Seconds each mode may take before the run fails.")
+
+    def handle(self, *args, **options):
+        from core.asgi import application
+
+        directory = tempfile.TemporaryDirectory()
+        use_file_databases(directory.name)
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            user = benchmarks.seed(options['size'])
+            token = str(RefreshToken.for_user(user).access_token)
+
+            for mode, async_reports in (('sync', False), ('async', True)):
+                urlconf = ModuleType(f'loadtest_{mode}_urls')
+                urlconf.urlpatterns = [path('api/', include(api_urlpatterns(async_reports)))]
+                timeout = None if options['cached'] else 0
+                with override_settings(ROOT_URLCONF=urlconf, FINANCE_REPORT_CACHE_TIMEOUT=timeout):
+                    results, elapsed = run_with_timeout(
+                        drive(application, token, options['requests'], options['concurrency']), options['timeout']
+                    )
+
+                failures = sum(1 for code, _seconds in results if code != 200)
+                latencies = sorted(seconds * 1000 for _code, seconds in results)
+                self.stdout.write(
+                    f"{mode:>5}: {len(results) / elapsed:8.1f} req/s, "
+                    f"median {statistics.median(latencies):.1f}ms, "
+                    f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f}ms, {failures} failed"
+                )
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+            directory.cleanup()
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from finance import recurring
+
+
+class Command(BaseCommand):
+    help = "Create the transactions of every recurring schedule occurrence due by today (or --date)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Materialize occurrences up to this YYYY-MM-DD date instead of today.")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Schedules handled per database transaction.")
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            today = parse_date(options['date'])
+            if today is None:
+                raise CommandError("--date must be a YYYY-MM-DD date.")
+
+        created = recurring.materialize(today, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Created {created} transaction(s)."))
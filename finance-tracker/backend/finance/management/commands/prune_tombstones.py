@@ -0,0 +1,18 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from finance import sync
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones past the retention window and those of deleted users."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.FINANCE_SYNC_TOMBSTONE_DAYS, help="Keep tombstones this many days."
+        )
+
+    def handle(self, *args, **options):
+        deleted = sync.prune(timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstone(s)."))
@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from finance import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily and monthly transaction rollups from the transactions table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help="Only rebuild this user id (repeatable).")
+        parser.add_argument('--users-per-batch', type=int, default=100, help="Users rebuilt per database transaction.")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Rows read and inserted per round-trip.")
+
+    def handle(self, *args, **options):
+        user_ids = options['users'] or User.objects.order_by('id').values_list('id', flat=True)
+        user_ids = list(user_ids)
+        batch_size = options['users_per_batch']
+
+        for offset in range(0, len(user_ids), batch_size):
+            batch = user_ids[offset:offset + batch_size]
+            rollups.rebuild(batch, chunk_size=options['chunk_size'])
+            self.stdout.write(f"Rebuilt rollups for {offset + len(batch)}/{len(user_ids)} users.")
+
+        self.stdout.write(self.style.SUCCESS("Rollups rebuilt."))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from finance import balances, caching
+from finance.models import Budget
+
+
+class Command(BaseCommand):
+    help = "Find budgets whose spent_amount/transaction_count drifted from their transactions, and optionally repair them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Write the recomputed totals back.")
+        parser.add_argument('--user', type=int, action='append', dest='users', help="Only check this user id (repeatable).")
+        parser.add_argument('--batch-size', type=int, default=500, help="Budgets updated per query.")
+
+    def handle(self, *args, **options):
+        budgets = Budget.objects.all()
+        if options['users']:
+            budgets = budgets.filter(user_id__in=options['users'])
+
+        batch, found, users = [], 0, set()
+        for budget in balances.drifted(budgets).order_by('id').iterator(chunk_size=options['batch_size']):
+            found += 1
+            self.stdout.write(
+                f"Budget {budget.id}: stored {budget.spent_amount}/{budget.transaction_count}, "
+                f"actual {budget.actual_amount}/{budget.actual_count}"
+            )
+            if options['fix']:
+                budget.spent_amount, budget.transaction_count = budget.actual_amount, budget.actual_count
+                budget.updated_at = timezone.now()
+                batch.append(budget)
+                users.add(budget.user_id)
+                if len(batch) >= options['batch_size']:
+                    Budget.objects.bulk_update(batch, [*Budget.COUNTER_FIELDS, 'updated_at'])
+                    batch = []
+
+        if batch:
+            Budget.objects.bulk_update(batch, [*Budget.COUNTER_FIELDS, 'updated_at'])
+        for user_id in users:
+            caching.bump_version(user_id)
+            caching.touch_collection(user_id, 'budget')
+
+        verb = "Repaired" if options['fix'] else "Found"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {found} drifted budget(s)."))
@@ -0,0 +1,94 @@
+import multiprocessing
+import signal
+import time
+import django
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from finance import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued report and export jobs in a pool of worker processes until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.FINANCE_JOB_CONCURRENCY, help="Worker processes."
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.FINANCE_JOB_POLL_SECONDS,
+            help="Seconds between queue checks while idle."
+        )
+        parser.add_argument('--once', action='store_true', help="Exit once no job is due instead of waiting for more.")
+        parser.add_argument(
+            '--inline', action='store_true', help="Run jobs one by one in this process (for debugging and tests)."
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+
+        if options['inline']:
+            self.run_inline(options)
+            return
+
+        # Spawned workers set Django up from scratch instead of inheriting this process's
+        # connections; django.setup must run before any finance module is unpickled.
+        context = multiprocessing.get_context('spawn')
+        finished = False
+        while not finished and not self.stopping:
+            pool = ProcessPoolExecutor(options['concurrency'], mp_context=context, initializer=django.setup)
+            try:
+                finished = self.run_pool(pool, options)
+            except BrokenProcessPool:
+                # A worker was killed (segfault, OOM): the pool is unusable and the jobs it was
+                # running are left to requeue_stale(), as are claimed jobs not yet submitted.
+                self.stderr.write("A worker process died; starting a new pool.")
+            finally:
+                pool.shutdown(cancel_futures=True)
+
+    def run_pool(self, pool, options):
+        """Feed claimed jobs to `pool` until stopped, or idle with --once; True once done."""
+        running = {}
+        while not self.stopping:
+            jobs.requeue_stale()
+            for job_id in jobs.claim(options['concurrency'] - len(running)):
+                running[pool.submit(jobs.run_in_worker, job_id)] = job_id
+            connections.close_all()
+
+            if not running:
+                if options['once']:
+                    return True
+                time.sleep(options['poll_interval'])
+                continue
+
+            done, _pending = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+            for future in done:
+                self.report(running.pop(future), future)
+        return True
+
+    def run_inline(self, options):
+        while not self.stopping:
+            jobs.requeue_stale()
+            claimed = jobs.claim(1)
+            if not claimed:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+            self.stdout.write(f"Job {claimed[0]}: {jobs.run(claimed[0])}")
+
+    def report(self, job_id, future):
+        try:
+            self.stdout.write(f"Job {job_id}: {future.result()}")
+        except BrokenProcessPool:
+            # The worker process itself died; the job is requeued once it counts as stale.
+            self.stderr.write(f"Job {job_id}: its worker process died")
+            raise
+        except Exception as exc:
+            self.stderr.write(f"Job {job_id}: worker error {exc!r}")
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,85 @@
+import math
+import threading
+from . import caching
+
+
+DURATION_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, math.inf)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, math.inf)
+SIZE_BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, math.inf)
+
+METRICS = {
+    'finance_request_duration_ms': ('Wall time of a request in milliseconds.', DURATION_BUCKETS_MS),
+    'finance_request_db_time_ms': ('Time spent in database queries per request in milliseconds.', DURATION_BUCKETS_MS),
+    'finance_request_queries': ('Database queries run per request.', QUERY_BUCKETS),
+    'finance_response_size_bytes': ('Size of the response body in bytes.', SIZE_BUCKETS_BYTES),
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed memory footprint."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Histograms per (metric, url name) for this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+
+    def observe(self, view, **values):
+        with self.lock:
+            for metric, value in values.items():
+                key = (metric, view)
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(METRICS[metric][1])
+                self.histograms[key].observe(value)
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+
+    def render(self):
+        """The histograms and report cache counters in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            for metric, (help_text, _buckets) in METRICS.items():
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} histogram')
+                for (name, view), histogram in sorted(self.histograms.items()):
+                    if name != metric:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == math.inf else format_number(bound)
+                        lines.append(f'{metric}_bucket{{view="{view}",le="{le}"}} {cumulative}')
+                    lines.append(f'{metric}_sum{{view="{view}"}} {format_number(histogram.sum)}')
+                    lines.append(f'{metric}_count{{view="{view}"}} {histogram.count}')
+
+        cache_stats = caching.stats()
+        for outcome in ('hits', 'misses'):
+            lines.append(f'# HELP finance_report_cache_{outcome}_total Report cache {outcome} in this process.')
+            lines.append(f'# TYPE finance_report_cache_{outcome}_total counter')
+            lines.append(f'finance_report_cache_{outcome}_total {cache_stats[outcome]}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_number(value):
+    return str(int(value)) if float(value).is_integer() else f'{value:.3f}'
+
+
+registry = Registry()
@@ -0,0 +1,124 @@
+import heapq
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from .metrics import registry
+
+
+logger = logging.getLogger('finance.metrics')
+
+# The recorder of the request being served. Context variables follow the request into
+# sync_to_async threads, so queries of async views are attributed correctly too.
+_current_recorder = ContextVar('finance_query_recorder', default=None)
+
+
+class QueryRecorder:
+    """Times every query of one request and keeps only the slowest few statements."""
+
+    def __init__(self, keep):
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest = []
+
+    def add(self, elapsed_ms, sql):
+        with self.lock:
+            self.count += 1
+            self.total_ms += elapsed_ms
+            entry = (elapsed_ms, self.count, sql)
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, entry)
+            else:
+                heapq.heappushpop(self.slowest, entry)
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper installed on every connection; a no-op outside a measured request."""
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.add((time.perf_counter() - started) * 1000, sql)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class RequestMetricsMiddleware:
+    """Record wall time, database time, query count and response size per URL name.
+
+    Streaming responses are measured up to the point the response starts; queries run
+    while the body streams are not counted.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(None, connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        recorder, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        self.finish(request, response, recorder, started)
+        return response
+
+    async def __acall__(self, request):
+        recorder, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        self.finish(request, response, recorder, started)
+        return response
+
+    def start(self):
+        recorder = QueryRecorder(keep=settings.FINANCE_SLOW_REQUEST_TOP_QUERIES)
+        return recorder, _current_recorder.set(recorder), time.perf_counter()
+
+    def finish(self, request, response, recorder, started):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match and match.url_name else 'unresolved'
+        size = 0 if response.streaming else len(response.content)
+
+        registry.observe(
+            view,
+            finance_request_duration_ms=elapsed_ms,
+            finance_request_db_time_ms=recorder.total_ms,
+            finance_request_queries=recorder.count,
+            finance_response_size_bytes=size,
+        )
+
+        if elapsed_ms >= settings.FINANCE_SLOW_REQUEST_MS:
+            worst = '\n'.join(
+                f'  {duration:.1f}ms {sql}' for duration, _order, sql in sorted(recorder.slowest, reverse=True)
+            )
+            logger.warning(
+                "Slow request %s %s (%s): %.1fms, %d queries, %.1fms in the database\n%s",
+                request.method, request.path, view, elapsed_ms, recorder.count, recorder.total_ms, worst
+            )
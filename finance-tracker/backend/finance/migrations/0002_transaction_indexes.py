@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'date', 'category', 'amount'], name='txn_user_date_cover_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'category', 'date'], name='txn_user_category_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['budget', 'date'], name='txn_budget_date_idx'),
+        ),
+    ]
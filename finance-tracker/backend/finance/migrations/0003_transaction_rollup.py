@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncMonth
+
+
+def backfill_rollups(apps, schema_editor):
+    Transaction = apps.get_model('finance', 'Transaction')
+    TransactionRollup = apps.get_model('finance', 'TransactionRollup')
+
+    for granularity, trunc in (('day', TruncDay), ('month', TruncMonth)):
+        rows = (
+            Transaction.objects
+            .annotate(period=trunc('date'))
+            .values('user_id', 'category_id', 'period')
+            .annotate(period_total=Sum('amount'), period_count=Count('id'))
+            .order_by()
+        )
+        TransactionRollup.objects.bulk_create((
+            TransactionRollup(
+                user_id=row['user_id'], category_id=row['category_id'], granularity=granularity,
+                period_start=row['period'], total=row['period_total'], count=row['period_count']
+            ) for row in rows.iterator(chunk_size=1000)
+        ), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0002_transaction_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('granularity', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='finance.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'granularity', 'period_start', 'category'), name='rollup_unique_period')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
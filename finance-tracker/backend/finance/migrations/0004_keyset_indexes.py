@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_transaction_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='budget',
+            index=models.Index(fields=['user', '-start_date', '-id'], name='budget_user_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savingsgoal',
+            index=models.Index(fields=['user', 'deadline', 'id'], name='goal_user_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', '-date', '-id'], name='txn_user_keyset_idx'),
+        ),
+    ]
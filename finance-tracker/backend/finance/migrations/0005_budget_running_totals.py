@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:32
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    Budget = apps.get_model('finance', 'Budget')
+    Transaction = apps.get_model('finance', 'Transaction')
+
+    linked = Transaction.objects.filter(budget=OuterRef('pk')).values('budget')
+    Budget.objects.update(
+        spent_amount=Coalesce(
+            Subquery(linked.annotate(total=Sum('amount')).values('total')),
+            Value(0, output_field=DecimalField(max_digits=14, decimal_places=2))
+        ),
+        transaction_count=Coalesce(Subquery(linked.annotate(total=Count('id')).values('total')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0004_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budget',
+            name='spent_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='transaction_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0007_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=32)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='budget',
+            index=models.Index(fields=['user', 'updated_at'], name='budget_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['user', 'updated_at'], name='category_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='savingsgoal',
+            index=models.Index(fields=['user', 'updated_at'], name='goal_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'updated_at'], name='txn_user_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ),
+    ]
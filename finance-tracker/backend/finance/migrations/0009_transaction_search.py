@@ -0,0 +1,64 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+# External-content FTS5 index over finance_transaction.description, kept current by triggers
+# so bulk_create and queryset updates are covered as well as save() and delete().
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE finance_transaction_fts USING fts5("
+    "description, content='finance_transaction', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER finance_transaction_fts_insert AFTER INSERT ON finance_transaction BEGIN "
+    "INSERT INTO finance_transaction_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER finance_transaction_fts_delete AFTER DELETE ON finance_transaction BEGIN "
+    "INSERT INTO finance_transaction_fts(finance_transaction_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER finance_transaction_fts_update AFTER UPDATE OF description ON finance_transaction BEGIN "
+    "INSERT INTO finance_transaction_fts(finance_transaction_fts, rowid, description) "
+    "VALUES ('delete', old.id, old.description); "
+    "INSERT INTO finance_transaction_fts(rowid, description) VALUES (new.id, new.description); END",
+    "INSERT INTO finance_transaction_fts(finance_transaction_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS finance_transaction_fts_update",
+    "DROP TRIGGER IF EXISTS finance_transaction_fts_delete",
+    "DROP TRIGGER IF EXISTS finance_transaction_fts_insert",
+    "DROP TABLE IF EXISTS finance_transaction_fts",
+]
+
+POSTGRES_INDEX_NAME = 'txn_description_search_idx'
+
+
+def postgres_index():
+    # Must match the expression finance.search builds, or PostgreSQL will not use the index.
+    return GinIndex(SearchVector('description', config='english'), name=POSTGRES_INDEX_NAME)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_CREATE:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('finance', 'Transaction'), postgres_index())
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_DROP:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('finance', 'Transaction'), postgres_index())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0008_delta_sync'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:12
+
+import importlib
+from django.conf import settings
+from django.db import migrations, models
+
+
+search = importlib.import_module('finance.migrations.0009_transaction_search')
+
+
+# SQLite applies these changes by rebuilding finance_transaction, which drops the full-text
+# search triggers, so the search index is taken down first and rebuilt at the end.
+def drop_sqlite_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        search.drop_search_index(apps, schema_editor)
+
+
+def create_sqlite_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        search.create_search_index(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0010_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_sqlite_search_index, create_sqlite_search_index),
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('base', models.CharField(max_length=3)),
+                ('quote', models.CharField(max_length=3)),
+                ('rate', models.DecimalField(decimal_places=8, max_digits=18)),
+            ],
+        ),
+        migrations.RemoveConstraint(
+            model_name='transactionrollup',
+            name='rollup_unique_period',
+        ),
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='txn_user_date_cover_idx',
+        ),
+        migrations.AddField(
+            model_name='budget',
+            name='currency',
+            field=models.CharField(default='USD', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='savingsgoal',
+            name='currency',
+            field=models.CharField(default='USD', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='currency',
+            field=models.CharField(default='USD', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='transactionrollup',
+            name='currency',
+            field=models.CharField(default='USD', max_length=3),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'date', 'category', 'amount', 'currency'], name='txn_user_date_cover_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='transactionrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'granularity', 'period_start', 'category', 'currency'), name='rollup_unique_period'),
+        ),
+        migrations.AddConstraint(
+            model_name='exchangerate',
+            constraint=models.UniqueConstraint(fields=('base', 'quote', 'date'), name='exchange_rate_unique_day'),
+        ),
+        migrations.RunPython(create_sqlite_search_index, drop_sqlite_search_index),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0011_currencies'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('currency', models.CharField(default='USD', max_length=3)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly'), ('yearly', 'Yearly')], max_length=7)),
+                ('interval', models.PositiveIntegerField(default=1)),
+                ('start_date', models.DateField()),
+                ('until', models.DateField(blank=True, null=True)),
+                ('count', models.PositiveIntegerField(blank=True, null=True)),
+                ('next_date', models.DateField(blank=True, null=True)),
+                ('last_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('budget', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='finance.budget')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='finance.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='recurring',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='finance.recurringtransaction'),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('recurring__isnull', False)), fields=('recurring', 'date'), name='txn_recurring_date_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='recurringtransaction',
+            index=models.Index(fields=['next_date'], name='recurring_next_date_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def open_ledgers(apps, schema_editor):
+    """Give every goal a starting contribution of its current amount, so its ledger adds up."""
+    SavingsGoal = apps.get_model('finance', 'SavingsGoal')
+    SavingsContribution = apps.get_model('finance', 'SavingsContribution')
+
+    goals = SavingsGoal.objects.exclude(current_amount=0).only('user_id', 'current_amount', 'updated_at')
+    SavingsContribution.objects.bulk_create(
+        (
+            SavingsContribution(
+                user_id=goal.user_id, goal_id=goal.pk, amount=goal.current_amount,
+                date=goal.updated_at.date(), note="Starting amount",
+            )
+            for goal in goals.iterator(chunk_size=1000)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0012_recurring_transaction'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavingsContribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('date', models.DateField()),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('goal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contributions', to='finance.savingsgoal')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='savings_contributions', to='finance.transaction')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'goal', 'date', 'amount'], name='contrib_user_goal_date_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
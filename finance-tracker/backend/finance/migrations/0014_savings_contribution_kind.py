@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def classify_contributions(apps, schema_editor):
+    """Mark the opening balances and corrections written so far, which only their notes told apart."""
+    SavingsContribution = apps.get_model('finance', 'SavingsContribution')
+    manual = SavingsContribution.objects.filter(transaction__isnull=True)
+    manual.filter(note="Starting amount").update(kind='opening')
+    manual.filter(note="Manual correction").update(kind='correction')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0013_savings_contribution'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='savingscontribution',
+            name='contrib_user_goal_date_idx',
+        ),
+        migrations.AddField(
+            model_name='savingscontribution',
+            name='kind',
+            field=models.CharField(choices=[('deposit', 'Deposit'), ('opening', 'Opening balance'), ('correction', 'Correction')], default='deposit', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='savingscontribution',
+            index=models.Index(fields=['user', 'goal', 'date', 'amount', 'kind'], name='contrib_user_goal_date_idx'),
+        ),
+        migrations.RunPython(classify_contributions, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,36 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 # Create your models here.
 
+# ISO 4217 code of amounts stored without an explicit currency.
+DEFAULT_CURRENCY = 'USD'
+
+class TokenBackedUser(User):
+    """User built from JWT claims without a database read; only the id is reliable.
+
+    Created by StatelessJWTAuthentication. Use finance.authentication.get_full_user()
+    where other user fields are needed.
+    """
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_claims(cls, user_id, db='default'):
+        # Tokens carry the id as a string; compare-by-id code expects the pk's own type.
+        user = cls(pk=cls._meta.pk.to_python(user_id), is_active=True)
+        user._state.adding = False
+        user._state.db = db
+        return user
+
+    def save(self, *args, **kwargs):
+        raise TypeError("Token-backed users are read-only; load the full user with get_full_user().")
+
+    def delete(self, *args, **kwargs):
+        raise TypeError("Token-backed users are read-only; load the full user with get_full_user().")
+
+
 class Category(models.Model):
     CATEGORY_TYPES = [
         ('income', 'Income'),
@@ -11,6 +40,12 @@ class Category(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
     category_type = models.CharField(max_length=7, choices=CATEGORY_TYPES)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='category_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.category_type})"
@@ -20,8 +55,30 @@ class Budget(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     allocated_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default=DEFAULT_CURRENCY)
     start_date = models.DateField()
     end_date = models.DateField()
+    # Running totals of the transactions linked to this budget, kept current with F() updates.
+    spent_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    transaction_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    COUNTER_FIELDS = ('spent_amount', 'transaction_count')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-start_date', '-id'], name='budget_user_keyset_idx'),
+            models.Index(fields=['user', 'updated_at'], name='budget_user_updated_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # A full save would write back a possibly stale copy of the running totals.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Budget for {self.category.name}: {self.allocated_amount}"
@@ -31,20 +88,269 @@ class Transaction(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     category = models.ForeignKey(Category, on_delete=models.PROTECT)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default=DEFAULT_CURRENCY)
     date = models.DateField()
     description = models.TextField(blank=True, null=True)
     budget = models.ForeignKey(Budget, null=True, blank=True, on_delete=models.SET_NULL)
+    # Schedule that generated this transaction; with `date` it is the materialization idempotency key.
+    recurring = models.ForeignKey('RecurringTransaction', null=True, blank=True, on_delete=models.SET_NULL)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recurring', 'date'], condition=models.Q(recurring__isnull=False), name='txn_recurring_date_unique'
+            ),
+        ]
+        indexes = [
+            # Covers the report scans (user + date range, reading category and amount)
+            # and the default list ordering without touching the table.
+            models.Index(fields=['user', 'date', 'category', 'amount', 'currency'], name='txn_user_date_cover_idx'),
+            models.Index(fields=['user', 'category', 'date'], name='txn_user_category_date_idx'),
+            models.Index(fields=['budget', 'date'], name='txn_budget_date_idx'),
+            # Seek index for keyset pagination on (date, id).
+            models.Index(fields=['user', '-date', '-id'], name='txn_user_keyset_idx'),
+            # Delta sync: rows of a user changed since a point in time.
+            models.Index(fields=['user', 'updated_at'], name='txn_user_updated_idx'),
+        ]
+
+    # Fields whose previous values the rollup bookkeeping needs on update.
+    TRACKED_FIELDS = ('user_id', 'category_id', 'budget_id', 'date', 'amount', 'currency')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so signal handlers can undo the old values on update.
+        if all(field in field_names for field in cls.TRACKED_FIELDS):
+            instance._original = instance.tracked_values()
+        return instance
+
+    def tracked_values(self):
+        return {field: getattr(self, field) for field in self.TRACKED_FIELDS}
 
     def __str__(self):
         return f"{self.category.name} - {self.amount}"
 
 
+class RecurringTransaction(models.Model):
+    """A transaction repeating every `interval` days, weeks, months or years from `start_date`.
+
+    The rule follows RRULE's FREQ, INTERVAL, UNTIL and COUNT; monthly and yearly dates past
+    the end of a shorter month fall on its last day. `next_date` is the first occurrence not
+    yet written as a Transaction (None once the rule is exhausted).
+    """
+    FREQUENCIES = [
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+        ('yearly', 'Yearly'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default=DEFAULT_CURRENCY)
+    description = models.TextField(blank=True, null=True)
+    budget = models.ForeignKey(Budget, null=True, blank=True, on_delete=models.SET_NULL)
+    frequency = models.CharField(max_length=7, choices=FREQUENCIES)
+    interval = models.PositiveIntegerField(default=1)
+    start_date = models.DateField()
+    until = models.DateField(null=True, blank=True)
+    count = models.PositiveIntegerField(null=True, blank=True)
+    next_date = models.DateField(null=True, blank=True)
+    last_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Fields that define when occurrences fall.
+    RULE_FIELDS = ('frequency', 'interval', 'start_date', 'until', 'count')
+
+    class Meta:
+        indexes = [
+            # The materializer's scan for due schedules.
+            models.Index(fields=['next_date'], name='recurring_next_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.category.name} - {self.amount} {self.frequency}"
+
+
 class SavingsGoal(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     goal_name = models.CharField(max_length=255)
     target_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    # Running total of the goal's contributions, kept current with F() updates.
     current_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    currency = models.CharField(max_length=3, default=DEFAULT_CURRENCY)
     deadline = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    COUNTER_FIELDS = ('current_amount',)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deadline', 'id'], name='goal_user_keyset_idx'),
+            models.Index(fields=['user', 'updated_at'], name='goal_user_updated_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # A full save would write back a possibly stale copy of the running total.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.goal_name} - {self.current_amount}/{self.target_amount}"
+
+
+class SavingsContribution(models.Model):
+    """Money put into (positive) or taken out of (negative) a savings goal on `date`.
+
+    A contribution may point at the transaction that moved the money; its amount is the
+    part of that transaction saved towards the goal, in the goal's currency. Deleting the
+    transaction deletes the contribution. Opening balances and corrections of the saved
+    amount are in the ledger too, but are not saving and so do not count towards the rate.
+    """
+    DEPOSIT = 'deposit'
+    OPENING = 'opening'
+    CORRECTION = 'correction'
+    KINDS = [
+        (DEPOSIT, 'Deposit'),
+        (OPENING, 'Opening balance'),
+        (CORRECTION, 'Correction'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    goal = models.ForeignKey(SavingsGoal, on_delete=models.CASCADE, related_name='contributions')
+    transaction = models.ForeignKey(
+        Transaction, null=True, blank=True, on_delete=models.CASCADE, related_name='savings_contributions'
+    )
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    date = models.DateField()
+    note = models.CharField(max_length=255, blank=True)
+    kind = models.CharField(max_length=10, choices=KINDS, default=DEPOSIT)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Covers the progress history of all of a user's goals: one grouped scan of the index.
+            models.Index(fields=['user', 'goal', 'date', 'amount', 'kind'], name='contrib_user_goal_date_idx'),
+        ]
+
+    # Fields whose previous values the running total needs on update.
+    TRACKED_FIELDS = ('goal_id', 'amount')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(field in field_names for field in cls.TRACKED_FIELDS):
+            instance._original = instance.tracked_values()
+        return instance
+
+    def tracked_values(self):
+        return {field: getattr(self, field) for field in self.TRACKED_FIELDS}
+
+    def __str__(self):
+        return f"{self.goal.goal_name}: {self.amount} on {self.date}"
+
+
+class TransactionRollup(models.Model):
+    GRANULARITIES = [
+        ('day', 'Day'),
+        ('month', 'Month'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    period_start = models.DateField()
+    granularity = models.CharField(max_length=5, choices=GRANULARITIES)
+    currency = models.CharField(max_length=3, default=DEFAULT_CURRENCY)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'granularity', 'period_start', 'category', 'currency'], name='rollup_unique_period'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.category.name} {self.granularity} {self.period_start}: {self.total}"
+
+
+class ExchangeRate(models.Model):
+    """Units of `quote` one unit of `base` bought on `date`; loaded by load_exchange_rates."""
+    date = models.DateField()
+    base = models.CharField(max_length=3)
+    quote = models.CharField(max_length=3)
+    rate = models.DecimalField(max_digits=18, decimal_places=8)
+
+    class Meta:
+        constraints = [
+            # Also the index behind the "latest rate on or before a date" lookups.
+            models.UniqueConstraint(fields=['base', 'quote', 'date'], name='exchange_rate_unique_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.base}/{self.quote} {self.date}: {self.rate}"
+
+
+class Tombstone(models.Model):
+    """Record of a deleted row, so delta sync can tell clients what to remove.
+
+    The user reference has no database constraint: deleting a user deletes their rows
+    first, and the tombstones written meanwhile are cleared by prune_tombstones.
+    """
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False)
+    model = models.CharField(max_length=32)
+    object_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted at {self.deleted_at}"
+
+
+class Job(models.Model):
+    """A report or export computed by `manage.py run_workers` instead of in the request."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=32)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=9, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Earliest time a worker may pick the job up; pushed back after a failed attempt.
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    result = models.BinaryField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    filename = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+            models.Index(fields=['user', '-created_at'], name='job_user_created_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.goal_name} - {self.current_amount}/{self.target_amount}"
\ No newline at end of file
+        return f"{self.kind} job {self.pk} ({self.status})"
@@ -0,0 +1,109 @@
+import base64
+import json
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination that seeks on the full (field, ..., id) ordering key.
+
+    Each page is a range read that starts right after the previous page's last row,
+    so deep pages cost the same as the first one and no COUNT query is run.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=('-id',)):
+        self.ordering = ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        return self.page(queryset, page_size, self.decode_cursor(request, queryset.model))
+
+    def page(self, queryset, page_size, position=None):
+        """The `page_size` rows after `position` (or the first ones); next_cursor() continues from them."""
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        results = results[:page_size]
+        self.last_position = [self.value_of(results[-1], field) for field in self.ordering] if results else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data
+        })
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param], strict=True, cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def next_cursor(self):
+        if not self.has_next:
+            return None
+        return base64.urlsafe_b64encode(json.dumps(self.last_position).encode()).decode()
+
+    def get_next_link(self):
+        cursor = self.next_cursor()
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def after(self, position):
+        """Rows strictly after `position` in the ordering, as (a < x) OR (a = x AND b < y) ..."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    @staticmethod
+    def value_of(instance, field):
+        value = getattr(instance, field.lstrip('-'))
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class SelectablePaginationMixin:
+    """Serve keyset pages instead of numbered pages when a request asks for ?paginate=cursor."""
+    keyset_ordering = ('-id',)
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.request.query_params.get('paginate') == 'cursor':
+            self._paginator = KeysetPagination(self.keyset_ordering)
+        return super().paginator
@@ -0,0 +1,9 @@
+from rest_framework.permissions import BasePermission
+from .authentication import get_full_user
+
+
+class IsStaffUser(BasePermission):
+    """IsAdminUser that also works for token-backed users, whose is_staff is not in the token."""
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and get_full_user(request.user).is_staff)
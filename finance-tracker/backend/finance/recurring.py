@@ -0,0 +1,206 @@
+"""Occurrences of recurring transaction schedules: materialized in batches, or projected.
+
+materialize() writes every due occurrence of every schedule in chunks: one query reads a
+chunk of due schedules, one finds occurrences already written, bulk_create inserts the
+rest and one UPDATE per distinct (next_date, last_date) pair advances the schedules.
+(recurring, date) is unique on Transaction, so an occurrence can never be written twice.
+
+projected_rows() yields the occurrences that are not written yet in the shape of the
+trends query, so the trends report can show them without storing anything.
+"""
+from calendar import monthrange
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Now
+from django.utils import timezone
+from .models import RecurringTransaction, Transaction
+from .reports import BREAKDOWNS, merge_trend_rows, missing_rates_error, trend_rows, truncate
+from . import currencies, signals
+
+
+def add_months(value, months):
+    """`value` moved by `months`, on the last day of the month when the day does not exist."""
+    month = value.month - 1 + months
+    year, month = value.year + month // 12, month % 12 + 1
+    return value.replace(year=year, month=month, day=min(value.day, monthrange(year, month)[1]))
+
+
+def occurrence(schedule, index):
+    """Date of the `index`-th occurrence of `schedule`'s rule, counting from 0 at start_date."""
+    step = index * schedule.interval
+    if schedule.frequency == 'daily':
+        return schedule.start_date + timedelta(days=step)
+    if schedule.frequency == 'weekly':
+        return schedule.start_date + timedelta(weeks=step)
+    if schedule.frequency == 'monthly':
+        return add_months(schedule.start_date, step)
+    return add_months(schedule.start_date, step * 12)
+
+
+def first_index_after(schedule, day):
+    """Index of the first occurrence strictly after `day`."""
+    start = schedule.start_date
+    if day < start:
+        return 0
+    if schedule.frequency in ('daily', 'weekly'):
+        days = schedule.interval * (7 if schedule.frequency == 'weekly' else 1)
+        return (day - start).days // days + 1
+
+    months = (day.year - start.year) * 12 + day.month - start.month
+    index = months // (schedule.interval * (12 if schedule.frequency == 'yearly' else 1))
+    while occurrence(schedule, index) <= day:
+        index += 1
+    return index
+
+
+def within_rule(schedule, index, day):
+    if schedule.count is not None and index >= schedule.count:
+        return False
+    return schedule.until is None or day <= schedule.until
+
+
+def seek(schedule, index):
+    """Point `schedule` at its `index`-th occurrence, or at nothing once the rule is exhausted."""
+    day = occurrence(schedule, index)
+    schedule.next_date = day if within_rule(schedule, index, day) else None
+
+
+def reschedule(schedule):
+    """Restart `schedule` after a rule change at the first new occurrence after the last written one."""
+    seek(schedule, first_index_after(schedule, schedule.last_date) if schedule.last_date else 0)
+
+
+def occurrences(schedule, until):
+    """(index, date) of the occurrences from `schedule.next_date` through `until`."""
+    day = schedule.next_date
+    if day is None:
+        return
+    index = first_index_after(schedule, day - timedelta(days=1))
+    while day <= until and within_rule(schedule, index, day):
+        yield index, day
+        index += 1
+        day = occurrence(schedule, index)
+
+
+def as_transaction(schedule, day):
+    budget = schedule.budget
+    in_budget = budget is not None and budget.start_date <= day <= budget.end_date
+    return Transaction(
+        user_id=schedule.user_id, category_id=schedule.category_id, amount=schedule.amount,
+        currency=schedule.currency, description=schedule.description, date=day,
+        budget=budget if in_budget else None, recurring_id=schedule.pk,
+    )
+
+
+def advance(schedules):
+    """Store the new positions of `schedules`; schedules on the same dates share one UPDATE.
+
+    Unlike bulk_update, the query count and size do not grow with the chunk.
+    """
+    positions = defaultdict(list)
+    for schedule in schedules:
+        positions[(schedule.next_date, schedule.last_date)].append(schedule.pk)
+    for (next_date, last_date), pks in positions.items():
+        RecurringTransaction.objects.filter(pk__in=pks).update(
+            next_date=next_date, last_date=last_date, updated_at=Now()
+        )
+    for user_id in {schedule.user_id for schedule in schedules}:
+        signals.touch_at_commit(user_id, 'recurringtransaction')
+
+
+def materialize(today=None, chunk_size=1000):
+    """Write every occurrence due by `today`; returns the number of transactions created."""
+    today = today or timezone.localdate()
+    created = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            schedules = list(
+                RecurringTransaction.objects
+                .select_related('budget')
+                .select_for_update(skip_locked=True, of=('self',))
+                .filter(next_date__lte=today, pk__gt=last_id)
+                .order_by('pk')[:chunk_size]
+            )
+            if not schedules:
+                return created
+            last_id = schedules[-1].pk
+
+            due = {schedule.pk: list(occurrences(schedule, today)) for schedule in schedules}
+            written = set(
+                Transaction.objects
+                .filter(recurring_id__in=due, date__gte=min(schedule.next_date for schedule in schedules))
+                .values_list('recurring_id', 'date')
+            )
+
+            rows = []
+            for schedule in schedules:
+                for _index, day in due[schedule.pk]:
+                    if (schedule.pk, day) not in written:
+                        rows.append(as_transaction(schedule, day))
+                if due[schedule.pk]:
+                    index, day = due[schedule.pk][-1]
+                    schedule.last_date = day
+                    seek(schedule, index + 1)
+
+            rows = Transaction.objects.bulk_create(rows, batch_size=chunk_size)
+            signals.transactions_bulk_created(rows)
+            advance(schedules)
+            created += len(rows)
+
+
+def projected_rows(user, params, timeframe, breakdown, start_date, end_date, currency=None, horizon_days=90):
+    """Trends rows (see reports.trend_rows) of the occurrences of `user`'s schedules not written yet.
+
+    Occurrences run through `end_date`, or `horizon_days` past today without a range.
+    Converted amounts use today's rate, the latest one known for future dates; a schedule
+    without one rejects the request.
+    """
+    today = timezone.localdate()
+    until = end_date or today + timedelta(days=horizon_days)
+    schedules = RecurringTransaction.objects.filter(user=user, next_date__lte=until).select_related('category')
+    category_type = params.get('category_type', None)
+    if category_type:
+        schedules = schedules.filter(category__category_type=category_type)
+
+    columns = BREAKDOWNS.get(breakdown, ())
+    groups = defaultdict(lambda: [Decimal('0.00'), Decimal('0.00')])
+    for schedule in schedules:
+        amount = schedule.amount
+        if currency:
+            amount = currencies.convert(amount, schedule.currency, currency, today)
+            if amount is None:
+                raise missing_rates_error([schedule.currency], currency)
+
+        category = schedule.category
+        values = {
+            'category': category.pk,
+            'category__name': category.name,
+            'category__category_type': category.category_type,
+        }
+        key_columns = tuple(values[column] for column in columns)
+        for _index, day in occurrences(schedule, until):
+            if start_date and day < start_date:
+                continue
+            totals = groups[(truncate(day, timeframe), key_columns)]
+            totals[0 if category.category_type == 'income' else 1] += amount
+
+    return [
+        {'period': period, **dict(zip(columns, key_columns)), 'total_income': income, 'total_expense': expense}
+        for (period, key_columns), (income, expense) in groups.items()
+    ]
+
+
+def trend_rows_with_projection(user, params, source, timeframe, breakdown, start_date, end_date):
+    """trend_rows() of `source`, plus the projected occurrences when the request asks for ?projected=true."""
+    rows = trend_rows(source, timeframe, breakdown)
+    if params.get('projected') != 'true':
+        return rows
+    projected = projected_rows(
+        user, params, timeframe, breakdown, start_date, end_date, source.currency,
+        settings.FINANCE_RECURRING_PROJECTION_DAYS
+    )
+    return merge_trend_rows(rows, projected, breakdown)
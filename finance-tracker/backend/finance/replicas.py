@@ -0,0 +1,96 @@
+"""Read-replica routing for the report and list/retrieve GET traffic.
+
+Views that only read pick a database with read_route() and wrap their work in
+reading_from(), which points the ORM's reads at one of FINANCE_READ_REPLICAS for the
+rest of the request through a context variable; everything else, and every write, uses
+the primary. After any write to a
+user's data, that user's reads stay on the primary for FINANCE_READ_REPLICA_STICKY_SECONDS,
+so they see their own changes while the replicas catch up. The window should exceed the
+usual replication lag.
+
+Lag past that window is not ruled out, and a replica read that misses a write would be
+stored under the new report version and revalidated by its ETag until the next write.
+So until FINANCE_READ_REPLICA_MAX_LAG_SECONDS after a write, replica-served responses are
+neither stored in the report cache nor given validators: each one may be stale, but
+only until the replica catches up.
+
+Enable it with DATABASE_ROUTERS = ['finance.replicas.ReadReplicaRouter'] and an alias
+per replica in DATABASES; core/settings_replicas.py is a two-file SQLite example.
+"""
+import itertools
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from . import caching
+
+
+# Database alias the ORM reads from in the current request, or None for the primary.
+# Context variables follow the request into sync_to_async threads.
+_read_alias = ContextVar('finance_read_alias', default=None)
+
+_turns = itertools.count()
+
+
+def _sticky_key(user_id):
+    return f'finance:primary-reads:{user_id}'
+
+
+def stick_to_primary(user_id):
+    """Send `user_id`'s reads to the primary for the next few seconds, after they wrote."""
+    if settings.FINANCE_READ_REPLICAS:
+        timeout = max(settings.FINANCE_READ_REPLICA_STICKY_SECONDS, settings.FINANCE_READ_REPLICA_MAX_LAG_SECONDS)
+        caching.get_cache().set(_sticky_key(user_id), time.time(), timeout)
+
+
+def route(written_at):
+    """(alias, settled) for the reads of a user who last wrote at `written_at`, None if not lately.
+
+    alias is a replica, round-robin, or None when the reads must use the primary; settled
+    is False when that replica may not have the write yet.
+    """
+    replicas = settings.FINANCE_READ_REPLICAS
+    age = math.inf if written_at is None else time.time() - written_at
+    if not replicas or age < settings.FINANCE_READ_REPLICA_STICKY_SECONDS:
+        return None, True
+    return replicas[next(_turns) % len(replicas)], age >= settings.FINANCE_READ_REPLICA_MAX_LAG_SECONDS
+
+
+def read_route(user_id):
+    return route(settings.FINANCE_READ_REPLICAS and caching.get_cache().get(_sticky_key(user_id)) or None)
+
+
+async def aread_route(user_id):
+    return route(settings.FINANCE_READ_REPLICAS and await caching.get_cache().aget(_sticky_key(user_id)) or None)
+
+
+def read_alias(user_id):
+    return read_route(user_id)[0]
+
+
+@contextmanager
+def reading_from(alias):
+    """Route the ORM's reads to `alias` (None: the primary) inside the block."""
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+class ReadReplicaRouter:
+    """Reads follow reading_from(); writes, including saves of rows read from a replica, go to the primary."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.FINANCE_READ_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
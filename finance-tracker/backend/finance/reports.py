@@ -0,0 +1,396 @@
+from calendar import monthrange
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import Min, Q, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce, TruncDay, TruncWeek, TruncMonth, TruncQuarter, TruncYear
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from .models import Transaction, TransactionRollup, Budget, SavingsGoal
+from . import currencies
+
+
+TIMEFRAMES = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'quarter': TruncQuarter,
+    'year': TruncYear,
+}
+
+# Timeframes made of whole months, which monthly rollups can serve.
+MONTHLY_TIMEFRAMES = ('month', 'quarter', 'year')
+
+# Extra group-by columns of each trends breakdown.
+BREAKDOWNS = {
+    'category': ('category', 'category__name', 'category__category_type'),
+    'category_type': ('category__category_type',),
+}
+
+ZERO = Value(0, output_field=DecimalField(max_digits=14, decimal_places=2))
+
+# The rows a report aggregates over: raw transactions or one granularity of rollups.
+# `amount_field` is an expression when amounts are converted into `currency`.
+ReportSource = namedtuple('ReportSource', ['queryset', 'amount_field', 'date_field', 'currency'])
+
+
+def income_expense_sums(field='amount'):
+    """Conditional sums that split one scan into income and expense totals."""
+    return {
+        'total_income': Coalesce(Sum(field, filter=Q(category__category_type='income')), ZERO),
+        'total_expense': Coalesce(Sum(field, filter=Q(category__category_type='expense')), ZERO),
+    }
+
+
+def parse_date_range(params):
+    """The (start, end) dates of the report, or (None, None) when no full range was given."""
+    start_date = params.get('start_date', None)
+    end_date = params.get('end_date', None)
+    if not (start_date and end_date):
+        return None, None
+
+    try:
+        start_date, end_date = parse_date(start_date), parse_date(end_date)
+    except ValueError:
+        start_date = end_date = None
+    if not (start_date and end_date):
+        raise ValidationError({'date': "start_date and end_date must be valid YYYY-MM-DD dates."})
+    return start_date, end_date
+
+
+def validate_currency(currency):
+    currency = (currency or '').upper()
+    if not currencies.is_code(currency):
+        raise ValidationError({'currency': "Currency must be a three-letter ISO 4217 code."})
+    return currency
+
+
+def rollup_granularity(start_date, end_date, timeframe=None, converted=False):
+    """The coarsest rollup granularity whose periods line up with the range and timeframe.
+
+    Converted amounts need the rate of each day, so they always read daily rollups.
+    """
+    if not getattr(settings, 'FINANCE_REPORTS_USE_ROLLUPS', True):
+        return None
+
+    whole_months = start_date is None or (
+        start_date.day == 1 and end_date.day == monthrange(end_date.year, end_date.month)[1]
+    )
+    if whole_months and timeframe in (None, *MONTHLY_TIMEFRAMES) and not converted:
+        return 'month'
+    # Report dates are whole days, so daily rollups line up with any range.
+    return 'day'
+
+
+def missing_rates_error(currencies_without_rate, target):
+    return ValidationError({'currency': (
+        f"No exchange rate into {target} is loaded for {', '.join(sorted(currencies_without_rate))} "
+        "on or before the dates of the amounts to convert."
+    )})
+
+
+def check_rates(source):
+    """Reject a converted report that would have to leave rows out for lack of a rate.
+
+    Rates apply until the next one, so each currency only needs a rate on or before its
+    earliest row: one grouped query plus a memoized rate lookup per currency.
+    """
+    firsts = (
+        source.queryset.exclude(currency=source.currency)
+        .values('currency').annotate(first=Min(source.date_field)).order_by()
+    )
+    missing = {row['currency'] for row in firsts if currencies.rate(row['currency'], source.currency, row['first']) is None}
+    if missing:
+        raise missing_rates_error(missing, source.currency)
+
+
+def report_source(user, params, timeframe=None):
+    """Rows of `user` narrowed by the report query parameters, preferring the rollup table.
+
+    With ?currency=XXX every amount is converted into XXX inside the query, and the
+    request is rejected when some row has no rate to convert with (one extra query).
+    Without it, amounts are summed as stored.
+    """
+    start_date, end_date = parse_date_range(params)
+    currency = params.get('currency', None)
+    currency = validate_currency(currency) if currency else None
+    granularity = rollup_granularity(start_date, end_date, timeframe, converted=bool(currency))
+
+    if granularity:
+        source = ReportSource(
+            TransactionRollup.objects.filter(user=user, granularity=granularity), 'total', 'period_start', currency
+        )
+    else:
+        source = ReportSource(Transaction.objects.filter(user=user), 'amount', 'date', currency)
+
+    if currency:
+        source = source._replace(
+            amount_field=currencies.converted(source.amount_field, 'currency', source.date_field, currency)
+        )
+
+    queryset = source.queryset
+    if start_date:
+        queryset = queryset.filter(**{
+            f'{source.date_field}__gte': start_date,
+            f'{source.date_field}__lte': end_date,
+        })
+
+    category_type = params.get('category_type', None)
+    if category_type:
+        queryset = queryset.filter(category__category_type=category_type)
+
+    source = source._replace(queryset=queryset)
+    if currency:
+        check_rates(source)
+    return source
+
+
+def income_expense_totals(source):
+    """Total income and expense of `source` in a single query."""
+    return source.queryset.aggregate(**income_expense_sums(source.amount_field))
+
+
+def validate_timeframe(timeframe):
+    if timeframe not in TIMEFRAMES:
+        raise ValidationError({'timeframe': f"Timeframe must be one of: {', '.join(TIMEFRAMES)}."})
+    return timeframe
+
+
+def validate_breakdown(breakdown):
+    if breakdown and breakdown not in BREAKDOWNS:
+        raise ValidationError({'breakdown': f"Breakdown must be one of: {', '.join(BREAKDOWNS)}."})
+    return breakdown or None
+
+
+def truncate(value, timeframe):
+    """The start of the `timeframe` period containing `value`, like the Trunc functions in SQL."""
+    if timeframe == 'day':
+        return value
+    if timeframe == 'week':
+        return value - timedelta(days=value.weekday())
+    if timeframe == 'month':
+        return value.replace(day=1)
+    if timeframe == 'quarter':
+        return value.replace(month=(value.month - 1) // 3 * 3 + 1, day=1)
+    return value.replace(month=1, day=1)
+
+
+def next_period(value, timeframe):
+    if timeframe == 'day':
+        return value + timedelta(days=1)
+    if timeframe == 'week':
+        return value + timedelta(days=7)
+    months = {'month': 1, 'quarter': 3, 'year': 12}[timeframe]
+    month = value.month - 1 + months
+    return value.replace(year=value.year + month // 12, month=month % 12 + 1)
+
+
+def period_count(start_date, end_date, timeframe):
+    first, last = truncate(start_date, timeframe), truncate(end_date, timeframe)
+    if timeframe == 'day':
+        return (last - first).days + 1
+    if timeframe == 'week':
+        return (last - first).days // 7 + 1
+    months = (last.year - first.year) * 12 + last.month - first.month
+    return months // {'month': 1, 'quarter': 3, 'year': 12}[timeframe] + 1
+
+
+def check_period_count(start_date, end_date, timeframe):
+    if period_count(start_date, end_date, timeframe) > settings.FINANCE_TRENDS_MAX_PERIODS:
+        raise ValidationError({'timeframe': (
+            f"The range spans more than {settings.FINANCE_TRENDS_MAX_PERIODS} {timeframe} periods; "
+            "narrow it or pick a longer timeframe."
+        )})
+
+
+def trends_options(params):
+    """Validated (timeframe, breakdown, start_date, end_date) of a trends request."""
+    timeframe = validate_timeframe(params.get('timeframe', 'month'))
+    breakdown = validate_breakdown(params.get('breakdown'))
+    start_date, end_date = parse_date_range(params)
+    if start_date:
+        check_period_count(start_date, end_date, timeframe)
+    return timeframe, breakdown, start_date, end_date
+
+
+def trend_rows(source, timeframe, breakdown=None):
+    """The grouped query behind the trends report: one row per period (and breakdown group)."""
+    columns = BREAKDOWNS.get(breakdown, ())
+    return (
+        source.queryset
+        .annotate(period=TIMEFRAMES[timeframe](source.date_field))
+        .values('period', *columns)
+        .annotate(**income_expense_sums(source.amount_field))
+        .order_by('period', *columns)
+    )
+
+
+def merge_trend_rows(rows, extra, breakdown=None):
+    """trend_rows() with the totals of `extra` rows added, still one row per period and group."""
+    columns = BREAKDOWNS.get(breakdown, ())
+    merged = {}
+    for row in [*rows, *extra]:
+        key = (row['period'], *(row[column] for column in columns))
+        if key in merged:
+            merged[key] = {
+                **merged[key],
+                'total_income': merged[key]['total_income'] + row['total_income'],
+                'total_expense': merged[key]['total_expense'] + row['total_expense'],
+            }
+        else:
+            merged[key] = row
+    return [merged[key] for key in sorted(merged)]
+
+
+def breakdown_entry(row, breakdown):
+    total = row['total_income'] + row['total_expense']
+    if breakdown == 'category':
+        return {
+            'category': row['category'],
+            'name': row['category__name'],
+            'category_type': row['category__category_type'],
+            'total': total,
+        }
+    return {'category_type': row['category__category_type'], 'total': total}
+
+
+def empty_period(breakdown):
+    entry = {'total_income': Decimal('0.00'), 'total_expenses': Decimal('0.00')}
+    if breakdown:
+        entry['breakdown'] = []
+    return entry
+
+
+def build_trends(rows, timeframe, breakdown=None, start_date=None, end_date=None):
+    """Turn trend_rows() into one entry per period, filling periods without data with zeros.
+
+    Periods run over the requested range, or from the first to the last period with data.
+    """
+    periods = {}
+    for row in rows:
+        entry = periods.get(row['period'])
+        if entry is None:
+            entry = periods[row['period']] = empty_period(breakdown)
+        entry['total_income'] += row['total_income']
+        entry['total_expenses'] += row['total_expense']
+        if breakdown:
+            entry['breakdown'].append(breakdown_entry(row, breakdown))
+
+    if start_date:
+        first, last = truncate(start_date, timeframe), truncate(end_date, timeframe)
+    elif periods:
+        first, last = min(periods), max(periods)
+        check_period_count(first, last, timeframe)
+    else:
+        return []
+
+    trends = []
+    period = first
+    while period <= last:
+        entry = periods.get(period)
+        if entry is None:
+            entry = empty_period(breakdown)
+        trends.append({'period': str(period), **entry})
+        period = next_period(period, timeframe)
+    return trends
+
+
+def income_expense_trends(source, timeframe='month', breakdown=None, start_date=None, end_date=None):
+    """Income and expense totals per period in a single grouped query, gaps filled in Python."""
+    return build_trends(trend_rows(source, timeframe, breakdown), timeframe, breakdown, start_date, end_date)
+
+
+def savings_rows(user):
+    """Saved amounts of `user` summed per currency."""
+    return (
+        SavingsGoal.objects.filter(user=user)
+        .values('currency')
+        .annotate(total=Sum('current_amount'))
+        .order_by('currency')
+    )
+
+
+def savings_total(rows, currency=None):
+    """Sum of savings_rows(), converted into `currency` at today's rate when one is given."""
+    total = Decimal('0.00')
+    today = timezone.localdate()
+    missing = set()
+    for row in rows:
+        amount = row['total']
+        if currency:
+            amount = currencies.convert(amount, row['currency'], currency, today)
+        if amount is None:
+            missing.add(row['currency'])
+        else:
+            total += amount
+    if missing:
+        raise missing_rates_error(missing, currency)
+    return {'total_savings': total}
+
+
+def combine_net_worth(totals, savings):
+    return {
+        'net_worth': totals['total_income'] - totals['total_expense'] + savings['total_savings'],
+        'total_income': totals['total_income'],
+        'total_expense': totals['total_expense'],
+        'total_savings': savings['total_savings'],
+    }
+
+
+def net_worth(user, source):
+    """Income minus expense plus saved amounts: one scan of `source` and one savings query."""
+    totals = income_expense_totals(source)
+    savings = savings_total(savings_rows(user), source.currency)
+    return combine_net_worth(totals, savings)
+
+
+def dashboard(user, params):
+    """Every dashboard report from one grouped transaction scan plus the savings and budget queries.
+
+    The income and expense totals are the sums of the trend periods, so the trends query
+    doubles as the totals query.
+    """
+    timeframe, breakdown, start_date, end_date = trends_options(params)
+    source = report_source(user, params, timeframe)
+    trends = income_expense_trends(source, timeframe, breakdown, start_date, end_date)
+
+    totals = {
+        'total_income': sum((period['total_income'] for period in trends), Decimal('0.00')),
+        'total_expense': sum((period['total_expenses'] for period in trends), Decimal('0.00')),
+    }
+    savings = savings_total(savings_rows(user), source.currency)
+    budgets = budget_status(user)
+
+    return {
+        'income_expenses': totals,
+        'trends': trends,
+        'net_worth': combine_net_worth(totals, savings),
+        'budget_notifications': {'alerts': budget_alerts(budgets), 'budgets': budgets},
+    }
+
+
+def budget_status(user):
+    """Spend, remaining amount and utilization of every budget of `user` in a single query."""
+    budgets = Budget.objects.filter(user=user).select_related('category').order_by('start_date', 'id')
+
+    return [{
+        'budget': budget.id,
+        'category': budget.category.name,
+        'allocated_amount': budget.allocated_amount,
+        'currency': budget.currency,
+        'spent_amount': budget.spent_amount,
+        'transaction_count': budget.transaction_count,
+        'remaining_amount': budget.allocated_amount - budget.spent_amount,
+        'utilization': round(budget.spent_amount * 100 / budget.allocated_amount, 2) if budget.allocated_amount else Decimal('0'),
+    } for budget in budgets]
+
+
+def budget_alerts(budgets):
+    """High-priority alerts for the entries of `budget_status` that are over their allocation."""
+    return [{
+        **budget,
+        'message': f"Your total expenses for the {budget['category']} category have exceeded your allocated budget of {budget['allocated_amount']}.",
+        'is_high_priority': True
+    } for budget in budgets if budget['spent_amount'] > budget['allocated_amount']]
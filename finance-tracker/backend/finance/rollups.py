@@ -0,0 +1,123 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDay, TruncMonth
+from django.utils.dateparse import parse_date
+from .models import Transaction, TransactionRollup
+
+
+GRANULARITIES = {
+    'day': TruncDay,
+    'month': TruncMonth,
+}
+
+
+def period_start(value, granularity):
+    """First day of the `granularity` period containing `value`."""
+    if isinstance(value, str):
+        value = parse_date(value)
+    if granularity == 'month':
+        return value.replace(day=1)
+    return value
+
+
+def collect(deltas, values, sign):
+    """Add one transaction's `values` (see Transaction.tracked_values) to `deltas` with `sign`."""
+    amount = Decimal(str(values['amount'])) * sign
+    for granularity in GRANULARITIES:
+        key = (
+            values['user_id'], values['category_id'], granularity,
+            period_start(values['date'], granularity), values['currency'],
+        )
+        deltas[key][0] += amount
+        deltas[key][1] += sign
+
+
+def upsert(connection, deltas):
+    """Apply `deltas` with one INSERT ... ON CONFLICT DO UPDATE statement executed per row in a batch."""
+    quote = connection.ops.quote_name
+    table = quote(TransactionRollup._meta.db_table)
+    columns = ['user_id', 'category_id', 'granularity', 'period_start', 'currency', 'total', 'count']
+    sql = (
+        f"INSERT INTO {table} ({', '.join(quote(column) for column in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({', '.join(quote(column) for column in columns[:5])}) DO UPDATE SET "
+        f"{quote('total')} = {table}.{quote('total')} + excluded.{quote('total')}, "
+        f"{quote('count')} = {table}.{quote('count')} + excluded.{quote('count')}"
+    )
+    params = [
+        (user_id, category_id, granularity, connection.ops.adapt_datefield_value(start), currency,
+         connection.ops.adapt_decimalfield_value(total), count)
+        for (user_id, category_id, granularity, start, currency), (total, count) in deltas
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def apply(deltas):
+    """Add the collected (total, count) deltas to the rollup rows, creating missing ones."""
+    deltas = [(key, delta) for key, delta in deltas.items() if delta[0] or delta[1]]
+    connection = connections[router.db_for_write(TransactionRollup)]
+    if connection.features.supports_update_conflicts_with_target:
+        # Additions (bulk imports, materialized schedules) skip building an ORM query per row.
+        # Removals hit existing rows, and their negative counts would fail the insert's checks.
+        additions = [(key, delta) for key, delta in deltas if min(delta) >= 0]
+        if additions:
+            upsert(connection, additions)
+        deltas = [(key, delta) for key, delta in deltas if min(delta) < 0]
+
+    for (user_id, category_id, granularity, start, currency), (total, count) in deltas:
+
+        rows = TransactionRollup.objects.filter(
+            user_id=user_id, category_id=category_id, granularity=granularity, period_start=start, currency=currency
+        )
+        if rows.update(total=F('total') + total, count=F('count') + count):
+            continue
+
+        try:
+            with transaction.atomic():
+                TransactionRollup.objects.create(
+                    user_id=user_id, category_id=category_id, granularity=granularity,
+                    period_start=start, currency=currency, total=total, count=count
+                )
+        except IntegrityError:
+            # Another writer created the row first.
+            rows.update(total=F('total') + total, count=F('count') + count)
+
+
+def record(added=(), removed=()):
+    """Apply added and removed transaction values at once, merging deltas that hit the same row."""
+    deltas = defaultdict(lambda: [Decimal('0'), 0])
+    for values in added:
+        collect(deltas, values, 1)
+    for values in removed:
+        collect(deltas, values, -1)
+    apply(deltas)
+
+
+def rebuild(user_ids, chunk_size=1000):
+    """Recompute the rollups of `user_ids` from their transactions."""
+    with transaction.atomic():
+        TransactionRollup.objects.filter(user_id__in=user_ids).delete()
+
+        for granularity, trunc in GRANULARITIES.items():
+            rows = (
+                Transaction.objects
+                .filter(user_id__in=user_ids)
+                .annotate(period=trunc('date'))
+                .values('user_id', 'category_id', 'period', 'currency')
+                .annotate(period_total=Sum('amount'), period_count=Count('id'))
+                .order_by()
+            )
+            batch = []
+            for row in rows.iterator(chunk_size=chunk_size):
+                batch.append(TransactionRollup(
+                    user_id=row['user_id'], category_id=row['category_id'], granularity=granularity,
+                    period_start=row['period'], currency=row['currency'],
+                    total=row['period_total'], count=row['period_count']
+                ))
+                if len(batch) >= chunk_size:
+                    TransactionRollup.objects.bulk_create(batch)
+                    batch = []
+            TransactionRollup.objects.bulk_create(batch)
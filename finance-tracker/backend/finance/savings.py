@@ -0,0 +1,118 @@
+"""Savings goal running totals and progress, both read from the contribution ledger.
+
+record() moves SavingsGoal.current_amount with F() updates as contributions come and go.
+progress() reads the history of all of a user's goals in one grouped query over the
+contribution index and projects when each goal completes at its recent saving rate.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Now
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from .models import SavingsContribution, SavingsGoal
+from . import reports
+
+
+def record(added=(), removed=()):
+    """Move the running totals of the goals referenced by added and removed contribution values."""
+    deltas = defaultdict(Decimal)
+    for values in added:
+        deltas[values['goal_id']] += Decimal(str(values['amount']))
+    for values in removed:
+        deltas[values['goal_id']] -= Decimal(str(values['amount']))
+
+    for goal_id, amount in deltas.items():
+        if amount:
+            SavingsGoal.objects.filter(pk=goal_id).update(current_amount=F('current_amount') + amount, updated_at=Now())
+
+
+def contribute(goal, amount, note='', day=None, kind=SavingsContribution.CORRECTION):
+    """Record a contribution to `goal` that no transaction stands for, such as a manual correction."""
+    return SavingsContribution.objects.create(
+        user_id=goal.user_id, goal=goal, amount=amount, date=day or timezone.localdate(), note=note, kind=kind
+    )
+
+
+def validate_goal(user, goal_id):
+    if goal_id in (None, ''):
+        return None
+    try:
+        return SavingsGoal.objects.get(pk=int(goal_id), user=user).pk
+    except (ValueError, SavingsGoal.DoesNotExist):
+        raise ValidationError({'goal': "Goal must be the id of one of your savings goals."})
+
+
+def projected_completion(goal, rate, today):
+    """The day `goal` reaches its target saving `rate` a day, or None when it never does."""
+    remaining = goal.target_amount - goal.current_amount
+    if remaining <= 0:
+        return today
+    if rate <= 0:
+        return None
+    return today + timedelta(days=math.ceil(remaining / rate))
+
+
+def progress(user, params):
+    """Saved amount of each goal at the end of every ?timeframe period with contributions.
+
+    Deposits in the last FINANCE_SAVINGS_RATE_DAYS give each goal's daily rate, and the
+    projected completion date is when that rate covers what is left; opening balances and
+    corrections are history but not saving. Amounts in current_amount that are not in the
+    ledger count as an opening balance.
+    """
+    timeframe = reports.validate_timeframe(params.get('timeframe', 'month'))
+    start_date, end_date = reports.parse_date_range(params)
+    if start_date:
+        reports.check_period_count(start_date, end_date, timeframe)
+    goal_id = validate_goal(user, params.get('goal'))
+    today = timezone.localdate()
+    window = settings.FINANCE_SAVINGS_RATE_DAYS
+
+    goals = SavingsGoal.objects.filter(user=user).order_by('deadline', 'id')
+    contributions = SavingsContribution.objects.filter(user=user)
+    if goal_id:
+        goals, contributions = goals.filter(pk=goal_id), contributions.filter(goal=goal_id)
+    rows = (
+        contributions
+        .annotate(period=reports.TIMEFRAMES[timeframe]('date'))
+        .values('goal', 'period')
+        .annotate(
+            total=Sum('amount'),
+            recent=Sum('amount', filter=Q(date__gt=today - timedelta(days=window), kind=SavingsContribution.DEPOSIT)),
+        )
+        .order_by('goal', 'period')
+    )
+    history, recent = defaultdict(list), defaultdict(Decimal)
+    for row in rows:
+        history[row['goal']].append((row['period'], row['total']))
+        recent[row['goal']] += row['recent'] or 0
+
+    results = []
+    for goal in goals:
+        periods = history[goal.pk]
+        saved = goal.current_amount - sum((total for _period, total in periods), Decimal('0.00'))
+        entries = []
+        for period, total in periods:
+            saved += total
+            if start_date is None or start_date <= period <= end_date:
+                entries.append({'period': str(period), 'contributed': total, 'saved': saved})
+
+        rate = recent[goal.pk] / window
+        completion = projected_completion(goal, rate, today)
+        results.append({
+            'goal': goal.pk,
+            'goal_name': goal.goal_name,
+            'currency': goal.currency,
+            'target_amount': goal.target_amount,
+            'current_amount': goal.current_amount,
+            'deadline': goal.deadline,
+            'progress': entries,
+            'daily_rate': rate.quantize(Decimal('0.01')),
+            'projected_completion_date': completion,
+            'on_track': completion is not None and completion <= goal.deadline,
+        })
+    return {'goals': results}
@@ -0,0 +1,71 @@
+"""Full-text search over Transaction.description.
+
+Each database vendor has its own index (created by migration 0009): an FTS5 table on
+SQLite and a GIN index on the description's tsvector on PostgreSQL. Other vendors fall
+back to unindexed substring matching. Every search term is matched as a prefix, all terms
+must match, and results come best match first.
+"""
+import re
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q, Value, FloatField
+from django.db.models.expressions import RawSQL
+
+
+TERM = re.compile(r'\w+', re.UNICODE)
+
+SQLITE_TABLE = 'finance_transaction_fts'
+POSTGRES_CONFIG = 'english'
+
+
+def terms(query):
+    """The words of a user query; punctuation and search operators are dropped."""
+    return TERM.findall(query)[:settings.FINANCE_SEARCH_MAX_TERMS]
+
+
+def search_sqlite(queryset, words):
+    # Quoting makes every word a literal; the trailing * makes it a prefix query.
+    match = ' '.join(f'"{word}"*' for word in words)
+    table = queryset.model._meta.db_table
+    # The IN list runs the MATCH once and looks transactions up by id, so unordered queries
+    # such as the paginator's COUNT never run it per row. The rank reads from a second
+    # MATCH over the index; LIMIT -1 stops SQLite from flattening it into a per-row MATCH
+    # and makes it scan once into a temporary index on rowid instead.
+    matches = RawSQL(f'SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s', [match])
+    rank = RawSQL(
+        f'SELECT ranked.score FROM (SELECT rowid, -bm25({SQLITE_TABLE}) AS score FROM {SQLITE_TABLE} '
+        f'WHERE {SQLITE_TABLE} MATCH %s LIMIT -1) AS ranked WHERE ranked.rowid = {table}.id',
+        [match], output_field=FloatField(),
+    )
+    return queryset.filter(id__in=matches).annotate(search_rank=rank)
+
+
+def search_postgresql(queryset, words):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+    vector = SearchVector('description', config=POSTGRES_CONFIG)
+    query = SearchQuery(' & '.join(f'{word}:*' for word in words), config=POSTGRES_CONFIG, search_type='raw')
+    return queryset.annotate(search_document=vector, search_rank=SearchRank(vector, query)).filter(search_document=query)
+
+
+def search_fallback(queryset, words):
+    condition = Q()
+    for word in words:
+        condition &= Q(description__icontains=word)
+    return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+BACKENDS = {
+    'sqlite': search_sqlite,
+    'postgresql': search_postgresql,
+}
+
+
+def search_transactions(queryset, query):
+    """Transactions of `queryset` whose description matches `query`, best match first."""
+    words = terms(query)
+    if not words:
+        return queryset.none()
+
+    backend = BACKENDS.get(connections[queryset.db].vendor, search_fallback)
+    return backend(queryset, words).order_by('-search_rank', '-date', '-id')
@@ -1,7 +1,8 @@
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from rest_framework import serializers
-from .models import Transaction, Category, Budget, SavingsGoal
+from .models import DEFAULT_CURRENCY, Transaction, Category, Budget, SavingsGoal, SavingsContribution, Job, RecurringTransaction
+from . import categories, currencies, jobs, recurring, savings
 from datetime import date
 
 
@@ -55,18 +56,68 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
+class OwnedCategoryField(serializers.PrimaryKeyRelatedField):
+    """Category reference resolved from the user's cached categories instead of a query."""
+    default_error_messages = {
+        **serializers.PrimaryKeyRelatedField.default_error_messages,
+        'not_owned': "You do not own this category.",
+    }
+
+    def to_internal_value(self, data):
+        request = self.context.get('request')
+        if not (request and request.user.is_authenticated):
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        category = categories.owned_category(request.user.id, pk)
+        if category is None:
+            if Category.objects.filter(pk=pk).exists():
+                self.fail('not_owned')
+            self.fail('does_not_exist', pk_value=data)
+        return category
+
+
+class CurrencyField(serializers.CharField):
+    """ISO 4217 currency code, accepted in any case and stored upper-case."""
+    default_error_messages = {
+        'invalid_code': "Currency must be a three-letter ISO 4217 code.",
+    }
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('required', False)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data).strip().upper()
+        if not currencies.is_code(value):
+            self.fail('invalid_code')
+        return value
+
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = ['id', 'name', 'category_type']
-        read_only_fields = ['id']
+        fields = ['id', 'name', 'category_type', 'updated_at']
+        read_only_fields = ['id', 'updated_at']
 
     def validate_name(self, value):
         """Ensure category name is unique per user and stripped of spaces."""
-        user = self.context['request'].user if self.context.get('request') else None
+        request = self.context.get('request')
         value = value.strip()
-        if Category.objects.filter(name__iexact=value, user=user).exists():
-            raise serializers.ValidationError("You already have a category with this name.")
+        if request and request.user.is_authenticated:
+            current = self.instance.pk if self.instance else None
+            taken = any(
+                name.lower() == value.lower()
+                for pk, (_category_type, name) in categories.owned_categories(request.user.id).items() if pk != current
+            )
+            if taken:
+                raise serializers.ValidationError("You already have a category with this name.")
         return value
 
     def validate_category_type(self, value):
@@ -77,11 +128,20 @@ class CategorySerializer(serializers.ModelSerializer):
         return value.lower()
 
 
+def check_budget_currency(budget, currency):
+    """Budgets total their transactions as stored, so they only take their own currency."""
+    if budget is not None and budget.currency != currency:
+        raise serializers.ValidationError({'budget': f"The budget is kept in {budget.currency}, not {currency}."})
+
+
 class TransactionSerializer(serializers.ModelSerializer):
+    category = OwnedCategoryField(queryset=Category.objects.all())
+    currency = CurrencyField()
+
     class Meta:
         model = Transaction
-        fields = ['id', 'category', 'amount', 'date', 'description']
-        read_only_fields = ['id']
+        fields = ['id', 'category', 'amount', 'currency', 'date', 'description', 'updated_at']
+        read_only_fields = ['id', 'updated_at']
     
     def validate_amount(self, value):
         """Ensure amount is positive."""
@@ -98,7 +158,7 @@ class TransactionSerializer(serializers.ModelSerializer):
     def validate_category(self, value):
         """Ensure category belongs to the authenticated user."""
         user = self.context.get('request').user if self.context.get('request') else None
-        if user and value.user != user:
+        if user and value.user_id != user.id:
             raise serializers.ValidationError("You do not own this category.")
         return value
 
@@ -109,16 +169,64 @@ class TransactionSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Description cannot be empty.")
         return value
     
+    def validate(self, data):
+        """Only expenses are tracked against a budget, and only in the budget's currency.
+
+        Both hold on update too: moving a budgeted transaction to an income category
+        takes it off its budget.
+        """
+        budget = data.get('budget')
+        if budget is None and self.instance and self.instance.budget_id:
+            budget = self.instance.budget
+        category = data.get('category', getattr(self.instance, 'category', None))
+        if budget is not None and category is not None and category.category_type != 'expense':
+            data['budget'] = budget = None
+        currency = data.get('currency', getattr(self.instance, 'currency', DEFAULT_CURRENCY))
+        check_budget_currency(budget, currency)
+        return data
+
     def create(self, validated_data):
-        user = self.context['request'].user 
-        return Transaction.objects.create(user = user, **validated_data)
+        validated_data['user'] = self.context['request'].user
+        return Transaction.objects.create(**validated_data)
     
 
+class TransactionImportSerializer(TransactionSerializer):
+    """Validate one bulk-import row against categories and budgets resolved up front.
+
+    The view passes the user's categories and budgets as id maps in the context, so
+    validating a row runs no queries.
+    """
+    category = serializers.IntegerField()
+    budget = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta(TransactionSerializer.Meta):
+        fields = TransactionSerializer.Meta.fields + ['budget']
+
+    def validate_category(self, value):
+        """Ensure category belongs to the authenticated user."""
+        category = self.context['categories'].get(value)
+        if category is None:
+            raise serializers.ValidationError("You do not own this category.")
+        return category
+
+    def validate_budget(self, value):
+        """Ensure budget belongs to the authenticated user."""
+        if value is None:
+            return None
+        budget = self.context['budgets'].get(value)
+        if budget is None:
+            raise serializers.ValidationError("Invalid budget selected")
+        return budget
+
+
 class BudgetSerializer(serializers.ModelSerializer):
+    category = OwnedCategoryField(queryset=Category.objects.all())
+    currency = CurrencyField()
+
     class Meta:
         model = Budget
-        fields = ['id', 'category', 'allocated_amount', 'start_date', 'end_date']
-        read_only_fields = ['id']
+        fields = ['id', 'category', 'allocated_amount', 'currency', 'start_date', 'end_date', 'spent_amount', 'transaction_count', 'updated_at']
+        read_only_fields = ['id', 'spent_amount', 'transaction_count', 'updated_at']
     
     def validate_allocated_amount(self, value):
         """Ensure allocated amount is positive."""
@@ -126,6 +234,12 @@ class BudgetSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Allocated amount must be greater than zero.")
         return round(value, 2)  # Ensure only two decimal places
 
+    def validate_currency(self, value):
+        """Ensure the currency of a budget stays that of its transactions."""
+        if self.instance and self.instance.transaction_count and value != self.instance.currency:
+            raise serializers.ValidationError("The currency of a budget with transactions cannot change.")
+        return value
+
     def validate_start_date(self, value):
         """Ensure start date is not in the past."""
         if not self.instance and value < date.today():
@@ -145,7 +259,7 @@ class BudgetSerializer(serializers.ModelSerializer):
     def validate_category(self, value):
         """Ensure category belongs to the authenticated user."""
         user = self.context['request'].user
-        if value.user != user:
+        if value.user_id != user.id:
             raise serializers.ValidationError("You do not own this category.")
         return value
     
@@ -156,10 +270,12 @@ class BudgetSerializer(serializers.ModelSerializer):
 
 
 class SavingsGoalSerializer(serializers.ModelSerializer):
+    currency = CurrencyField()
+
     class Meta:
         model = SavingsGoal
-        fields = ['id', 'goal_name', 'target_amount', 'current_amount', 'deadline']
-        read_only_fields = ['id']
+        fields = ['id', 'goal_name', 'target_amount', 'current_amount', 'currency', 'deadline', 'updated_at']
+        read_only_fields = ['id', 'updated_at']
     
     def validate_target_amount(self, value):
         """Ensure target amount is positive."""
@@ -173,6 +289,12 @@ class SavingsGoalSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Current amount cannot be negative.")
         return round(value, 2)
 
+    def validate_currency(self, value):
+        """Ensure the currency of a goal stays that of the transactions saved towards it."""
+        if self.instance and value != self.instance.currency and self.instance.contributions.filter(transaction__isnull=False).exists():
+            raise serializers.ValidationError("The currency of a goal with contributions from transactions cannot change.")
+        return value
+
     def validate_deadline(self, value):
         """Ensure deadline is in the future."""
         if value <= date.today():
@@ -191,6 +313,168 @@ class SavingsGoalSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        """Assign the user before saving the savings goal."""
+        """Assign the user before saving the savings goal; the starting amount is its first contribution."""
         user = self.context['request'].user
-        return SavingsGoal.objects.create(user=user, **validated_data)
\ No newline at end of file
+        current_amount = validated_data.pop('current_amount', 0)
+        goal = SavingsGoal.objects.create(user=user, **validated_data)
+        if current_amount:
+            savings.contribute(goal, current_amount, note="Starting amount", kind=SavingsContribution.OPENING)
+            goal.current_amount = current_amount
+        return goal
+
+    def update(self, instance, validated_data):
+        """Record a changed current amount as a correcting contribution instead of overwriting it."""
+        current_amount = validated_data.pop('current_amount', None)
+        instance = super().update(instance, validated_data)
+        if current_amount is not None and current_amount != instance.current_amount:
+            savings.contribute(instance, current_amount - instance.current_amount, note="Manual correction")
+            instance.current_amount = current_amount
+        return instance
+
+
+class SavingsContributionSerializer(serializers.ModelSerializer):
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    date = serializers.DateField(required=False)
+
+    class Meta:
+        model = SavingsContribution
+        fields = ['id', 'goal', 'transaction', 'amount', 'date', 'note', 'kind', 'updated_at']
+        read_only_fields = ['id', 'kind', 'updated_at']
+
+    def validate_goal(self, value):
+        """Ensure goal belongs to the authenticated user."""
+        if value.user_id != self.context['request'].user.id:
+            raise serializers.ValidationError("Invalid savings goal selected")
+        return value
+
+    def validate_transaction(self, value):
+        """Ensure transaction belongs to the authenticated user."""
+        if value is not None and value.user_id != self.context['request'].user.id:
+            raise serializers.ValidationError("Invalid transaction selected")
+        return value
+
+    def validate_amount(self, value):
+        """Ensure the contribution moves money."""
+        if value == 0:
+            raise serializers.ValidationError("Amount cannot be zero.")
+        return round(value, 2)
+
+    def validate(self, data):
+        """Default amount and date to the transaction's, and keep the goal's saved amount non-negative."""
+        def current(field):
+            return data.get(field, getattr(self.instance, field, None))
+
+        goal, transaction = current('goal'), current('transaction')
+        if transaction is not None:
+            if transaction.currency != goal.currency:
+                raise serializers.ValidationError(
+                    {'transaction': f"The goal is kept in {goal.currency}, not {transaction.currency}."}
+                )
+            data.setdefault('amount', current('amount') or transaction.amount)
+            data.setdefault('date', current('date') or transaction.date)
+        amount = current('amount')
+        if amount is None:
+            raise serializers.ValidationError({'amount': "Amount is required without a transaction."})
+        data.setdefault('date', current('date') or date.today())
+        if data['date'] > date.today():
+            raise serializers.ValidationError({'date': "Contribution date cannot be in the future."})
+
+        saved = goal.current_amount + amount
+        if self.instance and self.instance.goal_id == goal.pk:
+            saved -= self.instance.amount
+        if saved < 0:
+            raise serializers.ValidationError({'amount': "A goal's saved amount cannot go below zero."})
+        return data
+
+    def create(self, validated_data):
+        return SavingsContribution.objects.create(user=self.context['request'].user, **validated_data)
+
+
+class RecurringTransactionSerializer(serializers.ModelSerializer):
+    category = OwnedCategoryField(queryset=Category.objects.all())
+    currency = CurrencyField()
+
+    class Meta:
+        model = RecurringTransaction
+        fields = [
+            'id', 'category', 'amount', 'currency', 'description', 'budget', 'frequency', 'interval',
+            'start_date', 'until', 'count', 'next_date', 'last_date', 'updated_at'
+        ]
+        read_only_fields = ['id', 'next_date', 'last_date', 'updated_at']
+
+    def validate_amount(self, value):
+        """Ensure amount is positive."""
+        if value <= 0:
+            raise serializers.ValidationError("Transaction amount must be greater than zero.")
+        return round(value, 2)
+
+    def validate_interval(self, value):
+        """Ensure the schedule moves forward."""
+        if value < 1:
+            raise serializers.ValidationError("Interval must be at least 1.")
+        return value
+
+    def validate_count(self, value):
+        """Ensure a limited schedule has at least one occurrence."""
+        if value is not None and value < 1:
+            raise serializers.ValidationError("Count must be at least 1.")
+        return value
+
+    def validate_budget(self, value):
+        """Ensure budget belongs to the authenticated user."""
+        if value is not None and value.user_id != self.context['request'].user.id:
+            raise serializers.ValidationError("Invalid budget selected")
+        return value
+
+    def validate(self, data):
+        """Check the rule's dates, and that only expenses in the budget's currency use a budget."""
+        def current(field, default=None):
+            return data.get(field, getattr(self.instance, field, default))
+
+        start_date, until = current('start_date'), current('until')
+        if start_date and until and until < start_date:
+            raise serializers.ValidationError({"until": "Until must not be before the start date."})
+
+        if data.get('budget') and current('category').category_type != 'expense':
+            data['budget'] = None
+        check_budget_currency(current('budget'), current('currency', DEFAULT_CURRENCY))
+        return data
+
+    def create(self, validated_data):
+        schedule = RecurringTransaction(user=self.context['request'].user, **validated_data)
+        recurring.reschedule(schedule)
+        schedule.save()
+        return schedule
+
+    def update(self, instance, validated_data):
+        rule_changed = any(
+            getattr(instance, field) != validated_data[field]
+            for field in RecurringTransaction.RULE_FIELDS if field in validated_data
+        )
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        if rule_changed:
+            recurring.reschedule(instance)
+        instance.save()
+        return instance
+
+
+class JobSerializer(serializers.ModelSerializer):
+    kind = serializers.ChoiceField(choices=list(jobs.KINDS))
+
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'params', 'status', 'attempts', 'error', 'filename', 'created_at', 'finished_at']
+        read_only_fields = ['id', 'status', 'attempts', 'error', 'filename', 'created_at', 'finished_at']
+
+    def validate_params(self, value):
+        """Ensure params is an object of query parameters, whose values are strings like in a URL."""
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Params must be a JSON object.")
+        invalid = sorted(key for key, param in value.items() if not isinstance(param, str))
+        if invalid:
+            raise serializers.ValidationError(f"Params values must be strings: {', '.join(invalid)}.")
+        return value
+
+    def create(self, validated_data):
+        return jobs.submit(self.context['request'].user, validated_data['kind'], validated_data.get('params', {}))
@@ -0,0 +1,130 @@
+from functools import partial
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import Transaction, Category, Budget, SavingsGoal, SavingsContribution, RecurringTransaction
+from . import balances, caching, categories, replicas, rollups, savings, sync
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_transaction(sender, instance, **kwargs):
+    """Load the stored values of an updated transaction that was not read through the ORM."""
+    if instance.pk and not instance._state.adding and not hasattr(instance, '_original'):
+        instance._original = Transaction.objects.filter(pk=instance.pk).values(*Transaction.TRACKED_FIELDS).first()
+
+
+@receiver(post_save, sender=Transaction)
+def transaction_saved(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_original', None)
+    current = instance.tracked_values()
+
+    if previous != current:
+        removed = [previous] if previous else []
+        rollups.record(added=[current], removed=removed)
+        balances.record(added=[current], removed=removed)
+
+    instance._original = current
+
+
+@receiver(post_delete, sender=Transaction)
+def transaction_deleted(sender, instance, **kwargs):
+    removed = [getattr(instance, '_original', None) or instance.tracked_values()]
+    rollups.record(removed=removed)
+    balances.record(removed=removed)
+
+
+@receiver(pre_save, sender=SavingsContribution)
+def remember_contribution(sender, instance, **kwargs):
+    """Load the stored values of an updated contribution that was not read through the ORM."""
+    if instance.pk and not instance._state.adding and not hasattr(instance, '_original'):
+        instance._original = SavingsContribution.objects.filter(pk=instance.pk).values(*SavingsContribution.TRACKED_FIELDS).first()
+
+
+@receiver(post_save, sender=SavingsContribution)
+def contribution_saved(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_original', None)
+    current = instance.tracked_values()
+    if previous != current:
+        savings.record(added=[current], removed=[previous] if previous else [])
+    instance._original = current
+
+
+@receiver(post_delete, sender=SavingsContribution)
+def contribution_deleted(sender, instance, **kwargs):
+    savings.record(removed=[getattr(instance, '_original', None) or instance.tracked_values()])
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Budget)
+@receiver(post_save, sender=SavingsGoal)
+@receiver(post_save, sender=RecurringTransaction)
+@receiver(post_save, sender=SavingsContribution)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Budget)
+@receiver(post_delete, sender=SavingsGoal)
+@receiver(post_delete, sender=RecurringTransaction)
+@receiver(post_delete, sender=SavingsContribution)
+def user_data_changed(sender, instance, **kwargs):
+    bump_at_commit(instance.user_id)
+    replicas.stick_to_primary(instance.user_id)
+    if sender is Transaction:
+        # Transactions move the running totals shown on their budgets.
+        collections = ('transaction', 'budget')
+    elif sender is SavingsContribution:
+        # Contributions move the saved amounts shown on their goals.
+        collections = ('savingscontribution', 'savingsgoal')
+    else:
+        collections = (sender._meta.model_name,)
+    touch_at_commit(instance.user_id, *collections)
+
+
+def bump_at_commit(user_id):
+    """Move the report version once the write is visible; see touch_at_commit()."""
+    transaction.on_commit(partial(caching.bump_version, user_id))
+
+
+def touch_at_commit(user_id, *collections):
+    """Move the collection versions once the write is visible to other requests.
+
+    Moved earlier, a request could serialize the old rows under the new version and its
+    client would keep them, revalidated with 304s, until the next write.
+    """
+    transaction.on_commit(partial(caching.touch_collection, user_id, *collections))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    # Drop the map now and again at commit, so a request reading the old rows meanwhile
+    # cannot leave a stale copy behind.
+    user_id = instance.user_id
+    categories.forget(user_id)
+    transaction.on_commit(lambda: categories.forget(user_id))
+
+
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Budget)
+@receiver(post_delete, sender=SavingsGoal)
+def user_data_deleted(sender, instance, **kwargs):
+    sync.record_deletion(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        caching.reset_version(instance.pk)
+
+
+def transactions_bulk_created(transactions):
+    """Do the bookkeeping post_save would have done for rows inserted with bulk_create."""
+    added = [transaction.tracked_values() for transaction in transactions]
+    rollups.record(added=added)
+    balances.record(added=added)
+    for user_id in {transaction.user_id for transaction in transactions}:
+        bump_at_commit(user_id)
+        replicas.stick_to_primary(user_id)
+        touch_at_commit(user_id, 'transaction', 'budget')
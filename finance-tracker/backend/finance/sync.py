@@ -0,0 +1,83 @@
+"""Delta sync: everything a client must apply to catch up since its last sync token.
+
+A token is the server time (in microseconds) a sync started, moved back by
+FINANCE_SYNC_OVERLAP_SECONDS so rows saved by transactions still committing at that
+moment are picked up by the next sync. Clients therefore see some rows twice and must
+apply changes as upserts.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from .models import Transaction, Category, Budget, SavingsGoal, Tombstone
+
+
+def collections():
+    """Response key -> (model, serializer) of every synced collection.
+
+    The serializers import the signals (through recurring), which import this module,
+    so they are imported here rather than at the top.
+    """
+    from .serializers import TransactionSerializer, CategorySerializer, BudgetSerializer, SavingsGoalSerializer
+
+    return {
+        'categories': (Category, CategorySerializer),
+        'budgets': (Budget, BudgetSerializer),
+        'transactions': (Transaction, TransactionSerializer),
+        'savings_goals': (SavingsGoal, SavingsGoalSerializer),
+    }
+
+
+def encode_token(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def decode_token(token):
+    try:
+        microseconds = int(token)
+        return datetime.fromtimestamp(microseconds / 1_000_000, tz=dt_timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        raise ValidationError({'since': "Invalid sync token."})
+
+
+def changes(user, since=None, context=None):
+    """Rows of `user` changed and ids deleted since `since`, or a full snapshot when it is None.
+
+    Tokens older than the tombstone retention window also get a full snapshot, flagged
+    with 'full': True so the client replaces its local copy.
+    """
+    started = timezone.now()
+    if since is not None and since < started - timedelta(days=settings.FINANCE_SYNC_TOMBSTONE_DAYS):
+        since = None
+
+    tombstones = {}
+    if since is not None:
+        for model, object_id in (
+            Tombstone.objects.filter(user=user, deleted_at__gte=since).values_list('model', 'object_id')
+        ):
+            tombstones.setdefault(model, []).append(object_id)
+
+    data = {'full': since is None}
+    for key, (model, serializer_class) in collections().items():
+        queryset = model.objects.filter(user=user)
+        if since is not None:
+            queryset = queryset.filter(updated_at__gte=since)
+        data[key] = {
+            'updated': serializer_class(queryset.order_by('updated_at', 'id'), many=True, context=context).data,
+            'deleted': sorted(tombstones.get(model._meta.model_name, [])),
+        }
+
+    data['token'] = encode_token(started - timedelta(seconds=settings.FINANCE_SYNC_OVERLAP_SECONDS))
+    return data
+
+
+def record_deletion(instance):
+    Tombstone.objects.create(user_id=instance.user_id, model=instance._meta.model_name, object_id=instance.pk)
+
+
+def prune(older_than):
+    """Delete tombstones older than `older_than` and those of users that no longer exist."""
+    expired, _ = Tombstone.objects.filter(deleted_at__lt=older_than).delete()
+    orphaned, _ = Tombstone.objects.exclude(user_id__in=User.objects.values('pk')).delete()
+    return expired + orphaned
@@ -1,9 +1,30 @@
-from django.test import TestCase
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, transaction
 from django.contrib.auth.models import User
-from .models import Category, Transaction, Budget, SavingsGoal
-from datetime import date, timedelta
+from django.utils import timezone
+from .models import Category, Transaction, Budget, SavingsGoal, SavingsContribution, TransactionRollup, TokenBackedUser, Tombstone, Job, ExchangeRate, RecurringTransaction
+from . import async_views, authentication, benchmarks, caching, currencies, forecast, imports, jobs, recurring, replicas, rollups, savings
+from .metrics import registry as metrics_registry
+from .search import search_transactions
+from calendar import monthrange
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+import csv
+import json
+import os
+import tempfile
+import time
+from unittest import mock, skipUnless
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
 from django.urls import reverse
 
 class FinanceAPITestCase(TestCase):
@@ -149,4 +170,1688 @@ class FinanceAPITestCase(TestCase):
         response = self.client.post(reverse('category-list'), {
             'name': 'Investment', 'category_type': 'income'
         })
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class QueryPlanTestCase(TestCase):
+    """Check that the hot Transaction queries are served by the composite indexes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='planuser', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+
+        self.category = Category.objects.create(name='Rent', category_type='expense', user=self.user)
+        Transaction.objects.create(
+            user=self.user, amount=10.00, category=self.category, date=date.today(), description='Rent'
+        )
+
+    def explain_transaction_queries(self, url, params):
+        """Run the endpoint and return the query plans of every query that reads transactions."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        plans = []
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # The fixture is tiny, so force the planner to show which index it would pick.
+                cursor.execute('SET enable_seqscan = off')
+            for query in queries.captured_queries:
+                if 'finance_transaction' not in query['sql'] or 'COUNT(' in query['sql']:
+                    continue
+                cursor.execute(prefix + query['sql'])
+                plans.append(' '.join(str(column) for row in cursor.fetchall() for column in row))
+        self.assertTrue(plans)
+        return plans
+
+    def test_list_uses_user_date_index(self):
+        start, end = date.today() - timedelta(days=30), date.today()
+        for plan in self.explain_transaction_queries(reverse('transaction-list'), {'start_date': start, 'end_date': end}):
+            # Either (user, date) leading index serves the range scan.
+            self.assertRegex(plan, 'txn_user_(date_cover|keyset)_idx')
+
+    def test_list_by_category_uses_user_category_index(self):
+        for plan in self.explain_transaction_queries(reverse('transaction-list'), {'category': self.category.id}):
+            self.assertIn('txn_user_category_date_idx', plan)
+
+    @override_settings(FINANCE_REPORTS_USE_ROLLUPS=False)
+    def test_reports_use_user_date_index(self):
+        params = {'start_date': date.today() - timedelta(days=30), 'end_date': date.today()}
+        for name in ('total-income-expenses-report', 'income-expense-trends-report', 'net-worth-report'):
+            for plan in self.explain_transaction_queries(reverse(name), params):
+                self.assertIn('txn_user_date_cover_idx', plan)
+
+
+
+class ReportQueryTestCase(TestCase):
+    """Pin every report endpoint to a single scan of the user's transactions."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='reportuser', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+
+        income = Category.objects.create(name='Salary', category_type='income', user=self.user)
+        expense = Category.objects.create(name='Groceries', category_type='expense', user=self.user)
+        for day in range(20):
+            Transaction.objects.create(
+                user=self.user, amount=100.00, category=income, date=date(2025, 1, 1) + timedelta(days=day * 3), description='Pay'
+            )
+            Transaction.objects.create(
+                user=self.user, amount=40.00, category=expense, date=date(2025, 1, 1) + timedelta(days=day * 3), description='Food'
+            )
+        SavingsGoal.objects.create(
+            user=self.user, goal_name="House", target_amount=5000.00, current_amount=300.00,
+            deadline=date.today() + timedelta(days=300)
+        )
+
+    def test_total_income_expense_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('total-income-expenses-report'))
+        self.assertEqual(response.data['total_income'], 2000)
+        self.assertEqual(response.data['total_expense'], 800)
+
+    def test_trends_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('income-expense-trends-report'), {'timeframe': 'month'})
+        trends = response.data['trends']
+        self.assertEqual([row['period'] for row in trends], ['2025-01-01', '2025-02-01'])
+        self.assertEqual(sum(row['total_income'] for row in trends), 2000)
+        self.assertEqual(sum(row['total_expenses'] for row in trends), 800)
+
+    def test_trends_invalid_timeframe(self):
+        response = self.client.get(reverse('income-expense-trends-report'), {'timeframe': 'decade'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_trends_fill_gaps_in_range(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('income-expense-trends-report'), {
+                'timeframe': 'month', 'start_date': '2024-11-01', 'end_date': '2025-04-30'
+            })
+        trends = response.data['trends']
+        self.assertEqual(
+            [row['period'] for row in trends],
+            ['2024-11-01', '2024-12-01', '2025-01-01', '2025-02-01', '2025-03-01', '2025-04-01']
+        )
+        self.assertEqual(trends[0]['total_income'], 0)
+        self.assertEqual(trends[-1]['total_expenses'], 0)
+
+    def test_trends_every_timeframe(self):
+        expected = {'day': 58, 'week': 9, 'month': 2, 'quarter': 1, 'year': 1}
+        for timeframe, periods in expected.items():
+            with self.subTest(timeframe=timeframe):
+                response = self.client.get(reverse('income-expense-trends-report'), {'timeframe': timeframe})
+                trends = response.data['trends']
+                self.assertEqual(len(trends), periods)
+                self.assertEqual(sum(row['total_income'] for row in trends), 2000)
+
+    def test_trends_breakdown_by_category(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('income-expense-trends-report'), {
+                'timeframe': 'quarter', 'breakdown': 'category'
+            })
+        [quarter] = response.data['trends']
+        self.assertEqual(quarter['period'], '2025-01-01')
+        self.assertEqual(
+            [(entry['name'], entry['category_type'], entry['total']) for entry in quarter['breakdown']],
+            [('Salary', 'income', 2000), ('Groceries', 'expense', 800)]
+        )
+
+        response = self.client.get(reverse('income-expense-trends-report'), {'breakdown': 'category_type'})
+        self.assertEqual(response.data['trends'][0]['breakdown'][0]['category_type'], 'expense')
+
+    @override_settings(FINANCE_TRENDS_MAX_PERIODS=100)
+    def test_trends_period_limit(self):
+        response = self.client.get(reverse('income-expense-trends-report'), {
+            'timeframe': 'day', 'start_date': '2024-01-01', 'end_date': '2025-01-31'
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('income-expense-trends-report'), {'breakdown': 'merchant'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_net_worth_two_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('net-worth-report'))
+        self.assertEqual(response.data['net_worth'], 2000 - 800 + 300)
+        self.assertEqual(response.data['total_savings'], 300)
+
+
+
+class TransactionRollupTestCase(TestCase):
+    """Rollups follow transaction writes and the reports read from them."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='rollupuser', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+
+        self.income = Category.objects.create(name='Salary', category_type='income', user=self.user)
+        self.expense = Category.objects.create(name='Rent', category_type='expense', user=self.user)
+        self.transaction = Transaction.objects.create(
+            user=self.user, amount=100.00, category=self.expense, date=date(2025, 3, 14), description='Rent'
+        )
+
+    def rollup(self, granularity, period_start, category=None):
+        return TransactionRollup.objects.get(
+            user=self.user, category=category or self.expense, granularity=granularity, period_start=period_start
+        )
+
+    def test_create_updates_day_and_month_rollups(self):
+        Transaction.objects.create(
+            user=self.user, amount=50.00, category=self.expense, date=date(2025, 3, 20), description='Rent'
+        )
+        self.assertEqual(self.rollup('day', date(2025, 3, 14)).total, 100)
+        month = self.rollup('month', date(2025, 3, 1))
+        self.assertEqual((month.total, month.count), (150, 2))
+
+    def test_update_moves_amount_between_periods(self):
+        transaction = Transaction.objects.get(pk=self.transaction.pk)
+        transaction.amount = 80
+        transaction.date = date(2025, 4, 2)
+        transaction.save()
+
+        self.assertEqual(self.rollup('month', date(2025, 3, 1)).count, 0)
+        self.assertEqual(self.rollup('month', date(2025, 4, 1)).total, 80)
+
+    def test_delete_removes_amount(self):
+        self.transaction.delete()
+        self.assertEqual(self.rollup('day', date(2025, 3, 14)).total, 0)
+
+    def test_rebuild_command_repairs_rollups(self):
+        TransactionRollup.objects.all().delete()
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertEqual(self.rollup('month', date(2025, 3, 1)).total, 100)
+
+    def test_reports_match_raw_transactions(self):
+        Transaction.objects.create(
+            user=self.user, amount=300.00, category=self.income, date=date(2025, 3, 1), description='Pay'
+        )
+        for params in ({}, {'start_date': '2025-03-01', 'end_date': '2025-03-31'},
+                       {'start_date': '2025-03-10', 'end_date': '2025-03-20'}):
+            from_rollups = self.client.get(reverse('total-income-expenses-report'), params).data
+            with self.settings(FINANCE_REPORTS_USE_ROLLUPS=False):
+                from_transactions = self.client.get(reverse('total-income-expenses-report'), params).data
+            self.assertEqual(from_rollups, from_transactions)
+
+
+
+class BudgetNotificationTestCase(TestCase):
+    """Budget alerts come from one annotated query regardless of the number of budgets."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='budgetuser', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+
+    def add_budget(self, name, allocated, spent):
+        category = Category.objects.create(name=name, category_type='expense', user=self.user)
+        budget = Budget.objects.create(
+            user=self.user, category=category, allocated_amount=allocated,
+            start_date=date.today() - timedelta(days=5), end_date=date.today() + timedelta(days=25)
+        )
+        Transaction.objects.create(
+            user=self.user, amount=spent, category=category, date=date.today(), description=name, budget=budget
+        )
+        return budget
+
+    def test_query_count_does_not_grow_with_budgets(self):
+        for budget_count in (1, 10):
+            for index in range(budget_count):
+                self.add_budget(f'Category {budget_count}-{index}', 100.00, 150.00)
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse('budget-notifications'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_alerts_and_utilization(self):
+        over = self.add_budget('Dining', 100.00, 150.00)
+        self.add_budget('Fuel', 200.00, 50.00)
+
+        response = self.client.get(reverse('budget-notifications'))
+        self.assertEqual([alert['budget'] for alert in response.data['alerts']], [over.id])
+
+        fuel = next(budget for budget in response.data['budgets'] if budget['category'] == 'Fuel')
+        self.assertEqual(fuel['spent_amount'], 50)
+        self.assertEqual(fuel['remaining_amount'], 150)
+        self.assertEqual(fuel['utilization'], 25)
+
+
+
+class TransactionExportTestCase(TestCase):
+    """The export endpoint streams every filtered transaction in one response."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='exportuser', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+
+        self.income = Category.objects.create(name='Salary', category_type='income', user=self.user)
+        self.expense = Category.objects.create(name='Rent', category_type='expense', user=self.user)
+        for day in range(15):
+            Transaction.objects.create(
+                user=self.user, amount=10 + day, category=self.expense if day % 2 else self.income,
+                date=date(2025, 1, 1) + timedelta(days=day), description=f'Row, {day}'
+            )
+
+    def test_csv_export_is_unpaginated(self):
+        response = self.client.get(reverse('transaction-export'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+
+        rows = list(csv.reader(line.decode() for line in response.streaming_content))
+        self.assertEqual(rows[0][:3], ['id', 'date', 'category'])
+        self.assertEqual(len(rows), 16)
+        self.assertEqual(rows[1][6], 'Row, 0')
+
+    def test_ndjson_export_applies_filters(self):
+        response = self.client.get(reverse('transaction-export'), {
+            'export_format': 'ndjson', 'category_type': 'expense', 'start_date': '2025-01-05'
+        }, HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertTrue(records)
+        self.assertTrue(all(record['category_type'] == 'expense' and record['date'] >= '2025-01-05' for record in records))
+
+    def test_unknown_export_format(self):
+        response = self.client.get(reverse('transaction-export'), {'export_format': 'xlsx'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+
+class TransactionImportTestCase(TestCase):
+    """Bulk import validates rows in batch and keeps the valid ones."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='importuser', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+
+        self.income = Category.objects.create(name='Salary', category_type='income', user=self.user)
+        self.expense = Category.objects.create(name='Rent', category_type='expense', user=self.user)
+        self.budget = Budget.objects.create(
+            user=self.user, category=self.expense, allocated_amount=500.00,
+            start_date=date.today() - timedelta(days=5), end_date=date.today() + timedelta(days=25)
+        )
+        other = User.objects.create_user(username='otheruser', password='testpassword1234')
+        self.foreign = Category.objects.create(name='Other', category_type='expense', user=other)
+
+    def test_json_import_reports_row_errors(self):
+        today = date.today().isoformat()
+        rows = [
+            {'category': self.income.id, 'amount': '1000.00', 'date': today, 'description': 'Pay'},
+            {'category': self.expense.id, 'amount': '700.00', 'date': today, 'description': 'Rent', 'budget': self.budget.id},
+            {'category': self.foreign.id, 'amount': '5.00', 'date': today, 'description': 'Not mine'},
+            {'category': self.expense.id, 'amount': '-1', 'date': today, 'description': 'Negative'},
+        ]
+        response = self.client.post(reverse('transaction-bulk-import') + '?batch_size=1', rows, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+        self.assertEqual(Transaction.objects.get(description='Rent').budget, self.budget)
+        self.assertEqual(
+            TransactionRollup.objects.get(user=self.user, granularity='day', category=self.income).total, 1000
+        )
+
+    def test_csv_import(self):
+        upload = SimpleUploadedFile('history.csv', (
+            'category,amount,date,description\n'
+            f'{self.expense.id},12.50,2025-01-02,Coffee\n'
+            f'{self.expense.id},7.25,2025-01-03,Bagel\n'
+        ).encode(), content_type='text/csv')
+        response = self.client.post(reverse('transaction-bulk-import'), {'file': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+
+    def test_unreadable_csv_is_rejected(self):
+        for content in (
+            f'category,amount,date,description\n{self.expense.id},3.00,2025-01-02,Caf\u00e9\n'.encode('latin-1'),
+            f'category,amount,date,description\n{self.expense.id},3.00,2025-01-02,{"x" * 200000}\n'.encode(),
+        ):
+            upload = SimpleUploadedFile('history.csv', content, content_type='text/csv')
+            response = self.client.post(reverse('transaction-bulk-import'), {'file': upload}, format='multipart')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('error', response.data)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 0)
+
+    @override_settings(FINANCE_IMPORT_MAX_ROWS=2)
+    def test_csv_reading_stops_past_the_limit(self):
+        content = ('category,amount,date\n' + f'{self.expense.id},1.00,2025-01-02\n' * 10).encode()
+        self.assertEqual(len(imports.read_csv(SimpleUploadedFile('history.csv', content), 2)), 3)
+        upload = SimpleUploadedFile('history.csv', content, content_type='text/csv')
+        response = self.client.post(reverse('transaction-bulk-import'), {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_all_rows_invalid(self):
+        response = self.client.post(reverse('transaction-bulk-import'), [{'amount': '5.00'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['created'], 0)
+
+
+
+class TransactionSearchTestCase(TestCase):
+    """?q= searches descriptions through the full-text index, prefix-matching and ranked."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='searchuser', password='testpassword1234')
+        self.other = User.objects.create_user(username='searchother', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Food', category_type='expense', user=self.user)
+        other_category = Category.objects.create(name='Food', category_type='expense', user=self.other)
+
+        descriptions = ['Coffee beans', 'Coffee and coffee cake', 'Groceries at the market', 'Café latte']
+        self.transactions = {
+            description: Transaction.objects.create(
+                user=self.user, amount=5.00, category=self.category, date=date(2025, 1, 1 + index), description=description
+            ) for index, description in enumerate(descriptions)
+        }
+        Transaction.objects.create(user=self.other, amount=5.00, category=other_category, date=date(2025, 1, 1), description='Coffee')
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('transaction-list'), {'q': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['description'] for row in response.data['results']]
+
+    def test_prefix_match_ranked(self):
+        self.assertEqual(self.search('cof'), ['Coffee and coffee cake', 'Coffee beans'])
+        self.assertEqual(self.search('coffee be'), ['Coffee beans'])
+        self.assertEqual(self.search('cafe'), ['Café latte'])
+        self.assertEqual(self.search('market', category_type='income'), [])
+        self.assertEqual(self.search('"*'), [])
+
+        response = self.client.get(reverse('transaction-list'), {'q': 'cof', 'paginate': 'cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('paginate', response.data)
+
+    def test_index_follows_writes(self):
+        beans = self.transactions['Coffee beans']
+        beans.description = 'Tea leaves'
+        beans.save()
+        self.transactions['Coffee and coffee cake'].delete()
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, amount=1.00, category=self.category, date=date(2025, 2, 1), description='Teapot')
+        ])
+
+        self.assertEqual(self.search('coffee'), [])
+        self.assertEqual(sorted(self.search('tea')), ['Tea leaves', 'Teapot'])
+
+    def test_search_uses_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.search('groceries')
+        self.assertTrue(any('finance_transaction_fts MATCH' in query['sql'] for query in queries.captured_queries))
+
+        # The MATCH runs once as an IN list and the rank's once into a temporary index, never
+        # once per transaction (a rowid constraint on the virtual table); COUNT skips the rank.
+        queryset = search_transactions(Transaction.objects.filter(user=self.user), 'coffee')
+        for plan in (queryset.explain(), queryset.order_by().explain()):
+            self.assertIn('LIST SUBQUERY', plan)
+            self.assertNotRegex(plan, r'VIRTUAL TABLE INDEX \d+:=')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(queryset.count(), 2)
+        self.assertNotIn('bm25', queries.captured_queries[0]['sql'])
+
+
+def kill_worker(job_id):
+    """Stand-in for jobs.run_in_worker that dies the way an OOM-killed worker does."""
+    os._exit(1)
+
+
+class JobTestCase(TestCase):
+    """Reports and exports submitted as jobs are run by run_workers and downloadable afterwards."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='jobuser', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+        income = Category.objects.create(name='Salary', category_type='income', user=self.user)
+        expense = Category.objects.create(name='Rent', category_type='expense', user=self.user)
+        Transaction.objects.create(user=self.user, amount=700.00, category=income, date=date(2025, 1, 2), description='Pay')
+        Transaction.objects.create(user=self.user, amount=300.00, category=expense, date=date(2025, 1, 3), description='Rent')
+
+    def submit(self, kind, params):
+        response = self.client.post(reverse('job-list'), {'kind': kind, 'params': params}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        return response.data['id']
+
+    def work(self):
+        call_command('run_workers', '--once', '--inline', stdout=StringIO())
+
+    def test_export_and_report_jobs(self):
+        export = self.submit('export', {'export_format': 'csv', 'category_type': 'expense'})
+        report = self.submit('report', {'report': 'net-worth'})
+        self.assertEqual(
+            self.client.get(reverse('job-download', args=[export])).status_code, status.HTTP_409_CONFLICT
+        )
+        self.work()
+
+        job = self.client.get(reverse('job-detail', args=[export])).data
+        self.assertEqual((job['status'], job['attempts']), (Job.SUCCEEDED, 1))
+        response = self.client.get(reverse('job-download', args=[export]))
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        expected = self.client.get(reverse('transaction-export'), {'category_type': 'expense'})
+        self.assertEqual(response.content, b''.join(expected.streaming_content))
+
+        response = self.client.get(reverse('job-download', args=[report]))
+        self.assertEqual(json.loads(response.content), json.loads(self.client.get(reverse('net-worth-report')).content))
+
+    def test_invalid_params_fail_without_retry(self):
+        job_id = self.submit('report', {'report': 'income-expense-trends', 'timeframe': 'decade'})
+        self.work()
+        job = Job.objects.get(pk=job_id)
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 1))
+        self.assertIn('timeframe', job.error)
+
+        response = self.client.post(reverse('job-list'), {'kind': 'reindex', 'params': {}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse('job-list'), {
+            'kind': 'report', 'params': {'report': 'income-expense-trends', 'start_date': 20240101}
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('start_date', str(response.data['params']))
+
+    @override_settings(FINANCE_JOB_MAX_ATTEMPTS=2, FINANCE_JOB_RETRY_BACKOFF_SECONDS=60)
+    def test_errors_retry_with_backoff(self):
+        def broken(user, params):
+            raise RuntimeError("disk full")
+
+        job_id = self.submit('export', {})
+        with mock.patch.dict(jobs.KINDS, {'export': broken}), self.assertLogs('finance.jobs', level='ERROR') as logs:
+            self.work()
+            job = Job.objects.get(pk=job_id)
+            self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+            self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=50))
+            self.assertIn('disk full', logs.output[0])
+            self.assertEqual(job.error, jobs.INTERNAL_ERROR)
+
+            self.work()
+            self.assertEqual(Job.objects.get(pk=job_id).attempts, 1)
+
+            Job.objects.filter(pk=job_id).update(run_after=timezone.now())
+            self.work()
+            job = Job.objects.get(pk=job_id)
+            self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_claims_are_exclusive_and_stale_jobs_requeued(self):
+        first, second = self.submit('export', {}), self.submit('export', {})
+        self.assertEqual(jobs.claim(5), [first, second])
+        self.assertEqual(jobs.claim(5), [])
+
+        Job.objects.filter(pk=first).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(jobs.claim(5), [first])
+
+    @override_settings(FINANCE_JOB_MAX_ATTEMPTS=2)
+    def test_jobs_that_keep_killing_workers_fail(self):
+        job_id = self.submit('export', {})
+        for attempt in range(2):
+            self.assertEqual(jobs.claim(5), [job_id])
+            Job.objects.filter(pk=job_id).update(locked_at=timezone.now() - timedelta(hours=1))
+            jobs.requeue_stale()
+        job = Job.objects.get(pk=job_id)
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertEqual(jobs.claim(5), [])
+
+    def test_a_killed_worker_does_not_stop_the_pool(self):
+        first, second = self.submit('export', {}), self.submit('export', {})
+        stderr = StringIO()
+        with mock.patch.object(jobs, 'run_in_worker', kill_worker):
+            call_command('run_workers', '--once', '--concurrency', '1', stdout=StringIO(), stderr=stderr)
+
+        # Both jobs were handed to a pool, the second one to the pool rebuilt after the first died.
+        self.assertEqual(stderr.getvalue().count("starting a new pool"), 2)
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {Job.RUNNING})
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(), 2)
+        self.assertEqual(jobs.claim(5), [first, second])
+
+    def test_jobs_are_private(self):
+        job_id = self.submit('export', {})
+        self.client.force_authenticate(user=User.objects.create_user(username='jobother', password='testpassword1234'))
+        self.assertEqual(self.client.get(reverse('job-detail', args=[job_id])).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(reverse('job-list')).data['results'], [])
+
+
+class KeysetPaginationTestCase(TestCase):
+    """?paginate=cursor walks the lists on (date, id) without counting rows."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='cursoruser', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+
+        category = Category.objects.create(name='Rent', category_type='expense', user=self.user)
+        # Several rows share a date so the id tie-breaker is exercised.
+        for index in range(25):
+            Transaction.objects.create(
+                user=self.user, amount=1 + index, category=category,
+                date=date(2025, 1, 1) + timedelta(days=index // 3), description=f'Row {index}'
+            )
+
+    def test_walks_every_transaction_once_in_order(self):
+        seen = []
+        url = reverse('transaction-list') + '?paginate=cursor&page_size=4'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+            seen.extend(response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(len(seen), 25)
+        keys = [(row['date'], row['id']) for row in seen]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('transaction-list'), {'paginate': 'cursor', 'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_number_pagination_is_still_the_default(self):
+        response = self.client.get(reverse('transaction-list'))
+        self.assertEqual(response.data['count'], 25)
+
+    def test_savings_goals_cursor(self):
+        for days in (30, 10, 20):
+            SavingsGoal.objects.create(
+                user=self.user, goal_name=f'Goal {days}', target_amount=100.00, deadline=date.today() + timedelta(days=days)
+            )
+        response = self.client.get(reverse('savingsgoal-list'), {'paginate': 'cursor', 'page_size': 2})
+        self.assertEqual([goal['goal_name'] for goal in response.data['results']], ['Goal 10', 'Goal 20'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([goal['goal_name'] for goal in response.data['results']], ['Goal 30'])
+        self.assertIsNone(response.data['next'])
+
+
+
+class ReportCacheTestCase(TestCase):
+    """Reports are cached per user and invalidated by writes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='cacheuser', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Salary', category_type='income', user=self.user)
+
+    def test_second_request_is_served_from_cache(self):
+        url = reverse('net-worth-report')
+        self.assertEqual(self.client.get(url)['X-Report-Cache'], 'miss')
+        hits = caching.stats()['hits']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Report-Cache'], 'hit')
+        self.assertEqual(caching.stats()['hits'], hits + 1)
+
+    def test_query_params_are_normalized(self):
+        url = reverse('total-income-expenses-report')
+        self.client.get(url, {'start_date': '2025-01-01', 'end_date': '2025-01-31'})
+        response = self.client.get(url + '?end_date=2025-01-31&start_date=2025-01-01')
+        self.assertEqual(response['X-Report-Cache'], 'hit')
+
+    def test_write_through_viewset_invalidates(self):
+        url = reverse('total-income-expenses-report')
+        self.assertEqual(self.client.get(url).data['total_income'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('transaction-list'), {
+                'category': self.category.id, 'amount': 75.00, 'date': date.today(), 'description': 'Bonus'
+            })
+        response = self.client.get(url)
+        self.assertEqual(response['X-Report-Cache'], 'miss')
+        self.assertEqual(response.data['total_income'], 75)
+
+    def test_version_moves_at_commit(self):
+        url = reverse('total-income-expenses-report')
+        version = caching.get_version(self.user.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Transaction.objects.create(user=self.user, amount=75.00, category=self.category, date=date.today())
+                # A report computed now would be stored under the version the other requests still use.
+                self.assertEqual(caching.get_version(self.user.id), version)
+                self.assertEqual(self.client.get(url)['X-Report-Cache'], 'miss')
+        self.assertNotEqual(caching.get_version(self.user.id), version)
+        self.assertEqual(self.client.get(url)['X-Report-Cache'], 'miss')
+
+    def test_users_do_not_share_entries(self):
+        url = reverse('total-income-expenses-report')
+        self.client.get(url)
+        other = User.objects.create_user(username='cacheother', password='testpassword1234')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(url)['X-Report-Cache'], 'miss')
+
+
+
+class CategoryCacheTestCase(TestCase):
+    """Category validation reads the per-user category cache instead of the database."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='catcacheuser', password='testpassword1234')
+        self.other = User.objects.create_user(username='catcacheother', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Food', category_type='expense', user=self.user)
+        self.foreign = Category.objects.create(name='Rent', category_type='expense', user=self.other)
+
+    def post_transaction(self, category):
+        return self.client.post(reverse('transaction-list'), {
+            'amount': '9.99', 'category': category, 'date': '2025-01-05', 'description': 'Lunch'
+        })
+
+    def category_queries(self, queries):
+        return [query for query in queries.captured_queries if 'FROM "finance_category"' in query['sql']]
+
+    def test_warm_cache_avoids_category_queries(self):
+        self.post_transaction(self.category.id)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_transaction(self.category.id)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.category_queries(queries), [])
+        self.assertEqual(Transaction.objects.filter(category=self.category).count(), 2)
+
+    def test_writes_invalidate_cache(self):
+        self.post_transaction(self.category.id)
+        created = self.client.post(reverse('category-list'), {'name': 'Travel', 'category_type': 'expense'})
+        self.assertEqual(self.post_transaction(created.data['id']).status_code, status.HTTP_201_CREATED)
+
+        response = self.client.post(reverse('category-list'), {'name': 'travel', 'category_type': 'income'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(reverse('category-detail', args=[self.category.id]), {'name': 'Food'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_foreign_and_missing_categories(self):
+        response = self.post_transaction(self.foreign.id)
+        self.assertEqual(response.data['category'], ["You do not own this category."])
+        response = self.post_transaction(999999)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['category'][0].code, 'does_not_exist')
+
+
+class DashboardTestCase(TestCase):
+    """/api/dashboard/ bundles the dashboard requests and revalidates with ETags."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='dashboarduser', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+
+        income = Category.objects.create(name='Salary', category_type='income', user=self.user)
+        self.expense = Category.objects.create(name='Rent', category_type='expense', user=self.user)
+        Budget.objects.create(
+            user=self.user, category=self.expense, allocated_amount=100.00,
+            start_date=date(2025, 1, 1), end_date=date(2025, 1, 31)
+        )
+        Transaction.objects.create(user=self.user, amount=900.00, category=income, date=date(2025, 1, 3), description='Pay')
+        for day in range(12):
+            Transaction.objects.create(
+                user=self.user, amount=20.00, category=self.expense, date=date(2025, 1, 4 + day), description='Rent'
+            )
+        SavingsGoal.objects.create(
+            user=self.user, goal_name="Trip", target_amount=800.00, current_amount=50.00,
+            deadline=date.today() + timedelta(days=60)
+        )
+
+    def test_matches_individual_endpoints(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+
+        self.assertEqual(data['income_expenses'], self.client.get(reverse('total-income-expenses-report')).data)
+        self.assertEqual(data['trends'], self.client.get(reverse('income-expense-trends-report')).data['trends'])
+        self.assertEqual(data['net_worth'], self.client.get(reverse('net-worth-report')).data)
+        self.assertEqual(data['budget_notifications'], self.client.get(reverse('budget-notifications')).data)
+
+        first_page = self.client.get(reverse('transaction-list'), {'paginate': 'cursor'}).data
+        self.assertEqual(data['transactions']['results'], first_page['results'])
+        rest = self.client.get(reverse('transaction-list'), {'paginate': 'cursor', 'cursor': data['transactions']['next_cursor']})
+        self.assertEqual(len(rest.data['results']), 3)
+
+    def test_unchanged_dashboard_is_not_modified(self):
+        etag = self.client.get(reverse('dashboard'))['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        self.assertNotEqual(self.client.get(reverse('dashboard'), {'timeframe': 'week'})['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(user=self.user, amount=5.00, category=self.expense, date=date(2025, 1, 20), description='Fee')
+        response = self.client.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ConditionalGetTestCase(TestCase):
+    """Unchanged viewset routes revalidate to 304 without querying the database."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='etaguser', password='testpassword1234')
+        self.other = User.objects.create_user(username='etagother', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Food', category_type='expense', user=self.user)
+        self.budget = Budget.objects.create(
+            user=self.user, category=self.category, allocated_amount=100.00,
+            start_date=date(2025, 1, 1), end_date=date(2025, 1, 31)
+        )
+        Category.objects.create(name='Wages', category_type='income', user=self.other)
+
+    def assertNotModified(self, url, etag):
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_and_detail_revalidate(self):
+        for url in (reverse('transaction-list'), reverse('category-list'), reverse('budget-list'),
+                    reverse('savingsgoal-list'), reverse('budget-detail', args=[self.budget.id])):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertIn('Last-Modified', response)
+                self.assertNotModified(url, response['ETag'])
+
+    def test_changes_invalidate_collection(self):
+        budgets = self.client.get(reverse('budget-list'))['ETag']
+        transactions = self.client.get(reverse('transaction-list'))['ETag']
+        categories = self.client.get(reverse('category-list'))['ETag']
+
+        Category.objects.create(name='Bonus', category_type='income', user=self.other)
+        self.assertNotModified(reverse('category-list'), categories)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(
+                user=self.user, amount=10.00, category=self.category, budget=self.budget, date=date(2025, 1, 5), description='Lunch'
+            )
+        for url, etag in ((reverse('budget-list'), budgets), (reverse('transaction-list'), transactions)):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotModified(reverse('category-list'), categories)
+
+    def test_versions_move_at_commit(self):
+        url = reverse('transaction-list')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Transaction.objects.create(user=self.user, amount=10.00, category=self.category, date=date(2025, 1, 5))
+                # Other requests cannot see the row yet, so they must not get a new version either.
+                self.assertNotModified(url, etag)
+        etag = self.client.get(url, HTTP_IF_NONE_MATCH=etag)['ETag']
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            imports.import_transactions(self.user, [{'category': self.category.id, 'amount': '5.00', 'date': '2025-01-06'}], 10)
+        self.assertNotModified(url, etag)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_if_modified_since(self):
+        url = reverse('budget-list')
+        clock = [1_700_000_000.2]
+        with mock.patch('time.time', lambda: clock[0]), mock.patch('time.time_ns', lambda: int(clock[0] * 10 ** 9)):
+            caching.touch_collection(self.user.id, 'budget')
+            clock[0] += 0.3
+            last_modified = self.client.get(url)['Last-Modified']
+            clock[0] += 0.3
+            caching.touch_collection(self.user.id, 'budget')  # A write later in the same second.
+            clock[0] += 1
+
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_categories_are_scoped_to_user(self):
+        response = self.client.get(reverse('category-list'), {'category_type': 'expense'})
+        self.assertEqual([category['name'] for category in response.data], ['Food'])
+        self.assertEqual(self.client.get(reverse('category-list'), {'category_type': 'income'}).data, [])
+
+
+@override_settings(FINANCE_SYNC_OVERLAP_SECONDS=0)
+class DeltaSyncTestCase(TestCase):
+    """/api/sync/ returns only what changed since the client's token, deletions included."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='syncuser', password='testpassword1234')
+        self.other = User.objects.create_user(username='syncother', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Food', category_type='expense', user=self.user)
+        self.transactions = [
+            Transaction.objects.create(
+                user=self.user, amount=10.00 + day, category=self.category, date=date(2025, 1, 1 + day), description='Lunch'
+            ) for day in range(5)
+        ]
+
+    def test_full_snapshot_without_token(self):
+        data = self.client.get(reverse('sync')).data
+        self.assertTrue(data['full'])
+        self.assertEqual(len(data['transactions']['updated']), 5)
+        self.assertEqual([category['name'] for category in data['categories']['updated']], ['Food'])
+
+    def test_changes_since_token(self):
+        token = self.client.get(reverse('sync')).data['token']
+
+        changed, removed = self.transactions[0], self.transactions[1]
+        removed_id = removed.id
+        changed.description = 'Dinner'
+        changed.save()
+        removed.delete()
+        goal = SavingsGoal.objects.create(
+            user=self.user, goal_name='Bike', target_amount=300.00, deadline=date.today() + timedelta(days=30)
+        )
+        other_category = Category.objects.create(name='Misc', category_type='expense', user=self.other)
+        other_category.delete()
+
+        with self.assertNumQueries(5):
+            data = self.client.get(reverse('sync'), {'since': token}).data
+        self.assertFalse(data['full'])
+        self.assertEqual([row['description'] for row in data['transactions']['updated']], ['Dinner'])
+        self.assertEqual(data['transactions']['deleted'], [removed_id])
+        self.assertEqual([row['id'] for row in data['savings_goals']['updated']], [goal.id])
+        self.assertEqual(data['categories'], {'updated': [], 'deleted': []})
+
+        data = self.client.get(reverse('sync'), {'since': data['token']}).data
+        self.assertEqual(data['transactions'], {'updated': [], 'deleted': []})
+
+    def test_invalid_and_expired_tokens(self):
+        self.assertEqual(self.client.get(reverse('sync'), {'since': 'yesterday'}).status_code, status.HTTP_400_BAD_REQUEST)
+        data = self.client.get(reverse('sync'), {'since': '1000000'}).data
+        self.assertTrue(data['full'])
+        self.assertEqual(len(data['transactions']['updated']), 5)
+
+    def test_prune_tombstones(self):
+        kept, expired = self.transactions[0].id, self.transactions[1].id
+        self.transactions[0].delete()
+        self.transactions[1].delete()
+        Tombstone.objects.filter(object_id=expired).update(deleted_at=datetime(2000, 1, 1, tzinfo=dt_timezone.utc))
+        Tombstone.objects.create(user_id=987654, model='transaction', object_id=1)
+        call_command('prune_tombstones', stdout=StringIO())
+        self.assertEqual(list(Tombstone.objects.values_list('object_id', flat=True)), [kept])
+
+
+class CurrencyTestCase(TestCase):
+    """Amounts carry a currency and reports convert them with the loaded exchange rates."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='fxuser', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+        self.income = Category.objects.create(name='Salary', category_type='income', user=self.user)
+        self.expense = Category.objects.create(name='Travel', category_type='expense', user=self.user)
+        Transaction.objects.create(user=self.user, amount=100.00, category=self.income, date=date(2025, 3, 10))
+        Transaction.objects.create(
+            user=self.user, amount=50.00, currency='EUR', category=self.expense, date=date(2025, 3, 12)
+        )
+        currencies.forget_rates()
+        self.load_rates([('2025-03-01', 'USD', 'EUR', '0.90000000'), ('2025-03-11', 'USD', 'EUR', '0.80000000')])
+
+    def load_rates(self, rows, *args):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            writer = csv.writer(handle)
+            writer.writerow(['date', 'base', 'quote', 'rate'])
+            writer.writerows(rows)
+        self.addCleanup(os.unlink, handle.name)
+        call_command('load_exchange_rates', handle.name, '--inverse', *args, stdout=StringIO())
+
+    def test_load_command_upserts_and_inverts(self):
+        self.assertEqual(ExchangeRate.objects.count(), 4)
+        self.assertEqual(ExchangeRate.objects.get(base='EUR', quote='USD', date=date(2025, 3, 11)).rate, Decimal('1.25'))
+
+        self.load_rates([('2025-03-01', 'usd', 'eur', '0.95')])
+        self.assertEqual(ExchangeRate.objects.count(), 4)
+        self.assertEqual(ExchangeRate.objects.get(base='USD', quote='EUR', date=date(2025, 3, 1)).rate, Decimal('0.95'))
+
+    def test_reports_convert_with_the_rate_of_each_day(self):
+        url = reverse('total-income-expenses-report')
+        self.assertEqual(self.client.get(url).data, {'total_income': 100, 'total_expense': 50})
+
+        # The income on 03-10 uses the 03-01 rate; the EUR expense needs no conversion.
+        self.assertEqual(self.client.get(url, {'currency': 'eur'}).data, {'total_income': 90, 'total_expense': 50})
+        # 50 EUR on 03-12 converts at the 03-11 inverse rate of 1.25.
+        data = self.client.get(url, {'currency': 'USD', 'start_date': '2025-03-01', 'end_date': '2025-03-31'}).data
+        self.assertEqual(data, {'total_income': 100, 'total_expense': Decimal('62.50')})
+
+        with self.settings(FINANCE_REPORTS_USE_ROLLUPS=False):
+            self.assertEqual(
+                self.client.get(url, {'currency': 'USD', 'start_date': '2025-03-01', 'end_date': '2025-03-31'}).data,
+                data
+            )
+
+        trends = self.client.get(reverse('income-expense-trends-report'), {'currency': 'EUR'}).data['trends']
+        self.assertEqual(trends, [{'period': '2025-03-01', 'total_income': 90, 'total_expenses': 50}])
+        self.assertEqual(self.client.get(url, {'currency': 'EURO'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_net_worth_converts_savings_with_memoized_rates(self):
+        SavingsGoal.objects.create(
+            user=self.user, goal_name='Trip', target_amount=1000.00, current_amount=100.00, currency='EUR',
+            deadline=date.today() + timedelta(days=30)
+        )
+        data = self.client.get(reverse('net-worth-report'), {'currency': 'USD'}).data
+        self.assertEqual(data['total_savings'], 125)
+        self.assertEqual(data['net_worth'], Decimal('162.50'))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(currencies.rate('EUR', 'USD', timezone.localdate()), Decimal('1.25'))
+        self.assertIsNone(currencies.rate('EUR', 'GBP', timezone.localdate()))
+
+    def test_rates_loaded_elsewhere_replace_memoized_ones(self):
+        self.assertIsNone(currencies.rate('GBP', 'USD', date(2025, 3, 12)))
+        # Another process loads the rate: the table and the shared version move, this memo is untouched.
+        ExchangeRate.objects.create(base='GBP', quote='USD', date=date(2025, 3, 1), rate=Decimal('1.3'))
+        caching.bump_rates_version()
+        self.assertEqual(currencies.rate('GBP', 'USD', date(2025, 3, 12)), Decimal('1.3'))
+
+    def test_loading_rates_invalidates_converted_reports(self):
+        url = reverse('total-income-expenses-report')
+        self.client.get(url, {'currency': 'EUR'})
+        self.client.get(url)
+
+        self.load_rates([('2025-03-01', 'USD', 'EUR', '0.5')])
+        response = self.client.get(url, {'currency': 'EUR'})
+        self.assertEqual(response['X-Report-Cache'], 'miss')
+        self.assertEqual(response.data['total_income'], 50)
+        self.assertEqual(self.client.get(url)['X-Report-Cache'], 'hit')
+
+    def test_rollups_keep_currencies_apart(self):
+        Transaction.objects.create(user=self.user, amount=20.00, category=self.expense, date=date(2025, 3, 12))
+        rows = TransactionRollup.objects.filter(user=self.user, granularity='month', category=self.expense)
+        self.assertEqual(dict(rows.values_list('currency', 'total')), {'EUR': 50, 'USD': 20})
+
+    def test_currency_codes_and_budget_currency_are_validated(self):
+        response = self.client.post(reverse('transaction-list'), {
+            'category': self.expense.id, 'amount': 10.00, 'currency': 'gbp', 'date': date.today(), 'description': 'Taxi'
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['currency'], 'GBP')
+
+        response = self.client.post(reverse('transaction-list'), {
+            'category': self.expense.id, 'amount': 10.00, 'currency': 'pounds', 'date': date.today(), 'description': 'Taxi'
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        budget = Budget.objects.create(
+            user=self.user, category=self.expense, allocated_amount=500.00,
+            start_date=date.today(), end_date=date.today() + timedelta(days=30)
+        )
+        response = self.client.post(reverse('transaction-list'), {
+            'category': self.expense.id, 'amount': 10.00, 'currency': 'EUR', 'date': date.today(),
+            'description': 'Taxi', 'budget': budget.id
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Transaction.objects.filter(budget=budget).count(), 0)
+
+    def test_budget_currency_holds_on_update(self):
+        budget = Budget.objects.create(
+            user=self.user, category=self.expense, allocated_amount=500.00,
+            start_date=date.today(), end_date=date.today() + timedelta(days=30)
+        )
+        linked = Transaction.objects.create(user=self.user, amount=10.00, category=self.expense, date=date.today(), budget=budget)
+        url = reverse('transaction-detail', args=[linked.id])
+        self.assertEqual(self.client.patch(url, {'currency': 'EUR'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.patch(url, {'amount': 12.00}).status_code, status.HTTP_200_OK)
+        budget.refresh_from_db()
+        self.assertEqual((budget.currency, budget.spent_amount), ('USD', 12))
+
+    def test_converted_reports_reject_rows_without_a_rate(self):
+        Transaction.objects.create(
+            user=self.user, amount=20.00, currency='GBP', category=self.expense, date=date(2025, 3, 15)
+        )
+        url = reverse('total-income-expenses-report')
+        response = self.client.get(url, {'currency': 'EUR'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('GBP', str(response.data['currency']))
+        # A rate from before the earliest GBP row covers every later one.
+        self.load_rates([('2025-03-14', 'GBP', 'EUR', '1.20000000')])
+        self.assertEqual(self.client.get(url, {'currency': 'EUR'}).data, {'total_income': 90, 'total_expense': 74})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        SavingsGoal.objects.create(
+            user=self.user, goal_name='Trip', target_amount=1000.00, current_amount=100.00, currency='CHF',
+            deadline=date.today() + timedelta(days=30)
+        )
+        response = self.client.get(reverse('net-worth-report'), {'currency': 'EUR'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('CHF', str(response.data['currency']))
+
+
+class RecurringTransactionTestCase(TestCase):
+    """Recurring schedules are materialized in batches and projected into trends."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='recurringuser', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+        self.income = Category.objects.create(name='Salary', category_type='income', user=self.user)
+        self.rent = Category.objects.create(name='Rent', category_type='expense', user=self.user)
+
+    def schedule(self, **fields):
+        response = self.client.post(reverse('recurringtransaction-list'), {
+            'category': self.rent.id, 'amount': 800.00, 'description': 'Rent', 'frequency': 'monthly',
+            'start_date': '2025-01-31', **fields
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        return RecurringTransaction.objects.get(pk=response.data['id'])
+
+    def materialize(self, day):
+        call_command('materialize_recurring', '--date', day, stdout=StringIO())
+
+    def test_materialize_clamps_month_ends_and_is_idempotent(self):
+        schedule = self.schedule()
+        self.assertEqual(schedule.next_date, date(2025, 1, 31))
+
+        self.materialize('2025-04-15')
+        dates = list(Transaction.objects.filter(recurring=schedule).order_by('date').values_list('date', flat=True))
+        self.assertEqual(dates, [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31)])
+        schedule.refresh_from_db()
+        self.assertEqual((schedule.next_date, schedule.last_date), (date(2025, 4, 30), date(2025, 3, 31)))
+
+        self.materialize('2025-04-15')
+        self.assertEqual(Transaction.objects.filter(recurring=schedule).count(), 3)
+
+        # A rewound schedule skips the occurrences that were already written.
+        RecurringTransaction.objects.filter(pk=schedule.pk).update(next_date=date(2025, 1, 31))
+        self.materialize('2025-04-30')
+        self.assertEqual(Transaction.objects.filter(recurring=schedule).count(), 4)
+        self.assertEqual(
+            self.client.get(reverse('total-income-expenses-report')).data['total_expense'], 3200
+        )
+
+    def test_count_until_and_budget(self):
+        budget = Budget.objects.create(
+            user=self.user, category=self.rent, allocated_amount=2000.00,
+            start_date=date(2025, 1, 1), end_date=date(2025, 1, 31)
+        )
+        weekly = self.schedule(frequency='weekly', interval=2, start_date='2025-01-01', count=3, budget=budget.id)
+        daily = self.schedule(frequency='daily', start_date='2025-01-01', until='2025-01-04')
+
+        self.materialize('2025-12-31')
+        self.assertEqual(
+            list(Transaction.objects.filter(recurring=weekly).values_list('date', 'budget')),
+            [(date(2025, 1, 1), budget.id), (date(2025, 1, 15), budget.id), (date(2025, 1, 29), budget.id)]
+        )
+        self.assertEqual(Transaction.objects.filter(recurring=daily).count(), 4)
+        weekly.refresh_from_db()
+        self.assertIsNone(weekly.next_date)
+        budget.refresh_from_db()
+        self.assertEqual((budget.spent_amount, budget.transaction_count), (2400, 3))
+
+    def test_queries_do_not_grow_with_schedules(self):
+        def queries(schedules):
+            # A fresh category each time, so both runs create the same number of rollup rows.
+            category = Category.objects.create(name=f'Subscriptions {schedules}', category_type='expense', user=self.user)
+            RecurringTransaction.objects.bulk_create([
+                RecurringTransaction(
+                    user=self.user, category=category, amount=10, frequency='monthly',
+                    start_date=date(2025, 1, 1), next_date=date(2025, 1, 1)
+                ) for _ in range(schedules)
+            ])
+            with CaptureQueriesContext(connection) as context:
+                recurring.materialize(date(2025, 3, 1))
+            return len(context)
+
+        self.assertEqual(queries(3), queries(30))
+        self.assertEqual(Transaction.objects.filter(recurring__isnull=False).count(), 99)
+
+    def test_rule_change_restarts_after_last_occurrence(self):
+        schedule = self.schedule(start_date='2025-01-01')
+        self.materialize('2025-02-10')
+        response = self.client.patch(
+            reverse('recurringtransaction-detail', kwargs={'pk': schedule.id}), {'frequency': 'weekly'}
+        )
+        self.assertEqual(response.data['next_date'], '2025-02-05')
+
+    def test_trends_project_unwritten_occurrences(self):
+        self.schedule(start_date='2025-01-31')
+        self.schedule(category=self.income.id, amount=3000.00, start_date='2025-02-01', description='Pay')
+        Transaction.objects.create(user=self.user, amount=50.00, category=self.rent, date=date(2025, 2, 3))
+        self.materialize('2025-01-31')
+
+        url = reverse('income-expense-trends-report')
+        params = {'start_date': '2025-01-01', 'end_date': '2025-03-31', 'breakdown': 'category'}
+        trends = self.client.get(url, params).data['trends']
+        self.assertEqual([period['total_expenses'] for period in trends], [800, 50, 0])
+
+        trends = self.client.get(url, {**params, 'projected': 'true'}).data['trends']
+        self.assertEqual([period['total_expenses'] for period in trends], [800, 850, 800])
+        self.assertEqual([period['total_income'] for period in trends], [0, 3000, 3000])
+        self.assertEqual(
+            [(entry['name'], entry['total']) for entry in trends[1]['breakdown']], [('Salary', 3000), ('Rent', 850)]
+        )
+        self.assertEqual(Transaction.objects.count(), 2)
+
+    def test_projected_trends_expire_with_the_day(self):
+        url = reverse('income-expense-trends-report')
+        plain = self.client.get(url)['ETag']
+        projected = self.client.get(url, {'projected': 'true'})['ETag']
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        with mock.patch.object(timezone, 'localdate', return_value=tomorrow):
+            self.assertEqual(self.client.get(url)['ETag'], plain)
+            response = self.client.get(url, {'projected': 'true'}, HTTP_IF_NONE_MATCH=projected)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Report-Cache'], 'miss')
+
+    def test_budget_in_other_currency_is_rejected(self):
+        budget = Budget.objects.create(
+            user=self.user, category=self.rent, allocated_amount=2000.00,
+            start_date=date(2025, 1, 1), end_date=date(2025, 12, 31)
+        )
+        response = self.client.post(reverse('recurringtransaction-list'), {
+            'category': self.rent.id, 'amount': 800.00, 'currency': 'EUR', 'frequency': 'monthly',
+            'start_date': '2025-01-01', 'budget': budget.id
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@skipUnless(forecast.np is not None, "NumPy is not installed.")
+class ForecastTestCase(TestCase):
+    """/api/reports/forecast/ projects recent cash flow and flags budgets and goals at risk."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='forecastuser', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+        self.income = Category.objects.create(name='Salary', category_type='income', user=self.user)
+        self.food = Category.objects.create(name='Food', category_type='expense', user=self.user)
+        self.today = timezone.localdate()
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, amount=10.00, category=self.food, date=self.today - timedelta(days=offset))
+            for offset in range(60)
+        ])
+        Transaction.objects.create(user=self.user, amount=900.00, category=self.income, date=self.today - timedelta(days=59))
+        rollups.rebuild([self.user.id])
+
+    def test_projects_the_recent_daily_rate(self):
+        data = self.client.get(reverse('forecast-report'), {'months': 2}).data
+        self.assertEqual(data['starting_balance'], 300)
+        self.assertEqual(len(data['periods']), 3)
+
+        last = date.fromisoformat(data['periods'][-1]['period'])
+        days = monthrange(last.year, last.month)[1]
+        self.assertEqual(data['periods'][-1]['total_expenses'], 10 * days)
+        self.assertEqual(data['periods'][-1]['total_income'], Decimal(15 * days).quantize(Decimal('0.01')))
+        flows = sum(period['total_income'] - period['total_expenses'] for period in data['periods'])
+        self.assertEqual(data['periods'][-1]['balance'], data['starting_balance'] + flows)
+
+    def test_flags_budgets_and_goals_at_risk(self):
+        end = self.today + timedelta(days=20)
+        tight = Budget.objects.create(user=self.user, category=self.food, allocated_amount=100.00, start_date=self.today, end_date=end)
+        loose = Budget.objects.create(user=self.user, category=self.food, allocated_amount=1000.00, start_date=self.today, end_date=end)
+        # The surplus is 5 a day: enough for the first goal, not for the second as well.
+        near = SavingsGoal.objects.create(
+            user=self.user, goal_name='Near', target_amount=100.00, current_amount=50.00, deadline=self.today + timedelta(days=30)
+        )
+        far = SavingsGoal.objects.create(
+            user=self.user, goal_name='Far', target_amount=500.00, deadline=self.today + timedelta(days=40)
+        )
+
+        data = self.client.get(reverse('forecast-report'), {'months': 1}).data
+        budgets = {budget['budget']: budget for budget in data['budgets']}
+        self.assertEqual(budgets[tight.id]['projected_spent_amount'], 200)
+        self.assertFalse(budgets[tight.id]['on_track'])
+        self.assertTrue(budgets[loose.id]['on_track'])
+
+        goals = {goal['goal']: goal for goal in data['savings_goals']}
+        self.assertTrue(goals[near.id]['on_track'])
+        self.assertEqual(goals[far.id]['projected_amount'], 150)
+        self.assertFalse(goals[far.id]['on_track'])
+
+    def test_month_of_year_seasonality(self):
+        days = [date(2023, 1, 1) + timedelta(days=offset) for offset in range(730)]
+        matrix = forecast.np.array([[20.0 if day.month == 12 else 10.0 for day in days]])
+        future = [date(2024, 12, 30), date(2025, 1, 2)]
+        december, january = forecast.project(matrix, days, future)[0]
+        self.assertAlmostEqual(december / january, 2.0)
+
+    def test_fixed_queries_and_validation(self):
+        with self.assertNumQueries(4):
+            forecast.forecast(self.user, {'months': '24'})
+        self.assertEqual(self.client.get(reverse('forecast-report'), {'months': 0}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(reverse('forecast-report'), {'months': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+        with mock.patch.object(forecast, 'np', None):
+            self.assertEqual(self.client.get(reverse('forecast-report'), {'months': 5}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SavingsContributionTestCase(TestCase):
+    """Goal amounts follow their contribution ledger, which the progress report reads."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='saver', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+        self.transfers = Category.objects.create(name='Transfers', category_type='expense', user=self.user)
+        self.today = timezone.localdate()
+        self.goal = SavingsGoal.objects.create(
+            user=self.user, goal_name='Car', target_amount=1000.00, deadline=self.today + timedelta(days=100)
+        )
+
+    def contribute(self, amount, days_ago=0, goal=None):
+        return SavingsContribution.objects.create(
+            user=self.user, goal=goal or self.goal, amount=amount, date=self.today - timedelta(days=days_ago)
+        )
+
+    def test_current_amount_follows_the_ledger(self):
+        first = self.contribute(100)
+        self.contribute(50)
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_amount, 150)
+
+        first.amount = Decimal('80.00')
+        first.save()
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_amount, 130)
+
+        # A stale copy of the goal does not write its old amount back.
+        stale = SavingsGoal.objects.get(pk=self.goal.pk)
+        first.delete()
+        stale.goal_name = 'New car'
+        stale.save()
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_amount, 50)
+
+    def test_contribution_from_a_transaction(self):
+        transfer = Transaction.objects.create(
+            user=self.user, category=self.transfers, amount=200.00, date=self.today - timedelta(days=3)
+        )
+        response = self.client.post(reverse('savingscontribution-list'), {'goal': self.goal.id, 'transaction': transfer.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['amount'], '200.00')
+        self.assertEqual(response.data['date'], str(transfer.date))
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_amount, 200)
+
+        transfer.delete()
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.current_amount, 0)
+
+    def test_contribution_validation(self):
+        euro = Transaction.objects.create(user=self.user, category=self.transfers, amount=20.00, currency='EUR', date=self.today)
+        for data in ({'goal': self.goal.id}, {'goal': self.goal.id, 'amount': -10}, {'goal': self.goal.id, 'transaction': euro.id}):
+            response = self.client.post(reverse('savingscontribution-list'), data)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        other = User.objects.create_user(username='other', password='testpassword1234')
+        theirs = SavingsGoal.objects.create(user=other, goal_name='Theirs', target_amount=10.00, deadline=self.goal.deadline)
+        response = self.client.post(reverse('savingscontribution-list'), {'goal': theirs.id, 'amount': 5})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_goal_edits_are_recorded_as_contributions(self):
+        response = self.client.post(reverse('savingsgoal-list'), {
+            'goal_name': 'Trip', 'target_amount': 500.00, 'current_amount': 120.00, 'deadline': self.goal.deadline
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['current_amount'], '120.00')
+        goal = SavingsGoal.objects.get(pk=response.data['id'])
+
+        self.client.patch(reverse('savingsgoal-detail', kwargs={'pk': goal.id}), {'current_amount': 100.00})
+        goal.refresh_from_db()
+        self.assertEqual(goal.current_amount, 100)
+        self.assertEqual(sorted(goal.contributions.values_list('amount', flat=True)), [-20, 120])
+
+        response = self.client.get(reverse('savingscontribution-list'), {'goal': goal.id})
+        self.assertEqual(response.data['count'], 2)
+
+    def test_progress_and_projected_completion(self):
+        SavingsGoal.objects.filter(pk=self.goal.pk).update(current_amount=100)  # Saved before the ledger.
+        for days_ago in range(0, 90, 10):
+            self.contribute(30, days_ago)  # 270 over the 90-day window: 3 a day.
+        idle = SavingsGoal.objects.create(user=self.user, goal_name='Idle', target_amount=50.00, deadline=self.goal.deadline)
+
+        with self.assertNumQueries(2):
+            data = savings.progress(self.user, {'timeframe': 'day'})
+        goals = {goal['goal']: goal for goal in data['goals']}
+        car = goals[self.goal.id]
+        self.assertEqual(car['current_amount'], 370)
+        self.assertEqual(car['progress'][0]['saved'], 130)
+        self.assertEqual(car['progress'][-1]['saved'], 370)
+        self.assertEqual(car['daily_rate'], 3)
+        # 630 left at 3 a day.
+        self.assertEqual(car['projected_completion_date'], self.today + timedelta(days=210))
+        self.assertFalse(car['on_track'])
+        self.assertIsNone(goals[idle.id]['projected_completion_date'])
+
+        response = self.client.get(reverse('savings-progress-report'), {'goal': self.goal.id})
+        self.assertEqual([goal['goal'] for goal in response.data['goals']], [self.goal.id])
+        response = self.client.get(reverse('savings-progress-report'), {'goal': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_opening_balances_and_corrections_are_not_saving(self):
+        response = self.client.post(reverse('savingsgoal-list'), {
+            'goal_name': 'Bike', 'target_amount': 1000.00, 'current_amount': 900.00, 'deadline': self.goal.deadline
+        })
+        goal = SavingsGoal.objects.get(pk=response.data['id'])
+        self.client.patch(reverse('savingsgoal-detail', kwargs={'pk': goal.id}), {'current_amount': 950.00})
+        self.contribute(9, goal=goal)  # 9 over the 90-day window: 0.10 a day.
+
+        bike = savings.progress(self.user, {'goal': goal.id})['goals'][0]
+        self.assertEqual(bike['current_amount'], 959)
+        self.assertEqual(bike['daily_rate'], Decimal('0.10'))
+        # 41 left at 0.10 a day.
+        self.assertEqual(bike['projected_completion_date'], self.today + timedelta(days=410))
+        kinds = self.client.get(reverse('savingscontribution-list'), {'goal': goal.id}).data['results']
+        self.assertEqual(sorted(row['kind'] for row in kinds), ['correction', 'deposit', 'opening'])
+
+
+@override_settings(FINANCE_READ_REPLICAS=['replica_a', 'replica_b'])
+class ReadReplicaRoutingTestCase(TestCase):
+    """Which database finance.replicas picks; the queries themselves run in ReadReplicaTestCase."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='testpassword1234')
+        self.category = Category.objects.create(name='Rent', category_type='expense', user=self.user)
+        caching.get_cache().clear()
+
+    def test_reads_rotate_over_the_replicas(self):
+        aliases = {replicas.read_alias(self.user.id) for _ in range(4)}
+        self.assertEqual(aliases, {'replica_a', 'replica_b'})
+        with override_settings(FINANCE_READ_REPLICAS=[]):
+            self.assertIsNone(replicas.read_alias(self.user.id))
+
+    def test_writes_keep_the_writer_on_the_primary(self):
+        other = User.objects.create_user(username='bystander', password='testpassword1234')
+        Transaction.objects.create(user=self.user, category=self.category, amount=5.00, date=date.today())
+        self.assertIsNone(replicas.read_alias(self.user.id))
+        self.assertIsNotNone(replicas.read_alias(other.id))
+
+        recurring.materialize(chunk_size=10)  # No schedules: nothing written, nobody pinned.
+        self.assertIsNotNone(replicas.read_alias(other.id))
+
+    def test_replica_reads_are_unsettled_until_the_lag_has_passed(self):
+        now = time.time()
+        self.assertEqual(replicas.route(now), (None, True))
+        self.assertEqual(replicas.route(now - 20)[1], False)
+        self.assertEqual(replicas.route(now - 61)[1], True)
+        self.assertEqual(replicas.route(None)[1], True)
+        self.assertIsNotNone(replicas.route(now - 20)[0])
+
+    def test_router_follows_the_context(self):
+        router = replicas.ReadReplicaRouter()
+        self.assertIsNone(router.db_for_read(Transaction))
+        with replicas.reading_from('replica_b'):
+            self.assertEqual(router.db_for_read(Transaction), 'replica_b')
+            self.assertEqual(router.db_for_write(Transaction), 'default')
+        self.assertIsNone(router.db_for_read(Transaction))
+
+
+@skipUnless('replica' in settings.DATABASES, "Run with --settings=core.settings_replicas.")
+class ReadReplicaTestCase(TestCase):
+    """List and report reads come from the replica, except right after the user wrote."""
+    databases = {'default', *({'replica'} & set(settings.DATABASES))}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='replicated', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Pay', category_type='income', user=self.user)
+        Transaction.objects.create(user=self.user, category=self.category, amount=100.00, date=date.today())
+        # The replica has not caught up with any of this; end the read-your-writes window.
+        caching.get_cache().clear()
+
+    def test_reads_use_the_replica_outside_the_window(self):
+        self.assertEqual(self.client.get(reverse('transaction-list')).data['count'], 0)
+        self.assertEqual(self.client.get(reverse('total-income-expenses-report')).data['total_income'], 0)
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_writes_pin_the_writer_to_the_primary(self):
+        response = self.client.post(reverse('transaction-list'), {
+            'category': self.category.id, 'amount': 50.00, 'date': date.today(), 'description': 'Bonus'
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.get(reverse('transaction-list')).data['count'], 2)
+        self.assertEqual(self.client.get(reverse('total-income-expenses-report')).data['total_income'], 150)
+
+        caching.get_cache().clear()
+        self.assertEqual(self.client.get(reverse('transaction-list')).data['count'], 0)
+
+    def test_lagging_replica_reads_are_not_kept(self):
+        # Past the sticky window, but the replica may still miss the write.
+        caching.get_cache().set(f'finance:primary-reads:{self.user.id}', time.time() - 20)
+        url = reverse('total-income-expenses-report')
+        for _ in range(2):
+            response = self.client.get(url)
+            self.assertEqual((response['X-Report-Cache'], response.has_header('ETag')), ('miss', False))
+        self.assertFalse(self.client.get(reverse('transaction-list')).has_header('ETag'))
+
+        caching.get_cache().clear()
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual((response['X-Report-Cache'], response.has_header('ETag')), ('hit', True))
+
+
+class BudgetRunningTotalsTestCase(TestCase):
+    """Budget.spent_amount and transaction_count follow linked transaction writes."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='totalsuser', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+
+        self.category = Category.objects.create(name='Dining', category_type='expense', user=self.user)
+        self.budget = Budget.objects.create(
+            user=self.user, category=self.category, allocated_amount=300.00,
+            start_date=date.today() - timedelta(days=5), end_date=date.today() + timedelta(days=25)
+        )
+        self.other_budget = Budget.objects.create(
+            user=self.user, category=self.category, allocated_amount=100.00,
+            start_date=date.today() - timedelta(days=5), end_date=date.today() + timedelta(days=25)
+        )
+
+    def assertTotals(self, budget, amount, count):
+        budget.refresh_from_db()
+        self.assertEqual((budget.spent_amount, budget.transaction_count), (amount, count))
+
+    def test_create_edit_repoint_and_delete(self):
+        response = self.client.post(reverse('transaction-list'), {
+            'category': self.category.id, 'amount': 40.00, 'date': date.today(), 'description': 'Lunch',
+            'budget': self.budget.id
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTotals(self.budget, 40, 1)
+
+        transaction = Transaction.objects.get(pk=response.data['id'])
+        transaction.amount = 55
+        transaction.save()
+        self.assertTotals(self.budget, 55, 1)
+
+        transaction.budget = self.other_budget
+        transaction.save()
+        self.assertTotals(self.budget, 0, 0)
+        self.assertTotals(self.other_budget, 55, 1)
+
+        transaction.delete()
+        self.assertTotals(self.other_budget, 0, 0)
+
+    def test_budget_edit_keeps_running_totals(self):
+        Transaction.objects.create(
+            user=self.user, amount=20.00, category=self.category, date=date.today(), description='Tea', budget=self.budget
+        )
+        response = self.client.patch(reverse('budget-detail', kwargs={'pk': self.budget.id}), {'allocated_amount': 350.00})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['spent_amount'], '20.00')
+        self.assertTotals(self.budget, 20, 1)
+
+    def test_moving_to_an_income_category_leaves_the_budget(self):
+        transaction = Transaction.objects.create(
+            user=self.user, amount=20.00, category=self.category, date=date.today(), description='Refund', budget=self.budget
+        )
+        income = Category.objects.create(name='Refunds', category_type='income', user=self.user)
+        response = self.client.patch(reverse('transaction-detail', args=[transaction.id]), {'category': income.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        transaction.refresh_from_db()
+        self.assertIsNone(transaction.budget_id)
+        self.assertTotals(self.budget, 0, 0)
+
+    def test_reconcile_command_repairs_drift(self):
+        Transaction.objects.create(
+            user=self.user, amount=20.00, category=self.category, date=date.today(), description='Tea', budget=self.budget
+        )
+        Budget.objects.filter(pk=self.budget.pk).update(spent_amount=999, transaction_count=7)
+
+        out = StringIO()
+        call_command('reconcile_budgets', stdout=out)
+        self.assertIn('Found 1 drifted', out.getvalue())
+        self.assertTotals(self.budget, 999, 7)
+
+        call_command('reconcile_budgets', '--fix', stdout=StringIO())
+        self.assertTotals(self.budget, 20, 1)
+
+
+class EndpointScalingTestCase(TestCase):
+    """Small-scale run of the benchmark suite: query counts must not depend on data size."""
+    sizes = (50, 500)
+
+    def test_query_counts_do_not_grow_with_data(self):
+        results = benchmarks.run(self.sizes, repeat=1)
+        self.assertEqual(benchmarks.growing_query_counts(results), [])
+
+    def test_compare_flags_regressions(self):
+        baseline = {'100': {'budget-list': {'queries': 2, 'median_ms': 10.0, 'max_ms': 12.0}}}
+        current = {'100': {'budget-list': {'queries': 3, 'median_ms': 14.0, 'max_ms': 15.0}}}
+        self.assertEqual(len(benchmarks.compare(current, baseline, tolerance=0.25)), 2)
+        self.assertEqual(benchmarks.compare(current, baseline, tolerance=0.5), ['budget-list @ 100: queries 2 -> 3'])
+
+
+class RequestMetricsTestCase(TestCase):
+    """The metrics middleware records every resolved view and /api/metrics/ exposes it."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='metricsuser', password='testpassword1234')
+        self.admin = User.objects.create_user(username='metricsadmin', password='testpassword1234', is_staff=True)
+        metrics_registry.reset()
+
+    def test_metrics_in_prometheus_format(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.get(reverse('net-worth-report'))
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('metrics'), HTTP_ACCEPT='text/plain')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.content.decode()
+        self.assertIn('# TYPE finance_request_duration_ms histogram', body)
+        self.assertIn('finance_request_queries_count{view="net-worth-report"} 1', body)
+        self.assertIn('finance_request_queries_sum{view="net-worth-report"} 2', body)
+        self.assertIn('finance_request_duration_ms_bucket{view="net-worth-report",le="+Inf"} 1', body)
+        self.assertIn('finance_report_cache_misses_total', body)
+
+    def test_metrics_require_staff(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(FINANCE_SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged_with_sql(self):
+        self.client.force_authenticate(user=self.user)
+        with self.assertLogs('finance.metrics', level='WARNING') as logs:
+            self.client.get(reverse('total-income-expenses-report'))
+        self.assertIn('SELECT', logs.output[0])
+
+
+class StatelessAuthenticationTestCase(TestCase):
+    """Bearer tokens authenticate without reading the auth_user row."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='tokenuser', password='testpassword1234')
+        self.admin = User.objects.create_user(username='tokenadmin', password='testpassword1234', is_staff=True)
+        self.category = Category.objects.create(name='Food', category_type='expense', user=self.user)
+        authentication._full_users.clear()
+
+    def authorize(self, user):
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_requests_do_not_query_users(self):
+        self.authorize(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('transaction-list'), {
+                'amount': '12.50', 'category': self.category.id, 'date': '2025-01-05', 'description': 'Lunch'
+            })
+            self.client.get(reverse('net-worth-report'))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        self.assertFalse([query for query in queries.captured_queries if '"auth_user"' in query['sql']])
+        self.assertEqual(Transaction.objects.get().user, self.user)
+
+    def test_token_user_is_read_only(self):
+        user = TokenBackedUser.from_claims(self.user.id)
+        self.assertEqual(user, self.user)
+        with self.assertRaises(TypeError):
+            user.save()
+
+    def test_staff_check_loads_full_user_once(self):
+        self.authorize(self.admin)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_200_OK)
+
+        self.authorize(self.user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class AsyncReportTestCase(TestCase):
+    """The ASGI-native report views return the same payloads as the DRF ones."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='asyncuser', password='testpassword1234')
+        self.client.force_authenticate(user=self.user)
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.factory = AsyncRequestFactory()
+
+        income = Category.objects.create(name='Salary', category_type='income', user=self.user)
+        expense = Category.objects.create(name='Rent', category_type='expense', user=self.user)
+        Transaction.objects.create(user=self.user, amount=500.00, category=income, date=date(2025, 2, 3), description='Pay')
+        Transaction.objects.create(user=self.user, amount=120.00, category=expense, date=date(2025, 3, 9), description='Rent')
+        SavingsGoal.objects.create(
+            user=self.user, goal_name="Car", target_amount=900.00, current_amount=60.00,
+            deadline=date.today() + timedelta(days=90)
+        )
+
+    async def call(self, view, params, token=None):
+        caching.bump_version(self.user.id)
+        request = self.factory.get('/', params, headers={'Authorization': f'Bearer {token or self.token}'})
+        return await view.as_view()(request)
+
+    async def test_payloads_match_sync_views(self):
+        cases = [
+            (async_views.TotalIncomeExpenseAsyncReport, 'total-income-expenses-report', {}),
+            (async_views.IncomeExpenseTrendsAsyncReport, 'income-expense-trends-report', {'timeframe': 'week'}),
+            (async_views.NetWorthAsyncReport, 'net-worth-report', {'start_date': '2025-02-01', 'end_date': '2025-03-31'}),
+        ]
+        for view, url_name, params in cases:
+            response = await self.call(view, params)
+            self.assertEqual(response.status_code, 200)
+            expected = await sync_to_async(self.client.get)(reverse(url_name), params)
+            self.assertEqual(json.loads(response.content), json.loads(expected.content))
+
+    async def test_conditional_get_matches_sync_views(self):
+        headers = {'Authorization': f'Bearer {self.token}'}
+        view = async_views.NetWorthAsyncReport.as_view()
+        response = await view(self.factory.get('/', headers=headers))
+        expected = await sync_to_async(self.client.get)(reverse('net-worth-report'))
+        self.assertEqual(response['ETag'], expected['ETag'])
+        self.assertEqual(response['Cache-Control'], expected['Cache-Control'])
+
+        response = await view(self.factory.get('/', headers={**headers, 'If-None-Match': response['ETag']}))
+        self.assertEqual(response.status_code, 304)
+
+    async def test_rejects_missing_or_bad_token(self):
+        response = await async_views.NetWorthAsyncReport.as_view()(self.factory.get('/'))
+        self.assertEqual(response.status_code, 401)
+        response = await self.call(async_views.NetWorthAsyncReport, {}, token='not-a-token')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_invalid_timeframe(self):
+        response = await self.call(async_views.IncomeExpenseTrendsAsyncReport, {'timeframe': 'decade'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_report_views_must_say_what_they_build(self):
+        class Unfinished(async_views.AsyncReportView):
+            report_name = 'unfinished'
+
+        with self.assertRaises(ImproperlyConfigured):
+            Unfinished.as_view()
@@ -1,11 +1,13 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .views import (
     RegisterUserView, TransactionViewSet, CategoryViewSet,
-    BudgetViewSet, SavingsGoalViewSet, TotalIncomeExpenseReport,
-    IncomeExpenseTrendsReport, NetWorthReport, BudgetNotificationView
+    BudgetViewSet, SavingsGoalViewSet, SavingsContributionViewSet, RecurringTransactionViewSet, JobViewSet, TotalIncomeExpenseReport,
+    IncomeExpenseTrendsReport, NetWorthReport, ForecastReport, SavingsProgressReport, DashboardView, SyncView, BudgetNotificationView, MetricsView
 )
+from .async_views import TotalIncomeExpenseAsyncReport, IncomeExpenseTrendsAsyncReport, NetWorthAsyncReport
 
 
 router = DefaultRouter()
@@ -13,15 +15,39 @@ router.register(r'transactions', TransactionViewSet, basename = 'transaction')
 router.register(r'categories', CategoryViewSet, basename = 'category')
 router.register(r'budgets', BudgetViewSet, basename = 'budget')
 router.register(r'savingsgoals', SavingsGoalViewSet, basename = 'savingsgoal')
+router.register(r'savings-contributions', SavingsContributionViewSet, basename = 'savingscontribution')
+router.register(r'recurring-transactions', RecurringTransactionViewSet, basename = 'recurringtransaction')
+router.register(r'jobs', JobViewSet, basename = 'job')
 
 
-urlpatterns = [
-    path('register/', RegisterUserView.as_view(), name = 'register'),
-    path('login/', TokenObtainPairView.as_view(), name = 'token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name = 'token_refresh'),
-    path('reports/income-expenses/', TotalIncomeExpenseReport.as_view(), name='total-income-expenses-report'),
-    path('reports/income-expense-trends/', IncomeExpenseTrendsReport.as_view(), name='income-expense-trends-report'),
-    path('reports/net-worth/', NetWorthReport.as_view(), name='net-worth-report'),
-    path('api/budget-notifications/', BudgetNotificationView.as_view(), name='budget-notifications'),
-    path('', include(router.urls))
-]
\ No newline at end of file
+def report_urlpatterns(async_reports):
+    """The report routes, served by the DRF views or their ASGI-native versions."""
+    if async_reports:
+        income_expenses, trends, net_worth = TotalIncomeExpenseAsyncReport, IncomeExpenseTrendsAsyncReport, NetWorthAsyncReport
+    else:
+        income_expenses, trends, net_worth = TotalIncomeExpenseReport, IncomeExpenseTrendsReport, NetWorthReport
+
+    return [
+        path('reports/income-expenses/', income_expenses.as_view(), name='total-income-expenses-report'),
+        path('reports/income-expense-trends/', trends.as_view(), name='income-expense-trends-report'),
+        path('reports/net-worth/', net_worth.as_view(), name='net-worth-report'),
+    ]
+
+
+def api_urlpatterns(async_reports=False):
+    return [
+        path('register/', RegisterUserView.as_view(), name = 'register'),
+        path('login/', TokenObtainPairView.as_view(), name = 'token_obtain_pair'),
+        path('token/refresh/', TokenRefreshView.as_view(), name = 'token_refresh'),
+        *report_urlpatterns(async_reports),
+        path('reports/forecast/', ForecastReport.as_view(), name='forecast-report'),
+        path('reports/savings-progress/', SavingsProgressReport.as_view(), name='savings-progress-report'),
+        path('dashboard/', DashboardView.as_view(), name='dashboard'),
+        path('sync/', SyncView.as_view(), name='sync'),
+        path('api/budget-notifications/', BudgetNotificationView.as_view(), name='budget-notifications'),
+        path('metrics/', MetricsView.as_view(), name='metrics'),
+        path('', include(router.urls))
+    ]
+
+
+urlpatterns = api_urlpatterns(settings.FINANCE_ASYNC_REPORTS)
\ No newline at end of file
@@ -1,15 +1,27 @@
 from django.shortcuts import render
-from django.utils.dateparse import parse_date
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.contrib.auth.models import User
-from django.db.models import Sum
-from django.db.models.functions import TruncMonth, TruncWeek
 from rest_framework.views import APIView
-from rest_framework import generics, status, viewsets
+from rest_framework import generics, mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.tokens import RefreshToken
-from .serializers import UserSerializer, TransactionSerializer, CategorySerializer, BudgetSerializer, SavingsGoalSerializer
-from .models import Transaction, Category, Budget, SavingsGoal
+from .serializers import (
+    UserSerializer, TransactionSerializer, CategorySerializer, BudgetSerializer, SavingsGoalSerializer,
+    SavingsContributionSerializer, RecurringTransactionSerializer, JobSerializer, check_budget_currency
+)
+from .models import DEFAULT_CURRENCY, Transaction, Category, Budget, SavingsGoal, SavingsContribution, RecurringTransaction, Job
+from .conditional import ConditionalGetMixin
+from .filters import filter_transactions
+from .pagination import KeysetPagination, SelectablePaginationMixin
+from .permissions import IsStaffUser
+from .metrics import registry as metrics_registry
+from . import caching, exports, forecast, imports, recurring, replicas, reports, savings, sync
 from datetime import datetime
 from rest_framework.pagination import PageNumberPagination
 
@@ -39,18 +51,18 @@ class RegisterUserView(generics.CreateAPIView):
         }, status = status.HTTP_201_CREATED)
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        queryset = Category.objects.all()
+        queryset = Category.objects.filter(user=self.request.user)
 
         category_type = self.request.query_params.get('category_type', None)
 
         if category_type:
-            queryset = queryset.filter(type = category_type)
+            queryset = queryset.filter(category_type = category_type)
 
         return queryset
 
@@ -58,58 +70,90 @@ class CategoryViewSet(viewsets.ModelViewSet):
         serializer.save(user = self.request.user)
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(ConditionalGetMixin, SelectablePaginationMixin, viewsets.ModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
+    keyset_ordering = ('-date', '-id')
 
     def get_queryset(self):
-        queryset = Transaction.objects.filter(user=self.request.user)
-
-        # Filtering by category (optional)
-        category = self.request.query_params.get('category', None)
-        if category:
-            queryset = queryset.filter(category_id=category)
-
-        # Filtering by transaction type (optional)
-        category_type = self.request.query_params.get('category_type', None)
-        if category_type:
-            queryset = queryset.filter(category__category_type=category_type)
-
-        # Filtering by date range (optional)
-        start_date = self.request.query_params.get('start_date', None)
-        end_date = self.request.query_params.get('end_date', None)
-        if start_date:
-            start_date = parse_date(start_date)
-            queryset = queryset.filter(date__gte=start_date)
-        if end_date:
-            end_date = parse_date(end_date)
-            queryset = queryset.filter(date__lte=end_date)
+        return filter_transactions(Transaction.objects.filter(user=self.request.user), self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        # Keyset pages seek on (date, id), which would silently drop the relevance order of ?q=.
+        if request.query_params.get('q') and request.query_params.get('paginate') == 'cursor':
+            raise ValidationError({'paginate': "Search results are ranked by relevance; page them by number, not cursor."})
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'], renderer_classes=[exports.PassthroughRenderer])
+    def export(self, request):
+        """Stream every matching transaction as CSV or NDJSON, without pagination."""
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in exports.FORMATS:
+            return Response(
+                {'export_format': f"Export format must be one of: {', '.join(exports.FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rows = exports.export_rows(self.get_queryset(), chunk_size=settings.FINANCE_EXPORT_CHUNK_SIZE)
+        response = StreamingHttpResponse(exports.FORMATS[export_format](rows), content_type=exports.CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = f'attachment; filename="transactions.{export_format}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def bulk_import(self, request):
+        """Create many transactions from a JSON array or an uploaded CSV file."""
+        if 'file' in request.FILES:
+            try:
+                rows = imports.read_csv(request.FILES['file'], settings.FINANCE_IMPORT_MAX_ROWS)
+            except ValueError as exc:
+                return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            rows = request.data.get('transactions', None)
+
+        if not isinstance(rows, list) or not rows:
+            return Response({'error': "Provide a non-empty JSON array or a CSV file."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.FINANCE_IMPORT_MAX_ROWS:
+            return Response(
+                {'error': f"An import is limited to {settings.FINANCE_IMPORT_MAX_ROWS} rows."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            batch_size = int(request.query_params.get('batch_size', settings.FINANCE_IMPORT_BATCH_SIZE))
+        except ValueError:
+            batch_size = settings.FINANCE_IMPORT_BATCH_SIZE
+
+        created, errors = imports.import_transactions(request.user, rows, max(1, batch_size))
+        return Response({
+            'created': created,
+            'errors': errors
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
 
-        return queryset
-    
     def perform_create(self, serializer):
-        category = self.request.data.get('category')
-        category_obj = Category.objects.get(id=category)
-        transaction_type = category_obj.category_type
+        transaction_type = serializer.validated_data['category'].category_type
 
         budget_id = self.request.data.get('budget')  # Assuming the budget ID is provided in the request
 
         if transaction_type == 'expense' and budget_id:
             try:
                 budget = Budget.objects.get(id=budget_id, user=self.request.user)
-                serializer.save(user=self.request.user, budget=budget)
             except Budget.DoesNotExist:
-                raise serializer.ValidationError("Invalid budget selected")
+                raise ValidationError("Invalid budget selected")
+            check_budget_currency(budget, serializer.validated_data.get('currency', DEFAULT_CURRENCY))
+            serializer.save(user=self.request.user, budget=budget)
         else:
             serializer.save()
 
 
-class BudgetViewSet(viewsets.ModelViewSet):
+class BudgetViewSet(ConditionalGetMixin, SelectablePaginationMixin, viewsets.ModelViewSet):
     queryset = Budget.objects.all()
     serializer_class = BudgetSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
+    keyset_ordering = ('-start_date', '-id')
 
     def get_queryset(self):
         queryset = Budget.objects.filter(user=self.request.user)
@@ -128,11 +172,12 @@ class BudgetViewSet(viewsets.ModelViewSet):
         return queryset
     
 
-class SavingsGoalViewSet(viewsets.ModelViewSet):
+class SavingsGoalViewSet(ConditionalGetMixin, SelectablePaginationMixin, viewsets.ModelViewSet):
     queryset = SavingsGoal.objects.all()
     serializer_class = SavingsGoalSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
+    keyset_ordering = ('deadline', 'id')
 
     def get_queryset(self):
         return SavingsGoal.objects.filter(user=self.request.user)
@@ -141,124 +186,197 @@ class SavingsGoalViewSet(viewsets.ModelViewSet):
         serializer.save()
 
 
-class TotalIncomeExpenseReport(APIView):
+class SavingsContributionViewSet(ConditionalGetMixin, SelectablePaginationMixin, viewsets.ModelViewSet):
+    """The ledger behind each goal's current_amount; ?goal=<id> narrows it to one goal."""
+    serializer_class = SavingsContributionSerializer
     permission_classes = [IsAuthenticated]
-    
-    def get(self, request):
-        user = request.user
-        start_date = request.query_params.get('start_date', None)
-        end_date = request.query_params.get('end_date', None)
-        category_type = request.query_params.get('category_type', None)
+    pagination_class = StandardResultsSetPagination
+    keyset_ordering = ('-date', '-id')
 
-        transactions = Transaction.objects.filter(user=user)
+    def get_queryset(self):
+        queryset = SavingsContribution.objects.filter(user=self.request.user)
+        goal_id = savings.validate_goal(self.request.user, self.request.query_params.get('goal', None))
+        if goal_id:
+            queryset = queryset.filter(goal=goal_id)
+        return queryset.order_by('-date', '-id')
 
-        if start_date and end_date:
-            transactions = transactions.filter(date__gte=start_date, date__lte=end_date)
 
-        
-        if category_type:
-            transactions = transactions.filter(category__category_type=category_type)
+class RecurringTransactionViewSet(ConditionalGetMixin, SelectablePaginationMixin, viewsets.ModelViewSet):
+    """Schedules that manage.py materialize_recurring turns into transactions as they fall due."""
+    serializer_class = RecurringTransactionSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = StandardResultsSetPagination
 
-        income = transactions.filter(category__category_type = "Income").aggregate(total_income = Sum('amount'))['total_income'] or 0
-        expense = transactions.filter(category__category_type = "Expense").aggregate(total_expense = Sum('amount'))['total_expense'] or 0
+    def get_queryset(self):
+        return RecurringTransaction.objects.filter(user=self.request.user).order_by('id')
 
-        return Response({
-            'total_income': income,
-            'total_expense': expense
-        })
-    
 
-class IncomeExpenseTrendsReport(APIView):
+class JobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Submit reports and exports to the background workers, poll them and download the results."""
+    serializer_class = JobSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = StandardResultsSetPagination
 
-    def get(self, request):
-        user = request.user
-        start_date = request.query_params.get('start_date', None)
-        end_date = request.query_params.get('end_date', None)
-        category_type = request.query_params.get('category_type', None)
-        timeframe = request.query_params.get('timeframe', 'month')
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user).defer('result').order_by('-created_at', '-id')
 
-        transactions = Transaction.objects.filter(user=user)
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
 
-        if start_date and end_date:
-            transactions = transactions.filter(date__gte=start_date, date__lte=end_date)
+    @action(detail=True, methods=['get'], renderer_classes=[exports.PassthroughRenderer])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != Job.SUCCEEDED:
+            return Response({'detail': f"The job is {job.status}; there is nothing to download."}, status=status.HTTP_409_CONFLICT)
 
-        if category_type:
-            transactions = transactions.filter(category__category_type=category_type)
+        response = HttpResponse(bytes(job.result), content_type=job.content_type)
+        response['Content-Disposition'] = f'attachment; filename="{job.filename}"'
+        return response
 
-        if timeframe == 'month':
-            transactions = transactions.annotate(period=TruncMonth('date'))
-        elif timeframe == 'week':
-            transactions = transactions.annotate(period=TruncWeek('date'))
 
-        
-        income_trends = transactions.filter(transaction_type="income").values('period').annotate(total_income=Sum('amount')).order_by('period')
-        expense_trends = transactions.filter(transaction_type="expense").values('period').annotate(total_expenses=Sum('amount')).order_by('period')
+class CachedReportMixin:
+    """Serve a report from the per-user report cache, computing it with build_report() on a miss.
 
-        income_data = {str(item['period']): item['total_income'] for item in income_trends}
-        expense_data = {str(item['period']): item['total_expenses'] for item in expense_trends}
+    Responses carry an ETag derived from the user's data version, so a client revalidating
+    with If-None-Match gets a 304 before anything is computed or read from the cache.
+    Reports are computed on a read replica when one is configured (see finance.replicas);
+    one that may miss the user's last write is neither cached nor given an ETag.
+    """
+    report_name = None
 
-        report_data = []
-        all_periods = sorted(set(income_data.keys()).union(expense_data.keys()))
+    def report_version(self, request):
+        return caching.report_version(request.user.id, request.query_params)
 
-        for period in all_periods:
-            report_data.append({
-                'period': period,
-                'total_income': income_data.get(period, 0),
-                'total_expenses': expense_data.get(period, 0)
-            })
+    def get(self, request):
+        version = self.report_version(request)
+        etag = caching.report_etag(request.user.id, self.report_name, request.query_params, version)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            alias, settled = replicas.read_route(request.user.id)
+            with replicas.reading_from(alias):
+                data, hit = caching.cached_report(
+                    request.user.id, self.report_name, request.query_params, lambda: self.build_report(request),
+                    version, store=settled
+                )
+            response = Response(data)
+            response['X-Report-Cache'] = 'hit' if hit else 'miss'
+            if not (hit or settled):
+                etag = None
+        if etag:
+            response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class TotalIncomeExpenseReport(CachedReportMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    report_name = 'income-expenses'
+    
+    def build_report(self, request):
+        source = reports.report_source(request.user, request.query_params)
+        return reports.income_expense_totals(source)
+    
 
-        return Response({'trends': report_data})
+class IncomeExpenseTrendsReport(CachedReportMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    report_name = 'income-expense-trends'
+
+    def report_version(self, request):
+        version = super().report_version(request)
+        if request.query_params.get('projected') == 'true':
+            # Projections run from today, converted at today's rate.
+            version = f'{version}.{timezone.localdate()}'
+        return version
+
+    def build_report(self, request):
+        params = request.query_params
+        timeframe, breakdown, start_date, end_date = reports.trends_options(params)
+        source = reports.report_source(request.user, params, timeframe)
+        rows = recurring.trend_rows_with_projection(request.user, params, source, timeframe, breakdown, start_date, end_date)
+        return {'trends': reports.build_trends(rows, timeframe, breakdown, start_date, end_date)}
     
 
-class NetWorthReport(APIView):
+class NetWorthReport(CachedReportMixin, APIView):
     permission_classes = [IsAuthenticated]
+    report_name = 'net-worth'
 
-    def get(self, request):
-        user = request.user
-        start_date = request.query_params.get('start_date', None)
-        end_date = request.query_params.get('end_date', None)
-        category_type = request.query_params.get('category_type', None)
+    def build_report(self, request):
+        source = reports.report_source(request.user, request.query_params)
+        return reports.net_worth(request.user, source)
+    
+
+class ForecastReport(CachedReportMixin, APIView):
+    """Income, expense and balance projected ?months=N ahead, with the budgets and goals at risk."""
+    permission_classes = [IsAuthenticated]
+    report_name = 'forecast'
 
-        transactions = Transaction.objects.filter(user=user)
+    def report_version(self, request):
+        # The forecast starts tomorrow, so it changes with the date as well as with the data.
+        return f'{super().report_version(request)}.{timezone.localdate()}'
 
-        if start_date and end_date:
-            transactions = transactions.filter(date__gte=start_date, date__lte=end_date)
+    def build_report(self, request):
+        return forecast.forecast(request.user, request.query_params)
 
-        if category_type:
-            transactions = transactions.filter(category__category_type=category_type)
 
-        income = transactions.filter(category__category_type='Income').aggregate(total_income=Sum('amount'))['total_income'] or 0
-        expense = transactions.filter(category__category_type='Expense').aggregate(total_expense=Sum('amount'))['total_expense'] or 0
+class SavingsProgressReport(CachedReportMixin, APIView):
+    """Saved amount of each goal per ?timeframe period, with the completion date its recent rate projects."""
+    permission_classes = [IsAuthenticated]
+    report_name = 'savings-progress'
 
-        savings = SavingsGoal.objects.filter(user = user).aggregate(total_savings=Sum('current_amount'))['total_savings'] or 0
+    def report_version(self, request):
+        # The saving rate is measured over the days before today.
+        return f'{super().report_version(request)}.{timezone.localdate()}'
 
-        net_worth = income - expense + savings
+    def build_report(self, request):
+        return savings.progress(request.user, request.query_params)
 
-        return Response({
-            'net_worth': net_worth,
-            'total_income': income,
-            'total_expense': expense,
-            'total_savings': savings
-        })
-    
 
-class BudgetNotificationView(APIView):
+class DashboardView(CachedReportMixin, APIView):
+    """Everything the dashboard shows on load: the reports, budget alerts and the first transactions."""
     permission_classes = [IsAuthenticated]
+    report_name = 'dashboard'
 
+    def build_report(self, request):
+        data = reports.dashboard(request.user, request.query_params)
+
+        paginator = KeysetPagination(TransactionViewSet.keyset_ordering)
+        page = paginator.page(Transaction.objects.filter(user=request.user), paginator.page_size)
+        data['transactions'] = {
+            'next_cursor': paginator.next_cursor(),
+            'results': TransactionSerializer(page, many=True).data,
+        }
+        return data
+
+
+class SyncView(APIView):
+    """Rows changed and ids deleted since ?since=<token>; without a token, a full snapshot."""
+    permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        budgets = Budget.objects.filter(user=request.user)
-        alerts = []
+        since = request.query_params.get('since')
+        since = sync.decode_token(since) if since else None
+        return Response(sync.changes(request.user, since, context={'request': request}))
+
+
+class BudgetNotificationView(APIView):
+    permission_classes = [IsAuthenticated]
 
-        for budget in budgets:
-            total_expenses = Transaction.objects.filter(budget=budget, transaction_type='expense').aggregate(Sum('amount'))['amount__sum'] or 0
-            if total_expenses > budget.allocated_amount:
-                alerts.append({
-                    'message': f"Your total expenses for the {budget.category.name} category have exceeded your allocated budget of {budget.allocated_amount}.",
-                    'is_high_priority': True
-                })
+
+    def get(self, request):
+        budgets = reports.budget_status(request.user)
 
         return Response({
-            'alerts': alerts
-        })
\ No newline at end of file
+            'alerts': reports.budget_alerts(budgets),
+            'budgets': budgets
+        })
+
+
+class MetricsView(APIView):
+    """Per-URL request histograms of this process in the Prometheus text format."""
+    permission_classes = [IsStaffUser]
+    renderer_classes = [exports.PassthroughRenderer]
+
+    def get(self, request):
+        return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')